@@ -58,6 +58,7 @@ async def register(request: Request, user_data: UserCreate):
         is_verified=user.is_verified,
         preferred_cuisines=user.preferred_cuisines,
         dietary_restrictions=user.dietary_restrictions,
+        auto_apply_dietary_restrictions=user.auto_apply_dietary_restrictions,
         created_at=user.created_at,
         last_login=user.last_login
     )
@@ -0,0 +1,36 @@
+import os
+import re
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+from app.services.images import THUMBNAIL_FORMAT, get_image_pipeline
+
+router = APIRouter()
+
+DIGEST_REGEX = re.compile(r'^[0-9a-f]{64}$')
+
+# Content-addressed files never change, so clients and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get(f"/{{digest}}/{{size}}.{THUMBNAIL_FORMAT}")
+async def get_image(digest: str, size: int, request: Request):
+    """Serve a stored recipe thumbnail"""
+    if not DIGEST_REGEX.match(digest):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    
+    etag = f'"{digest}-{size}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        )
+    
+    path = get_image_pipeline().store.path(digest, size)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    )
@@ -1,24 +1,142 @@
+import asyncio
+import re
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from app.models.recipe import Recipe
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from app.config import get_settings
+from beanie import PydanticObjectId
+from app.models.recipe import ImageAsset, Recipe, RecipeIngredientsView, RecipeTextView, RecipeTombstone
 from app.models.user import User
 from app.schemas.recipe import (
+    ImageAssetResponse,
+    LibraryStatsResponse,
     RecipeCreate,
+    RecipeBatchCreate,
+    RecipeBatchResult,
+    RecipeBatchResponse,
+    RecipeChanges,
+    RecipeDuplicate,
+    RecipeRecommendation,
     RecipeUpdate,
     RecipeResponse,
-    RecipeList
+    RecipeList,
+    RecipeTombstoneResponse,
+    ShoppingListCategory,
+    ShoppingListItem,
+    ShoppingListRequest,
+    ShoppingListResponse,
+    TagCount
 )
+from app.core.database import get_database
 from app.core.security import get_current_active_user
-from app.core.gemini import GeminiService
+from app.core.gemini import get_gemini_service
+from app.core.resilience import GeminiUnavailableError
+from app.services.change_feed import get_change_feed
+from app.services.duplicates import find_duplicates
 from app.services.extractors import ExtractorFactory
+from app.services.images import get_image_pipeline, image_url
+from app.services.library_stats import RecipeFacets, complete_tags, decoded, get_library_stats, record_change
+from app.services.recipe_query import (
+    Condition,
+    QuerySyntaxError,
+    UnindexedQueryError,
+    compile_query,
+    parse_filter,
+    parse_sort
+)
+from app.services.recommendations import get_recommendation_service
+from app.services.semantic_search import get_semantic_search, reciprocal_rank_fusion, recipe_text
+from app.services.scaling import get_scaling_cache
+from app.services.shopping_list import ShoppingListBuilder
+from app.services.sync import CursorExpiredError, InvalidCursorError, changes_since
+from app.core.constants import DietaryInfo
+from app.utils.dietary import labels_to_mask, mask_to_flags, parse_label
+from app.utils.quantities import IMPERIAL, METRIC
 
 router = APIRouter()
 
 
+def _to_response(recipe: Recipe) -> RecipeResponse:
+    """Convert a recipe document to its API response"""
+    return RecipeResponse(
+        _id=str(recipe.id),
+        user_id=recipe.user_id,
+        title=recipe.title,
+        description=recipe.description,
+        recipe_type=recipe.recipe_type,
+        cuisine=recipe.cuisine,
+        dietary_info=recipe.dietary_info,
+        dietary_flags=mask_to_flags(recipe.dietary_mask),
+        allergen_scan_flags=mask_to_flags(recipe.allergen_scan_mask),
+        prep_time=recipe.prep_time,
+        cook_time=recipe.cook_time,
+        total_time=recipe.total_time,
+        servings=recipe.servings,
+        difficulty=recipe.difficulty,
+        ingredients=recipe.ingredients,
+        instructions=recipe.instructions,
+        nutrition=recipe.nutrition,
+        images=recipe.images,
+        image_assets=[
+            ImageAssetResponse(
+                digest=asset.digest,
+                source_url=asset.source_url,
+                width=asset.width,
+                height=asset.height,
+                thumbnails={size: image_url(asset.digest, size) for size in asset.sizes}
+            )
+            for asset in recipe.image_assets
+        ],
+        source=recipe.source,
+        tags=recipe.tags,
+        notes=recipe.notes,
+        is_favorite=recipe.is_favorite,
+        created_at=recipe.created_at,
+        updated_at=recipe.updated_at
+    )
+
+
+async def _localize_images(recipe_id, urls: List[str]):
+    """Replace hotlinked images with locally stored thumbnails once downloaded"""
+    stored = await get_image_pipeline().process(urls)
+    if not stored:
+        return
+    
+    # Only touch recipes whose images haven't been edited in the meantime
+    await Recipe.find_one({"_id": recipe_id, "images": urls}).update({"$set": {
+        "images": [image_url(image.digest, image.sizes[-1]) for image in stored],
+        "image_assets": [
+            ImageAsset(
+                digest=image.digest,
+                source_url=image.source_url,
+                width=image.width,
+                height=image.height,
+                phash=f"{image.phash:016x}",
+                sizes=image.sizes
+            ).model_dump()
+            for image in stored
+        ],
+        "updated_at": datetime.utcnow()
+    }})
+
+
+async def _duplicates_of(recipe: Recipe) -> List[RecipeDuplicate]:
+    return [
+        RecipeDuplicate(id=str(candidate.id), title=candidate.title, similarity=round(score, 3))
+        for candidate, score in await find_duplicates(recipe)
+    ]
+
+
+def _schedule_image_localization(background_tasks: BackgroundTasks, recipe: Recipe):
+    if get_settings().image_pipeline_enabled and recipe.images:
+        background_tasks.add_task(_localize_images, recipe.id, list(recipe.images))
+
+
 @router.post("/extract", response_model=RecipeResponse)
 async def extract_recipe(
     recipe_data: RecipeCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
     """Extract recipe from URL and save it"""
@@ -34,9 +152,11 @@ async def extract_recipe(
         # Extract content from URL
         content = await extractor.extract(recipe_data.url)
         
-        # Process with Gemini
-        gemini_service = GeminiService()
-        recipe_info = await gemini_service.extract_recipe_data(content)
+        # Site rule packs return a finished recipe; everything else goes to Gemini
+        recipe_info = content.get('structured_recipe')
+        if not recipe_info:
+            gemini_service = get_gemini_service()
+            recipe_info = await gemini_service.extract_recipe_data(content)
         
         if not recipe_info:
             raise HTTPException(
@@ -47,39 +167,34 @@ async def extract_recipe(
         # Create recipe document
         recipe = Recipe(
             user_id=str(current_user.id),
-            **recipe_info,
-            tags=recipe_data.tags if recipe_data.tags else [],
-            notes=recipe_data.notes
+            **{
+                **recipe_info,
+                "images": recipe_info.get('images') or content.get('images', []),
+                "tags": recipe_data.tags if recipe_data.tags else [],
+                "notes": recipe_data.notes
+            }
         )
         
         # Save to database
         await recipe.insert()
+        await record_change(recipe.user_id, None, RecipeFacets.of(recipe))
+        get_recommendation_service().recipe_saved(recipe)
+        background_tasks.add_task(get_semantic_search().recipe_saved, recipe)
+        _schedule_image_localization(background_tasks, recipe)
         
-        return RecipeResponse(
-            _id=str(recipe.id),
-            user_id=recipe.user_id,
-            title=recipe.title,
-            description=recipe.description,
-            recipe_type=recipe.recipe_type,
-            cuisine=recipe.cuisine,
-            dietary_info=recipe.dietary_info,
-            prep_time=recipe.prep_time,
-            cook_time=recipe.cook_time,
-            total_time=recipe.total_time,
-            servings=recipe.servings,
-            difficulty=recipe.difficulty,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            nutrition=recipe.nutrition,
-            images=recipe.images,
-            source=recipe.source,
-            tags=recipe.tags,
-            notes=recipe.notes,
-            is_favorite=recipe.is_favorite,
-            created_at=recipe.created_at,
-            updated_at=recipe.updated_at
+        response = _to_response(recipe)
+        response.possible_duplicates = await _duplicates_of(recipe)
+        return response
+    
+    except HTTPException:
+        raise
+    except GeminiUnavailableError as e:
+        headers = {"Retry-After": str(int(e.retry_after) + 1)} if e.retry_after else None
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recipe extraction is temporarily unavailable, please retry later",
+            headers=headers
         )
-        
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,6 +202,91 @@ async def extract_recipe(
         )
 
 
+@router.post("/extract/batch", response_model=RecipeBatchResponse)
+async def extract_recipes_batch(
+    batch: RecipeBatchCreate,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Extract several recipes from URLs, sharing Gemini requests between them"""
+    gemini_service = get_gemini_service()
+    
+    async def extract_one(item: RecipeCreate) -> RecipeBatchResult:
+        extractor = ExtractorFactory.get_extractor(item.url)
+        if not extractor:
+            return RecipeBatchResult(url=item.url, error="Unsupported URL type")
+        
+        try:
+            content = await extractor.extract(item.url)
+            recipe_info = content.get('structured_recipe')
+            if not recipe_info:
+                recipe_info = await gemini_service.extract_recipe_data_batched(content)
+        except Exception as e:
+            return RecipeBatchResult(url=item.url, error=f"Failed to process recipe: {str(e)}")
+        
+        if not recipe_info:
+            return RecipeBatchResult(url=item.url, error="Failed to extract recipe information")
+        
+        recipe = Recipe(
+            user_id=str(current_user.id),
+            **{
+                **recipe_info,
+                "images": recipe_info.get('images') or content.get('images', []),
+                "tags": item.tags if item.tags else [],
+                "notes": item.notes
+            }
+        )
+        await recipe.insert()
+        await record_change(recipe.user_id, None, RecipeFacets.of(recipe))
+        get_recommendation_service().recipe_saved(recipe)
+        background_tasks.add_task(get_semantic_search().recipe_saved, recipe)
+        _schedule_image_localization(background_tasks, recipe)
+        
+        response = _to_response(recipe)
+        response.possible_duplicates = await _duplicates_of(recipe)
+        return RecipeBatchResult(url=item.url, recipe=response)
+    
+    results = await asyncio.gather(*(extract_one(item) for item in batch.items))
+    
+    return RecipeBatchResponse(results=list(results))
+
+
+@router.post("/shopping-list", response_model=ShoppingListResponse)
+async def build_shopping_list(
+    request: ShoppingListRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Merge the ingredients of several recipes into one list grouped by store section"""
+    recipe_ids = {item.recipe_id for item in request.recipes if PydanticObjectId.is_valid(item.recipe_id)}
+    
+    # One round trip, and only the fields needed to shop
+    recipes = await Recipe.find(
+        {
+            "_id": {"$in": [PydanticObjectId(recipe_id) for recipe_id in recipe_ids]},
+            "user_id": str(current_user.id)
+        },
+        projection_model=RecipeIngredientsView
+    ).to_list()
+    by_id = {str(recipe.id): recipe for recipe in recipes}
+    
+    # A recipe planned for several meals is shopped for once per request item
+    builder = ShoppingListBuilder(request.system)
+    for item in request.recipes:
+        recipe = by_id.get(item.recipe_id)
+        if recipe is None:
+            continue
+        factor = item.servings / recipe.servings if item.servings and recipe.servings else 1.0
+        builder.add_recipe(item.recipe_id, recipe.ingredients, factor)
+    
+    return ShoppingListResponse(
+        categories=[
+            ShoppingListCategory(category=category, items=[ShoppingListItem(**item) for item in items])
+            for category, items in builder.build().items()
+        ],
+        missing_recipe_ids=[item.recipe_id for item in request.recipes if item.recipe_id not in by_id]
+    )
+
+
 @router.get("/", response_model=RecipeList)
 async def get_recipes(
     current_user: User = Depends(get_current_active_user),
@@ -96,11 +296,34 @@ async def get_recipes(
     recipe_type: Optional[str] = None,
     cuisine: Optional[str] = None,
     is_favorite: Optional[bool] = None,
-    tags: Optional[List[str]] = Query(None)
+    tags: Optional[List[str]] = Query(None),
+    diet: Optional[List[str]] = Query(None),
+    apply_restrictions: Optional[bool] = None,
+    filter_expression: Optional[str] = Query(None, alias="filter", max_length=500),
+    sort: Optional[str] = Query(None, max_length=50),
+    semantic: Optional[str] = Query(None, min_length=2, max_length=200)
 ):
-    """Get user's recipes with pagination and filtering"""
+    """Get user's recipes with pagination and filtering
+    
+    `diet` keeps recipes meeting every listed flag (vegan, gluten_free, ...).
+    `apply_restrictions` adds the user's dietary restrictions to it; it
+    defaults to the user's `auto_apply_dietary_restrictions` setting.
+    `filter` takes an expression such as
+    `total_time<=30 difficulty:easy cuisine:Italian,Mexican -tag:spicy` and
+    `sort` a field such as `cook_time` or `-created_at`; see
+    app/services/recipe_query.py for the syntax.
+    `semantic` ranks recipes by meaning ("something warm with lentils"),
+    fusing semantic and keyword rankings; other filters still apply.
+    """
+    try:
+        conditions = parse_filter(filter_expression) if filter_expression else []
+        sort_key = parse_sort(sort)
+    except QuerySyntaxError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
     # Build query
-    query_dict = {"user_id": str(current_user.id)}
+    user_id = str(current_user.id)
+    query_dict = {"user_id": user_id}
     
     if search:
         query_dict["$or"] = [
@@ -110,53 +333,69 @@ async def get_recipes(
         ]
     
     if recipe_type:
-        query_dict["recipe_type"] = recipe_type
+        conditions.append(Condition.equals("recipe_type", recipe_type))
     
     if cuisine:
-        query_dict["cuisine"] = cuisine
+        conditions.append(Condition.equals("cuisine", cuisine))
     
     if is_favorite is not None:
-        query_dict["is_favorite"] = is_favorite
+        conditions.append(Condition.equals("is_favorite", is_favorite))
     
     if tags:
-        query_dict["tags"] = {"$in": tags}
+        conditions.append(Condition.any_of("tags", tags))
+    
+    diet_mask = _diet_mask(diet or [])
+    if apply_restrictions is None:
+        apply_restrictions = current_user.auto_apply_dietary_restrictions
+    if apply_restrictions:
+        diet_mask |= labels_to_mask(current_user.dietary_restrictions)
+    if diet_mask:
+        conditions.append(Condition.all_bits("dietary_mask", diet_mask))
+    
+    # Only filter/sort expressions are checked against the library size; plain
+    # parameters keep working as they always have
+    library_size = 0
+    if filter_expression or sort:
+        library_size = (await get_library_stats(user_id)).total
+    settings = get_settings()
+    try:
+        plan = compile_query(
+            conditions, sort_key, library_size,
+            settings.recipe_query_scan_threshold, settings.recipe_query_memory_sort_limit
+        )
+    except UnindexedQueryError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    query_dict = plan.apply(query_dict)
     
     # Calculate pagination
     skip = (page - 1) * per_page
     
+    if semantic:
+        return await _semantic_recipes(query_dict, semantic, page, per_page)
+    
+    # Read-only: served by a secondary when a read preference is configured
+    database = get_database()
+    
     # Get total count
-    total = await Recipe.find(query_dict).count()
+    total = await database.count_for_read(Recipe, query_dict, hint=plan.hint)
+    
+    # A sort done in memory lists only its first max_results recipes
+    limit = per_page
+    if plan.max_results is not None:
+        total = min(total, plan.max_results)
+        limit = min(per_page, plan.max_results - skip)
     
     # Get recipes
-    recipes = await Recipe.find(query_dict).skip(skip).limit(per_page).sort("-created_at").to_list()
+    recipes = []
+    if limit > 0:
+        recipes = await database.find_for_read(
+            Recipe, query_dict, sort=plan.sort, skip=skip, limit=limit, hint=plan.hint
+        )
     
     # Convert to response format
     recipe_responses = []
     for recipe in recipes:
-        recipe_responses.append(RecipeResponse(
-            _id=str(recipe.id),
-            user_id=recipe.user_id,
-            title=recipe.title,
-            description=recipe.description,
-            recipe_type=recipe.recipe_type,
-            cuisine=recipe.cuisine,
-            dietary_info=recipe.dietary_info,
-            prep_time=recipe.prep_time,
-            cook_time=recipe.cook_time,
-            total_time=recipe.total_time,
-            servings=recipe.servings,
-            difficulty=recipe.difficulty,
-            ingredients=recipe.ingredients,
-            instructions=recipe.instructions,
-            nutrition=recipe.nutrition,
-            images=recipe.images,
-            source=recipe.source,
-            tags=recipe.tags,
-            notes=recipe.notes,
-            is_favorite=recipe.is_favorite,
-            created_at=recipe.created_at,
-            updated_at=recipe.updated_at
-        ))
+        recipe_responses.append(_to_response(recipe))
     
     total_pages = (total + per_page - 1) // per_page
     
@@ -169,12 +408,264 @@ async def get_recipes(
     )
 
 
+def _diet_mask(diet: List[str]) -> int:
+    unknown = [value for value in diet if parse_label(value) is None]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown dietary flags: {', '.join(unknown)}; "
+                   f"expected any of {', '.join(flag.value for flag in DietaryInfo)}"
+        )
+    return labels_to_mask(diet)
+
+
+async def _keyword_ranking(query_dict: dict, text: str, limit: int) -> List[str]:
+    """Recipe IDs matching any word of `text`, ranked by how many words they contain"""
+    words = list(dict.fromkeys(w for w in re.findall(r"[a-z0-9]+", text.lower()) if len(w) > 2))
+    if not words:
+        return []
+    
+    pattern = "|".join(re.escape(w) for w in words)
+    keywords = {"$or": [
+        {"title": {"$regex": pattern, "$options": "i"}},
+        {"description": {"$regex": pattern, "$options": "i"}},
+        {"tags": {"$regex": pattern, "$options": "i"}},
+        {"ingredients.name": {"$regex": pattern, "$options": "i"}}
+    ]}
+    # ANDed with the list filters, which may hold an `$or` of their own (`search=`)
+    matches = await Recipe.find(
+        {**query_dict, "$and": query_dict.get("$and", []) + [keywords]},
+        projection_model=RecipeTextView
+    ).limit(limit).to_list()
+    
+    def score(recipe: RecipeTextView) -> int:
+        title = recipe.title.lower()
+        body = recipe_text(recipe).lower()
+        return sum(2 * (w in title) + (w in body) for w in words)
+    
+    return [str(r.id) for r in sorted(matches, key=score, reverse=True)]
+
+
+async def _semantic_recipes(query_dict: dict, text: str, page: int, per_page: int) -> RecipeList:
+    """One page of recipes ranked by reciprocal rank fusion of semantic and keyword hits"""
+    limit = get_settings().semantic_search_candidates
+    semantic_hits = await get_semantic_search().search(query_dict["user_id"], text, limit)
+    ranking = reciprocal_rank_fusion([
+        [recipe_id for recipe_id, _ in semantic_hits],
+        await _keyword_ranking(query_dict, text, limit)
+    ])
+    
+    # Apply the remaining filters to the fused candidates
+    recipes = await Recipe.find({
+        **query_dict,
+        "_id": {"$in": [PydanticObjectId(recipe_id) for recipe_id in ranking]}
+    }).to_list()
+    position = {recipe_id: i for i, recipe_id in enumerate(ranking)}
+    recipes.sort(key=lambda r: position[str(r.id)])
+    
+    total = len(recipes)
+    skip = (page - 1) * per_page
+    return RecipeList(
+        recipes=[_to_response(r) for r in recipes[skip:skip + per_page]],
+        total=total,
+        page=page,
+        per_page=per_page,
+        pages=(total + per_page - 1) // per_page
+    )
+
+
+@router.get("/changes", response_model=RecipeChanges)
+async def get_recipe_changes(
+    current_user: User = Depends(get_current_active_user),
+    since: Optional[str] = Query(None, max_length=100),
+    limit: int = Query(100, ge=1, le=get_settings().sync_max_page_size)
+):
+    """Recipes created, updated or deleted since the `since` cursor
+    
+    Start without a cursor to get the whole library, then keep passing the
+    returned cursor. While `has_more` is true, call again right away. A 410
+    means the cursor is older than the kept deletion history, and the client
+    must start over without one.
+    """
+    try:
+        changes = await changes_since(str(current_user.id), since, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    
+    return RecipeChanges(
+        recipes=[_to_response(recipe) for recipe in changes.recipes],
+        deleted=[
+            RecipeTombstoneResponse(id=tombstone.recipe_id, deleted_at=tombstone.deleted_at)
+            for tombstone in changes.deleted
+        ],
+        cursor=changes.cursor.encode(),
+        has_more=changes.has_more
+    )
+
+
+@router.get("/events")
+async def stream_recipe_events(
+    current_user: User = Depends(get_current_active_user),
+    last_event_id: Optional[str] = Header(None, max_length=512)
+):
+    """Server-Sent Events stream of the user's recipe changes
+    
+    Events are `recipe.upserted` and `recipe.deleted`, with the recipe id.
+    Reconnect with `Last-Event-ID` to receive what was missed. A `reset` event
+    means events were lost, and the client should catch up through
+    `/recipes/changes`.
+    """
+    feed = get_change_feed()
+    if not feed.available:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live updates are not available"
+        )
+    
+    subscription = feed.subscribe(str(current_user.id), last_event_id)
+    if subscription is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many open event streams"
+        )
+    
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            async for message in subscription.messages(feed.heartbeat):
+                yield message
+        finally:
+            feed.unsubscribe(subscription)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Don't let nginx buffer the stream
+    })
+
+
+@router.get("/stats", response_model=LibraryStatsResponse)
+async def get_recipe_stats(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Recipe counts per type, cuisine, difficulty and tag, for dashboards and filter UIs"""
+    stats = await get_library_stats(str(current_user.id))
+    return LibraryStatsResponse(
+        total=stats.total,
+        favorites=stats.favorites,
+        recipe_types=decoded(stats.recipe_types),
+        cuisines=decoded(stats.cuisines),
+        difficulties=decoded(stats.difficulties),
+        tags=decoded(stats.tags),
+        updated_at=stats.updated_at
+    )
+
+
+@router.get("/tags", response_model=List[TagCount])
+async def autocomplete_tags(
+    current_user: User = Depends(get_current_active_user),
+    prefix: str = Query("", max_length=100),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """The user's tags starting with `prefix`, most used first"""
+    stats = await get_library_stats(str(current_user.id))
+    return [TagCount(tag=tag, count=count) for tag, count in complete_tags(stats, prefix, limit)]
+
+
+@router.get("/recommended", response_model=List[RecipeRecommendation])
+async def get_recommended_recipes(
+    current_user: User = Depends(get_current_active_user),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Recipes from the library that match the user's favorites and stated preferences"""
+    ranked = await get_recommendation_service().for_you(current_user, limit)
+    return [
+        RecipeRecommendation(id=recipe_id, title=title, score=round(score, 4))
+        for recipe_id, title, score in ranked
+    ]
+
+
 @router.get("/{recipe_id}", response_model=RecipeResponse)
 async def get_recipe(
     recipe_id: str,
     current_user: User = Depends(get_current_active_user)
 ):
     """Get a specific recipe"""
+    recipe = await get_database().find_one_for_read(Recipe, {
+        "_id": recipe_id,
+        "user_id": str(current_user.id)
+    })
+    
+    if not recipe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    
+    return _to_response(recipe)
+
+
+@router.get("/{recipe_id}/scaled", response_model=RecipeResponse)
+async def get_scaled_recipe(
+    recipe_id: str,
+    current_user: User = Depends(get_current_active_user),
+    servings: Optional[int] = Query(None, ge=1, le=1000),
+    system: Optional[str] = Query(None, pattern=f"^({METRIC}|{IMPERIAL})$")
+):
+    """Get a recipe scaled to a number of servings and/or converted to metric or imperial units"""
+    recipe = await get_database().find_one_for_read(Recipe, {
+        "_id": recipe_id,
+        "user_id": str(current_user.id)
+    })
+    
+    if not recipe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    
+    if servings and not recipe.servings:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Recipe has no servings count to scale from"
+        )
+    
+    response = _to_response(recipe)
+    response.ingredients = get_scaling_cache().get_or_compute(recipe, servings, system)
+    if servings:
+        response.servings = servings
+    
+    return response
+
+
+@router.get("/{recipe_id}/similar", response_model=List[RecipeRecommendation])
+async def get_similar_recipes(
+    recipe_id: str,
+    current_user: User = Depends(get_current_active_user),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Recipes in the library most similar to this one"""
+    service = get_recommendation_service()
+    index = await service.index_for(str(current_user.id))
+    if recipe_id not in index:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recipe not found"
+        )
+    
+    return [
+        RecipeRecommendation(id=similar_id, title=title, score=round(score, 4))
+        for similar_id, title, score in await service.similar(str(current_user.id), recipe_id, limit)
+    ]
+
+
+@router.get("/{recipe_id}/duplicates", response_model=List[RecipeDuplicate])
+async def get_recipe_duplicates(
+    recipe_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """List recipes in the library that are probably the same dish"""
     recipe = await Recipe.find_one({
         "_id": recipe_id,
         "user_id": str(current_user.id)
@@ -186,36 +677,14 @@ async def get_recipe(
             detail="Recipe not found"
         )
     
-    return RecipeResponse(
-        _id=str(recipe.id),
-        user_id=recipe.user_id,
-        title=recipe.title,
-        description=recipe.description,
-        recipe_type=recipe.recipe_type,
-        cuisine=recipe.cuisine,
-        dietary_info=recipe.dietary_info,
-        prep_time=recipe.prep_time,
-        cook_time=recipe.cook_time,
-        total_time=recipe.total_time,
-        servings=recipe.servings,
-        difficulty=recipe.difficulty,
-        ingredients=recipe.ingredients,
-        instructions=recipe.instructions,
-        nutrition=recipe.nutrition,
-        images=recipe.images,
-        source=recipe.source,
-        tags=recipe.tags,
-        notes=recipe.notes,
-        is_favorite=recipe.is_favorite,
-        created_at=recipe.created_at,
-        updated_at=recipe.updated_at
-    )
+    return await _duplicates_of(recipe)
 
 
 @router.put("/{recipe_id}", response_model=RecipeResponse)
 async def update_recipe(
     recipe_id: str,
     recipe_update: RecipeUpdate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
     """Update a recipe"""
@@ -231,42 +700,24 @@ async def update_recipe(
         )
     
     # Update fields
+    before = RecipeFacets.of(recipe)
     update_data = recipe_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(recipe, field, value)
     
     recipe.updated_at = datetime.utcnow()
     await recipe.save()
+    await record_change(recipe.user_id, before, RecipeFacets.of(recipe))
+    get_recommendation_service().recipe_saved(recipe)
+    background_tasks.add_task(get_semantic_search().recipe_saved, recipe)
     
-    return RecipeResponse(
-        _id=str(recipe.id),
-        user_id=recipe.user_id,
-        title=recipe.title,
-        description=recipe.description,
-        recipe_type=recipe.recipe_type,
-        cuisine=recipe.cuisine,
-        dietary_info=recipe.dietary_info,
-        prep_time=recipe.prep_time,
-        cook_time=recipe.cook_time,
-        total_time=recipe.total_time,
-        servings=recipe.servings,
-        difficulty=recipe.difficulty,
-        ingredients=recipe.ingredients,
-        instructions=recipe.instructions,
-        nutrition=recipe.nutrition,
-        images=recipe.images,
-        source=recipe.source,
-        tags=recipe.tags,
-        notes=recipe.notes,
-        is_favorite=recipe.is_favorite,
-        created_at=recipe.created_at,
-        updated_at=recipe.updated_at
-    )
+    return _to_response(recipe)
 
 
 @router.delete("/{recipe_id}")
 async def delete_recipe(
     recipe_id: str,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete a recipe"""
@@ -282,5 +733,9 @@ async def delete_recipe(
         )
     
     await recipe.delete()
+    await RecipeTombstone(user_id=recipe.user_id, recipe_id=str(recipe.id)).insert()
+    await record_change(recipe.user_id, RecipeFacets.of(recipe), None)
+    get_recommendation_service().recipe_deleted(recipe.user_id, str(recipe.id))
+    background_tasks.add_task(get_semantic_search().recipe_deleted, recipe.user_id, str(recipe.id))
     
     return {"message": "Recipe deleted successfully"}
\ No newline at end of file
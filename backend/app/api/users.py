@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
 from app.core.security import get_current_active_user
+from app.services.account_deletion import request_account_deletion
 
 router = APIRouter()
 
@@ -21,6 +22,7 @@ async def get_current_user_info(
         is_verified=current_user.is_verified,
         preferred_cuisines=current_user.preferred_cuisines,
         dietary_restrictions=current_user.dietary_restrictions,
+        auto_apply_dietary_restrictions=current_user.auto_apply_dietary_restrictions,
         created_at=current_user.created_at,
         last_login=current_user.last_login
     )
@@ -49,21 +51,25 @@ async def update_current_user(
         is_verified=current_user.is_verified,
         preferred_cuisines=current_user.preferred_cuisines,
         dietary_restrictions=current_user.dietary_restrictions,
+        auto_apply_dietary_restrictions=current_user.auto_apply_dietary_restrictions,
         created_at=current_user.created_at,
         last_login=current_user.last_login
     )
 
 
-@router.delete("/me")
+@router.delete("/me", status_code=status.HTTP_202_ACCEPTED)
 async def delete_current_user(
     current_user: User = Depends(get_current_active_user)
 ):
-    """Delete current user account"""
-    # Delete all user's recipes first
-    from app.models.recipe import Recipe
-    await Recipe.find({"user_id": str(current_user.id)}).delete()
+    """Delete current user account
     
-    # Delete user
-    await current_user.delete()
+    The account is deactivated immediately; its recipes and derived data are
+    removed in the background.
+    """
+    job = await request_account_deletion(current_user)
     
-    return {"message": "User account deleted successfully"}
\ No newline at end of file
+    return {
+        "message": "User account scheduled for deletion",
+        "deletion_id": str(job.id),
+        "recipes_total": job.recipes_total
+    }
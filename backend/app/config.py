@@ -6,6 +6,20 @@ from functools import lru_cache
 class Settings(BaseSettings):
     # MongoDB
     mongodb_url: str = "mongodb://localhost:27017/smart_recipe_keeper"
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 10  # Also the number of connections opened at startup
+    mongodb_max_idle_time_ms: int = 300000
+    mongodb_server_selection_timeout_ms: int = 5000
+    mongodb_connect_timeout_ms: int = 10000
+    mongodb_wait_queue_timeout_ms: Optional[int] = None  # Fail checkouts from a saturated pool after this long
+    mongodb_compressors: List[str] = ["zstd", "snappy", "zlib"]  # Preference order; needs zstandard / python-snappy
+    mongodb_read_preference: str = "primary"  # For read-only list/get endpoints, e.g. secondaryPreferred
+    mongodb_max_staleness_seconds: int = -1  # Skip secondaries lagging more than this (-1: no limit, else >= 90)
+    mongodb_ping_timeout: float = 2.0  # Readiness probe
+    mongodb_monitoring_enabled: bool = True  # Command latency histograms and slow-query log
+    mongodb_slow_query_ms: float = 100.0
+    mongodb_explain_sample_rate: float = 0.1  # Share of slow queries re-run through explain
+    mongodb_explain_interval_seconds: float = 300.0  # At most one explain per query shape in this window
     
     # API Configuration
     api_host: str = "0.0.0.0"
@@ -20,6 +34,108 @@ class Settings(BaseSettings):
     
     # Google Gemini API
     gemini_api_key: Optional[str] = None
+    gemini_model: str = "gemini-1.5-flash"
+    gemini_structured_output: bool = True  # JSON mode with a response schema
+    gemini_max_repair_attempts: int = 2
+    gemini_batch_window_ms: int = 50  # How long to collect extractions into one request
+    gemini_batch_max_tokens: int = 12000
+    gemini_batch_max_items: int = 8
+    gemini_request_timeout: float = 60.0  # Seconds per attempt
+    gemini_max_retries: int = 3  # Retries for transient errors (429/5xx/timeouts)
+    gemini_retry_base_delay: float = 0.5
+    gemini_retry_max_delay: float = 8.0
+    gemini_breaker_failure_threshold: int = 5
+    gemini_breaker_reset_seconds: float = 30.0
+    gemini_max_concurrency: int = 4
+    gemini_requests_per_minute: int = 60  # Match the API key's quota
+    gemini_hedge_requests: bool = False  # Send a second request after the p95 latency
+    gemini_hedge_min_samples: int = 20
+    gemini_prompt_token_budget: int = 1500  # Page text tokens sent per extraction
+    
+    # Content Extraction
+    extractor_max_text_chars: int = 60000  # Page text kept for windowing
+    extractor_streaming: bool = True  # Single-pass parse that stops at a complete recipe
+    extractor_max_page_bytes: int = 5 * 1024 * 1024
+    extraction_rules_dir: Optional[str] = None  # Defaults to the bundled rule packs
+    extraction_rules_reload_seconds: float = 5.0
+    http_cache_enabled: bool = True
+    http_cache_dir: str = ".cache/http"
+    http_cache_max_mb: int = 256
+    
+    # Images
+    image_pipeline_enabled: bool = True  # Download and serve thumbnails instead of hotlinking
+    image_storage_dir: str = "data/images"
+    image_thumbnail_sizes: List[int] = [160, 480, 1080]  # Widths in pixels
+    image_max_download_bytes: int = 10 * 1024 * 1024
+    image_download_concurrency: int = 6
+    image_worker_processes: int = 2
+    image_dedupe_distance: int = 6  # Max differing perceptual-hash bits for a duplicate
+    
+    # Recipe scaling
+    scaling_cache_size: int = 4096  # Scaled ingredient lists kept in memory
+    
+    # Duplicate detection
+    duplicate_minhash_permutations: int = 96
+    duplicate_lsh_bands: int = 32  # 3 rows per band: pairs at Jaccard 0.4 collide ~88% of the time
+    duplicate_similarity_threshold: float = 0.4  # Estimated Jaccard to report a duplicate
+    duplicate_max_candidates: int = 200  # Candidates sharing the most bands are scored first
+    duplicate_backfill_batch_size: int = 500  # Recipes signed per batch when older recipes lack a signature
+    duplicate_backfill_pause_seconds: float = 0.1
+    
+    # Recommendations
+    recommendation_term_dim: int = 2048  # Hashed ingredient/tag features per recipe
+    recommendation_cuisine_buckets: int = 64
+    recommendation_preference_boost: float = 0.15  # Added to cosine scores for preferred cuisines/diets
+    recommendation_max_indexes: int = 1000  # Per-user indexes kept in memory
+    
+    # Semantic search
+    semantic_search_model: Optional[str] = "sentence-transformers/all-MiniLM-L6-v2"  # Falls back to hashed features
+    semantic_index_dir: str = "data/semantic"
+    semantic_search_candidates: int = 100  # Semantic and keyword hits fused per query
+    semantic_max_indexes: int = 500  # Per-user indexes kept in memory
+    
+    # Delta sync
+    sync_tombstone_ttl_days: int = 30  # Older sync cursors must resync from scratch
+    sync_settle_seconds: float = 1.0  # Changes younger than this wait for the next sync
+    sync_max_page_size: int = 500
+    
+    # Live change feed (Server-Sent Events); needs MongoDB running as a replica set
+    change_feed_enabled: bool = True
+    change_feed_client_buffer: int = 100  # Clients further behind are reset and disconnected
+    change_feed_history_size: int = 5000  # Recent events kept for Last-Event-ID resumes
+    change_feed_heartbeat_seconds: float = 15.0
+    change_feed_max_connections_per_user: int = 5
+    
+    # Recipe list queries
+    recipe_query_scan_threshold: int = 2000  # Larger libraries reject filter expressions no index can narrow
+    recipe_query_memory_sort_limit: int = 1000  # Results listed when a filtered query is sorted in memory
+    
+    # Dietary flags
+    dietary_backfill_batch_size: int = 500  # Recipes re-scanned per batch after a rules change
+    dietary_backfill_pause_seconds: float = 0.1
+    
+    # Library statistics
+    library_stats_reconcile_seconds: int = 86400  # Recount each user's stats this often
+    library_stats_reconcile_poll_seconds: float = 300.0
+    library_stats_reconcile_pause_seconds: float = 0.5  # Between users, to spread the load
+    
+    # Account deletion
+    account_deletion_batch_size: int = 500  # Recipes removed per delete
+    account_deletion_batch_pause_seconds: float = 0.2  # Throttle between batches
+    account_deletion_poll_seconds: float = 30.0  # How often the janitor looks for new or abandoned jobs
+    account_deletion_lease_seconds: int = 120  # A job's janitor must renew within this or lose it
+    
+    # Startup
+    warm_up_on_startup: bool = True  # Load deferred modules in the background after boot
+    preload_modules: bool = False  # Load them when app.main is imported (gunicorn --preload)
+    
+    # Profiling
+    profiling_secret: Optional[str] = None  # HMAC key for signed X-Debug-Profile headers
+    profiling_sample_rate: float = 0.0  # Share of all requests profiled
+    profiling_interval_ms: float = 5.0
+    profiling_output_dir: str = "data/profiles"
+    profiling_max_profiles: int = 200  # Older profiles are deleted as new ones are written
+    profiling_max_age_hours: float = 72.0
     
     # CORS
     frontend_url: str = "http://localhost:3000"
@@ -27,6 +143,12 @@ class Settings(BaseSettings):
     
     # External APIs (for future use)
     youtube_api_key: Optional[str] = None
+    youtube_api_base_url: str = "https://www.googleapis.com/youtube/v3"
+    youtube_transcript_url: str = "https://www.youtube.com/api/timedtext"
+    youtube_transcript_languages: List[str] = ["en", "en-US", "en-GB"]
+    youtube_transcript_cache_size: int = 1024  # Transcripts kept in memory, keyed by video ID
+    youtube_transcript_cache_ttl: int = 86400  # Seconds
+    youtube_transcript_token_budget: int = 1500  # Transcript tokens sent per extraction
     instagram_client_id: Optional[str] = None
     instagram_client_secret: Optional[str] = None
     
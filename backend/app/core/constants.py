@@ -39,6 +39,26 @@ class DietaryInfo(str, Enum):
     PESCATARIAN = "pescatarian"
 
 
+# Bit of each flag in Recipe.dietary_mask. Stored in the database: never
+# renumber, only append, and bump DIETARY_RULES_VERSION so recipes are rescanned.
+DIETARY_BITS = {
+    DietaryInfo.VEGETARIAN: 1 << 0,
+    DietaryInfo.VEGAN: 1 << 1,
+    DietaryInfo.GLUTEN_FREE: 1 << 2,
+    DietaryInfo.DAIRY_FREE: 1 << 3,
+    DietaryInfo.NUT_FREE: 1 << 4,
+    DietaryInfo.LOW_CARB: 1 << 5,
+    DietaryInfo.KETO: 1 << 6,
+    DietaryInfo.PALEO: 1 << 7,
+    DietaryInfo.HALAL: 1 << 8,
+    DietaryInfo.KOSHER: 1 << 9,
+    DietaryInfo.PESCATARIAN: 1 << 10,
+}
+
+# Bump whenever the label or ingredient rules in app.utils.dietary change
+DIETARY_RULES_VERSION = 2
+
+
 # Recipe type descriptions for better categorization
 RECIPE_TYPE_DESCRIPTIONS = {
     RecipeType.APPETIZER: "Small dishes served before the main course",
@@ -0,0 +1,259 @@
+"""MongoDB connection layer: pooled client, read routing and readiness checks"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from beanie import Document, init_beanie
+from beanie.odm.utils.parsing import parse_obj
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred
+)
+
+from app.config import get_settings
+from app.core.monitoring import get_command_monitor
+
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def make_read_preference(mode: str, max_staleness: int = -1):
+    """pymongo read preference for a mode name such as 'secondaryPreferred'"""
+    try:
+        preference = READ_PREFERENCES[mode]
+    except KeyError:
+        raise ValueError(
+            f"Unknown read preference {mode!r}; expected one of {', '.join(READ_PREFERENCES)}"
+        )
+    return preference() if preference is Primary else preference(max_staleness=max_staleness)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection counts per server, kept from the driver's connection pool events
+    
+    Callbacks run on driver threads, hence the lock.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._open: Dict[str, int] = defaultdict(int)
+        self._checked_out: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._checkout_failures: Dict[str, int] = defaultdict(int)
+    
+    def stats(self, max_pool_size: int) -> Dict[str, Any]:
+        """Pool usage per server plus the saturation of the busiest one"""
+        with self._lock:
+            servers = {
+                address: {
+                    "open": self._open[address],
+                    "checked_out": self._checked_out[address],
+                    "waiting": self._waiting[address],
+                    "checkout_failures": self._checkout_failures[address],
+                    "saturation": round(self._checked_out[address] / max_pool_size, 3) if max_pool_size else 0.0,
+                }
+                for address in sorted(set(self._open) | set(self._checked_out))
+            }
+        return {
+            "max_pool_size": max_pool_size,
+            "saturation": max((s["saturation"] for s in servers.values()), default=0.0),
+            "waiting": sum(s["waiting"] for s in servers.values()),
+            "servers": servers,
+        }
+    
+    def _change(self, counter: Dict[str, int], address, delta: int) -> None:
+        with self._lock:
+            counter[f"{address[0]}:{address[1]}"] += delta
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        pass
+    
+    def pool_closed(self, event):
+        key = f"{event.address[0]}:{event.address[1]}"
+        with self._lock:
+            for counter in (self._open, self._checked_out, self._waiting):
+                counter.pop(key, None)
+    
+    def connection_created(self, event):
+        self._change(self._open, event.address, 1)
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._change(self._open, event.address, -1)
+    
+    def connection_check_out_started(self, event):
+        self._change(self._waiting, event.address, 1)
+    
+    def connection_check_out_failed(self, event):
+        self._change(self._waiting, event.address, -1)
+        self._change(self._checkout_failures, event.address, 1)
+    
+    def connection_checked_out(self, event):
+        self._change(self._waiting, event.address, -1)
+        self._change(self._checked_out, event.address, 1)
+    
+    def connection_checked_in(self, event):
+        self._change(self._checked_out, event.address, -1)
+
+
+class Database:
+    """The process-wide Motor client, configured from settings
+    
+    Writes and ordinary reads use the primary. Read-only list/get endpoints go
+    through `find_for_read` / `count_for_read`, which honour
+    `mongodb_read_preference` so they can be served by secondaries.
+    """
+    
+    def __init__(self):
+        settings = get_settings()
+        self.url = settings.mongodb_url
+        self.max_pool_size = settings.mongodb_max_pool_size
+        self.min_pool_size = settings.mongodb_min_pool_size
+        self.ping_timeout = settings.mongodb_ping_timeout
+        self.read_preference = make_read_preference(
+            settings.mongodb_read_preference, settings.mongodb_max_staleness_seconds
+        )
+        self.routes_reads = settings.mongodb_read_preference != "primary"
+        self.client_options: Dict[str, Any] = {
+            "maxPoolSize": settings.mongodb_max_pool_size,
+            "minPoolSize": settings.mongodb_min_pool_size,
+            "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+            "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+            "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+            "appname": "smart-recipe-keeper",
+        }
+        if settings.mongodb_wait_queue_timeout_ms:
+            self.client_options["waitQueueTimeoutMS"] = settings.mongodb_wait_queue_timeout_ms
+        if settings.mongodb_compressors:
+            # The driver skips compressors whose libraries are not installed
+            self.client_options["compressors"] = ",".join(settings.mongodb_compressors)
+        
+        self.pool_monitor = PoolMonitor()
+        self.command_monitor = get_command_monitor() if settings.mongodb_monitoring_enabled else None
+        self.client: Optional[AsyncIOMotorClient] = None
+        self.database: Optional[AsyncIOMotorDatabase] = None
+    
+    async def connect(self, document_models: Sequence[Type[Document]]) -> None:
+        """Create the client, initialize Beanie and open `min_pool_size` connections"""
+        listeners = [self.pool_monitor]
+        if self.command_monitor is not None:
+            listeners.append(self.command_monitor)
+        self.client = AsyncIOMotorClient(self.url, event_listeners=listeners, **self.client_options)
+        if self.command_monitor is not None:
+            self.command_monitor.attach(self.client, asyncio.get_running_loop())
+        self.database = self.client.get_default_database()
+        await init_beanie(database=self.database, document_models=list(document_models))
+        await self.warm_pool()
+    
+    async def warm_pool(self) -> None:
+        """Open connections up front so the first requests don't pay for handshakes
+        
+        Concurrent pings each check out their own connection; a failure here is
+        logged, not raised, so the app can still start while MongoDB comes up.
+        """
+        count = max(1, self.min_pool_size)
+        try:
+            await asyncio.gather(*(self.client.admin.command("ping") for _ in range(count)))
+        except Exception as e:
+            print(f"MongoDB pool warm-up failed: {e}")
+    
+    def close(self) -> None:
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.database = None
+    
+    async def readiness(self) -> Dict[str, Any]:
+        """Ping MongoDB and report round-trip time and pool usage"""
+        report: Dict[str, Any] = {"ready": False, "pool": self.pool_monitor.stats(self.max_pool_size)}
+        if self.client is None:
+            report["error"] = "not connected"
+            return report
+        
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.client.admin.command("ping"), timeout=self.ping_timeout)
+        except Exception as e:
+            report["error"] = str(e) or type(e).__name__
+            return report
+        report["ready"] = True
+        report["ping_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+    
+    def read_collection(self, document_model: Type[Document]):
+        """The model's collection with the read-only endpoints' read preference"""
+        return document_model.get_motor_collection().with_options(read_preference=self.read_preference)
+    
+    async def find_for_read(
+        self,
+        document_model: Type[Document],
+        query: Dict[str, Any],
+        sort: Optional[List[tuple]] = None,
+        skip: int = 0,
+        limit: int = 0,
+        hint: Optional[List[tuple]] = None
+    ) -> List[Document]:
+        """Documents matching `query`, read with the configured read preference"""
+        options = {"hint": hint} if hint else {}
+        if not self.routes_reads:
+            return await document_model.find(
+                query, sort=sort, skip=skip or None, limit=limit or None, **options
+            ).to_list()
+        
+        # Encode the filter exactly as Beanie would for document_model.find(query)
+        filter_query = document_model.find(query).get_filter_query()
+        cursor = self.read_collection(document_model).find(
+            filter_query, sort=sort, skip=skip, limit=limit, **options
+        )
+        return [parse_obj(document_model, doc) for doc in await cursor.to_list(length=None)]
+    
+    async def find_one_for_read(
+        self,
+        document_model: Type[Document],
+        query: Dict[str, Any]
+    ) -> Optional[Document]:
+        documents = await self.find_for_read(document_model, query, limit=1)
+        return documents[0] if documents else None
+    
+    async def count_for_read(
+        self,
+        document_model: Type[Document],
+        query: Dict[str, Any],
+        hint: Optional[List[tuple]] = None
+    ) -> int:
+        if not self.routes_reads and not hint:
+            return await document_model.find(query).count()
+        filter_query = document_model.find(query).get_filter_query()
+        collection = self.read_collection(document_model) if self.routes_reads else document_model.get_motor_collection()
+        if hint:
+            return await collection.count_documents(filter_query, hint=hint)
+        return await collection.count_documents(filter_query)
+
+
+@lru_cache()
+def get_database() -> Database:
+    """Get the process-wide database connection"""
+    return Database()
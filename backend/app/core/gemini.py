@@ -1,67 +1,34 @@
-import google.generativeai as genai
-from typing import Dict, Any, Optional
 import json
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 from app.config import get_settings
-from app.schemas.recipe import RecipeBase
+from app.core.gemini_batch import GeminiBatcher
+from app.core.resilience import (
+    CircuitBreaker,
+    GeminiUnavailableError,
+    RateGovernor,
+    ResilientCaller,
+    RetryPolicy
+)
+from app.core.structured_output import (
+    IncrementalJSONParser,
+    RecipeParseError,
+    batch_response_schema,
+    recipe_response_schema,
+    validate_recipe_data
+)
+from app.utils.content_window import estimate_tokens, select_recipe_window
 
 
-class GeminiService:
-    """Service for interacting with Google Gemini API"""
-    
-    def __init__(self):
-        settings = get_settings()
-        if settings.gemini_api_key:
-            genai.configure(api_key=settings.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        else:
-            self.model = None
-    
-    async def extract_recipe_data(self, content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Extract structured recipe data from raw content using Gemini"""
-        
-        if not self.model:
-            raise ValueError("Gemini API key not configured")
-        
-        # Prepare the prompt
-        prompt = self._create_extraction_prompt(content)
-        
-        try:
-            response = self.model.generate_content(prompt)
-            
-            # Parse the response
-            recipe_data = self._parse_gemini_response(response.text)
-            
-            # Merge with any existing structured data
-            if content.get('recipe_data'):
-                recipe_data = self._merge_recipe_data(recipe_data, content['recipe_data'])
-            
-            # Add source information
-            recipe_data['source'] = {
-                'type': content.get('content_type', 'website'),
-                'url': content.get('url', ''),
-                'platform': content.get('platform_data', {}).get('platform', 'web')
-            }
-            
-            return recipe_data
-            
-        except Exception as e:
-            print(f"Gemini extraction error: {str(e)}")
-            return None
-    
-    def _create_extraction_prompt(self, content: Dict[str, Any]) -> str:
-        """Create a prompt for Gemini to extract recipe data"""
-        
-        prompt = f"""
-        Extract recipe information from the following content and return it as a valid JSON object.
-        
-        Content Title: {content.get('title', '')}
-        Content Description: {content.get('description', '')}
-        
-        Raw Content:
-        {content.get('raw_content', '')[:5000]}  # Limit content length
-        
-        Please extract and structure the following information in JSON format:
-        {{
+# schema.org Recipe properties worth passing to the model
+SCHEMA_ORG_PROMPT_FIELDS = (
+    "name", "description", "recipeCategory", "recipeCuisine", "recipeYield",
+    "prepTime", "cookTime", "totalTime", "recipeIngredient", "recipeInstructions",
+    "nutrition", "keywords", "suitableForDiet",
+)
+
+RECIPE_JSON_FORMAT = """
+        {
             "title": "Recipe title",
             "description": "Brief description of the recipe",
             "recipe_type": "One of: appetizer, main_course, side_dish, soup, salad, dessert, beverage, sauce, bread, snack",
@@ -73,60 +40,297 @@ class GeminiService:
             "servings": "Number of servings (number only)",
             "difficulty": "One of: easy, medium, hard",
             "ingredients": [
-                {{
+                {
                     "name": "Ingredient name",
                     "quantity": "Amount (e.g., 2, 1/2)",
                     "unit": "Unit of measurement (e.g., cups, tbsp, grams)",
                     "notes": "Optional notes (e.g., 'diced', 'room temperature')"
-                }}
+                }
             ],
             "instructions": [
-                {{
+                {
                     "step_number": 1,
                     "instruction": "Step description",
                     "time": "Optional time in minutes for this step"
-                }}
+                }
             ],
-            "nutrition": {{
+            "nutrition": {
                 "calories": "Number of calories per serving",
                 "protein": "Protein in grams",
                 "carbs": "Carbohydrates in grams",
                 "fat": "Fat in grams"
-            }},
+            },
             "tags": ["Array of relevant tags"],
             "notes": "Any additional notes or tips"
-        }}
-        
+        }
+"""
+
+# In structured mode the response schema already describes the fields
+STRUCTURED_RULES = """
+        Important:
+        - Extract only factual information present in the content
+        - Use null for missing information
+        - recipe_type is one of: appetizer, main_course, side_dish, soup, salad, dessert, beverage, sauce, bread, snack
+        - difficulty is one of: easy, medium, hard
+        - Times are in minutes
+"""
+
+FREE_TEXT_RULES = """
         Important:
         - Extract only factual information present in the content
         - Use null for missing information
         - Ensure all numeric values are numbers, not strings
         - Return only valid JSON without any additional text or formatting
+"""
+
+
+class GeminiService:
+    """Service for interacting with Google Gemini API"""
+    
+    def __init__(self, model: Optional[Any] = None):
+        settings = get_settings()
+        self.prompt_token_budget = settings.gemini_prompt_token_budget
+        self.structured_output = settings.gemini_structured_output
+        self.max_repair_attempts = settings.gemini_max_repair_attempts
+        if model is not None:
+            # Any object with a compatible generate_content, e.g. a local fake for tests
+            self.model = model
+        elif settings.gemini_api_key:
+            # Imported here: the SDK takes longer to import than the rest of the app
+            import google.generativeai as genai
+            
+            genai.configure(api_key=settings.gemini_api_key)
+            self.model = genai.GenerativeModel(settings.gemini_model)
+        else:
+            self.model = None
+        
+        self.caller = ResilientCaller(
+            retry_policy=RetryPolicy(
+                max_attempts=settings.gemini_max_retries + 1,
+                base_delay=settings.gemini_retry_base_delay,
+                max_delay=settings.gemini_retry_max_delay
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=settings.gemini_breaker_failure_threshold,
+                reset_timeout=settings.gemini_breaker_reset_seconds
+            ),
+            governor=RateGovernor(
+                max_concurrency=settings.gemini_max_concurrency,
+                requests_per_minute=settings.gemini_requests_per_minute
+            ),
+            timeout=settings.gemini_request_timeout,
+            hedge=settings.gemini_hedge_requests,
+            hedge_min_samples=settings.gemini_hedge_min_samples
+        )
+        
+        self.batcher = GeminiBatcher(
+            self,
+            window_seconds=settings.gemini_batch_window_ms / 1000,
+            max_batch_tokens=settings.gemini_batch_max_tokens,
+            max_batch_size=settings.gemini_batch_max_items
+        )
+    
+    async def extract_recipe_data(self, content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract structured recipe data from raw content using Gemini"""
+        
+        if not self.model:
+            raise ValueError("Gemini API key not configured")
+        
+        # Prepare the prompt
+        prompt = self._create_extraction_prompt(content)
+        
+        try:
+            # Generate, parse and validate, repairing bad output a bounded number of times
+            recipe_data = await self._generate_recipe(prompt)
+            return self._finalize_recipe_data(recipe_data, content)
+        
+        except GeminiUnavailableError:
+            # Let callers distinguish an upstream outage from unusable content
+            raise
+        except Exception as e:
+            print(f"Gemini extraction error: {str(e)}")
+            return None
+    
+    async def extract_recipe_data_batched(self, content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Extract recipe data, sharing one model request with other pending extractions"""
+        
+        if not self.model:
+            raise ValueError("Gemini API key not configured")
+        
+        return await self.batcher.submit(content)
+    
+    async def extract_recipe_batch(self, contents: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Extract several recipes with a single multi-document request.
+        
+        Returns the validated recipes keyed by their position in `contents`; documents
+        missing from the response or failing validation are left out for the caller
+        to retry individually.
+        """
+        prompt = self._create_batch_prompt(contents)
+        parser = await self.caller.call(
+            self._stream_json, prompt, self._generation_config(batch_response_schema())
+        )
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        for entry in parser.result().get('recipes') or []:
+            if not isinstance(entry, dict):
+                continue
+            document_id = entry.pop('document_id', None)
+            if not isinstance(document_id, int) or not 1 <= document_id <= len(contents):
+                continue
+            try:
+                recipe_data = validate_recipe_data(entry)
+            except RecipeParseError:
+                continue
+            results[document_id - 1] = self._finalize_recipe_data(
+                recipe_data, contents[document_id - 1]
+            )
+        
+        return results
+    
+    async def _generate_recipe(self, prompt: str) -> Dict[str, Any]:
+        """Call the model and validate its output, retrying with a repair prompt on failure"""
+        attempt_prompt = prompt
+        last_error: Optional[RecipeParseError] = None
+        
+        for _ in range(self.max_repair_attempts + 1):
+            parser = await self.caller.call(
+                self._stream_json, attempt_prompt, self._generation_config(recipe_response_schema())
+            )
+            try:
+                return validate_recipe_data(parser.result())
+            except RecipeParseError as e:
+                last_error = e
+                attempt_prompt = self._create_repair_prompt(prompt, parser.text, e)
+        
+        raise last_error
+    
+    def _stream_json(
+        self,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]]
+    ) -> IncrementalJSONParser:
+        """Stream the model response into a parser, stopping once the object is closed.
+        
+        Blocking; runs in a worker thread via the resilient caller.
+        """
+        parser = IncrementalJSONParser()
+        response = self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        )
+        for chunk in response:
+            if parser.feed(chunk.text) is not None:
+                break
+        return parser
+    
+    def _generation_config(self, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Generation config requesting schema-constrained JSON output"""
+        if not self.structured_output:
+            return None
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": schema
+        }
+    
+    def _finalize_recipe_data(self, recipe_data: Dict[str, Any], content: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge page metadata into validated recipe data"""
+        # Merge with any existing structured data
+        if content.get('recipe_data'):
+            recipe_data = self._merge_recipe_data(recipe_data, content['recipe_data'])
+        
+        # Add source information
+        recipe_data['source'] = {
+            'type': content.get('content_type', 'website'),
+            'url': content.get('url', ''),
+            'platform': content.get('platform_data', {}).get('platform', 'web')
+        }
+        
+        return recipe_data
+    
+    def _format_rules(self) -> str:
+        """Output format instructions shared by single and batch prompts"""
+        if self.structured_output:
+            return STRUCTURED_RULES
+        return f"""
+        Please extract and structure the following information in JSON format:
+        {RECIPE_JSON_FORMAT}
+        {FREE_TEXT_RULES}"""
+    
+    def _format_document(self, content: Dict[str, Any], token_budget: int) -> str:
+        """Render one piece of content for a prompt"""
+        # Page structured data is the densest source; it comes out of the same budget
+        structured = self._format_structured_data(content.get('recipe_data') or {})
+        token_budget = max(0, token_budget - estimate_tokens(structured))
+        
+        # Keep only the most recipe-like parts of the page within the token budget
+        raw_content = select_recipe_window(content.get('raw_content', ''), token_budget)
+        
+        return f"""
+        Content Title: {content.get('title', '')}
+        Content Description: {content.get('description', '')}
+        {structured}
+        Raw Content:
+        {raw_content}
+        """
+    
+    def _format_structured_data(self, schema_data: Dict[str, Any]) -> str:
+        """Render the recipe-relevant schema.org fields found on the page"""
+        fields = {k: schema_data[k] for k in SCHEMA_ORG_PROMPT_FIELDS if schema_data.get(k)}
+        if not fields:
+            return ""
+        
+        return f"""
+        Structured Data (schema.org Recipe):
+        {json.dumps(fields, ensure_ascii=False, default=str)[:self.prompt_token_budget * 2]}
+        """
+    
+    def _create_extraction_prompt(self, content: Dict[str, Any]) -> str:
+        """Create a prompt for Gemini to extract recipe data"""
+        
+        prompt = f"""
+        Extract recipe information from the following content and return it as a valid JSON object.
+        {self._format_document(content, self.prompt_token_budget)}
+        {self._format_rules()}
         """
         
         return prompt
     
-    def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse Gemini's response to extract JSON data"""
-        try:
-            # Try to find JSON in the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                # If no JSON found, try to parse the entire response
-                return json.loads(response_text)
-        except json.JSONDecodeError:
-            # Return a basic structure if parsing fails
-            return {
-                "title": "Recipe",
-                "description": "Failed to parse recipe data",
-                "ingredients": [],
-                "instructions": []
-            }
+    def _create_batch_prompt(self, contents: List[Dict[str, Any]]) -> str:
+        """Create one prompt covering several documents, delimited by document id"""
+        documents = "\n".join(
+            f"""
+        <<<DOCUMENT {i}>>>
+        {self._format_document(content, self.prompt_token_budget)}
+        <<<END DOCUMENT {i}>>>"""
+            for i, content in enumerate(contents, start=1)
+        )
+        
+        prompt = f"""
+        Extract recipe information from each of the {len(contents)} documents below.
+        Each document starts with <<<DOCUMENT n>>> and ends with <<<END DOCUMENT n>>>.
+        Treat every document independently and never mix information between them.
+        
+        Return a JSON object of the form {{"recipes": [...]}} with exactly one recipe per
+        document. Each recipe must include "document_id" set to its document number n.
+        {self._format_rules()}
+        {documents}
+        """
+        
+        return prompt
+    
+    def _create_repair_prompt(self, prompt: str, output: str, error: RecipeParseError) -> str:
+        """Create a follow-up prompt asking the model to fix its invalid output"""
+        return f"""{prompt}
+        
+        Your previous answer could not be used: {error}
+        
+        Previous answer:
+        {output[:4000]}
+        
+        Return the corrected recipe as a single valid JSON object and nothing else.
+        """
     
     def _merge_recipe_data(self, gemini_data: Dict[str, Any], schema_data: Dict[str, Any]) -> Dict[str, Any]:
         """Merge Gemini extracted data with schema.org data"""
@@ -142,4 +346,10 @@ class GeminiService:
         
         # More merging logic can be added here
         
-        return merged
\ No newline at end of file
+        return merged
+
+
+@lru_cache()
+def get_gemini_service() -> GeminiService:
+    """Get the shared Gemini service so concurrent extractions can be batched"""
+    return GeminiService()
@@ -0,0 +1,118 @@
+"""Micro-batching of recipe extractions into multi-document Gemini requests"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+from app.utils.content_window import estimate_tokens
+
+if TYPE_CHECKING:
+    from app.core.gemini import GeminiService
+
+
+@dataclass
+class PendingExtraction:
+    """An extraction waiting for its batch to be sent"""
+    content: Dict[str, Any]
+    tokens: int
+    future: asyncio.Future = field(repr=False)
+
+
+class GeminiBatcher:
+    """Collect extractions over a short window and send them as one request.
+    
+    A batch is flushed when the window elapses, when adding another document
+    would exceed the token budget, or when it reaches the item limit. Results
+    are demultiplexed back to each waiting caller; documents the batch response
+    does not cover are retried as single extractions.
+    """
+    
+    def __init__(
+        self,
+        service: "GeminiService",
+        window_seconds: float = 0.05,
+        max_batch_tokens: int = 12000,
+        max_batch_size: int = 8
+    ):
+        self.service = service
+        self.window_seconds = window_seconds
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        
+        self._pending: List[PendingExtraction] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+    
+    async def submit(self, content: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Queue content for extraction and wait for its recipe data"""
+        loop = asyncio.get_running_loop()
+        tokens = min(
+            estimate_tokens(content.get('raw_content', '')),
+            self.service.prompt_token_budget
+        ) + estimate_tokens(content.get('title', '') + content.get('description', ''))
+        
+        if self._pending and self._pending_tokens + tokens > self.max_batch_tokens:
+            self._flush()
+        
+        item = PendingExtraction(content=content, tokens=tokens, future=loop.create_future())
+        self._pending.append(item)
+        self._pending_tokens += tokens
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        
+        return await item.future
+    
+    def _flush(self) -> None:
+        """Hand the pending items to a background task and start a new batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        items, self._pending, self._pending_tokens = self._pending, [], 0
+        if items:
+            # Keep a reference so the task is not garbage collected mid-flight
+            task = asyncio.create_task(self._run(items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, items: List[PendingExtraction]) -> None:
+        """Send one batch and resolve every waiting caller"""
+        if len(items) == 1:
+            await self._run_single(items[0])
+            return
+        
+        try:
+            results = await self.service.extract_recipe_batch([item.content for item in items])
+        except Exception as e:
+            print(f"Gemini batch extraction error: {str(e)}")
+            results = {}
+        
+        fallbacks = []
+        for index, item in enumerate(items):
+            if index in results:
+                self._resolve(item, results[index])
+            else:
+                fallbacks.append(self._run_single(item))
+        
+        if fallbacks:
+            await asyncio.gather(*fallbacks)
+    
+    async def _run_single(self, item: PendingExtraction) -> None:
+        """Extract one item on its own, the fallback for anything a batch missed"""
+        try:
+            result = await self.service.extract_recipe_data(item.content)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+            return
+        self._resolve(item, result)
+    
+    @staticmethod
+    def _resolve(item: PendingExtraction, result: Optional[Dict[str, Any]]) -> None:
+        # The caller may have been cancelled while the batch was in flight
+        if not item.future.done():
+            item.future.set_result(result)
@@ -0,0 +1,316 @@
+"""MongoDB command monitoring: latency histograms, slow-query log and sampled query plans"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from app.config import get_settings
+
+
+# Upper bounds in seconds, Prometheus style; the last bucket is +Inf
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+# Handshakes, auth and our own explains say nothing about application queries
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "buildinfo", "saslStart",
+    "saslContinue", "endSessions", "explain", "getLastError", "killCursors",
+}
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+
+# Envelope fields the driver adds; an explain must be sent without them
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+
+MAX_TRACKED_PLANS = 200
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+    
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs as exposed to Prometheus"""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+
+def redact_filter(value: Any) -> Any:
+    """Keep field names and operators, replace every value with '?'
+    
+    Lists of sub-filters ($and, $or) keep their shape; lists of values ($in)
+    collapse to a single '?' so the shape doesn't depend on their length.
+    """
+    if isinstance(value, dict):
+        return {key: redact_filter(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        nested = [redact_filter(item) for item in value if isinstance(item, dict)]
+        return nested or "?"
+    return "?"
+
+
+def command_filter(command_name: str, command: Dict[str, Any]) -> Any:
+    """The query part of a command, wherever that command keeps it"""
+    if command_name == "find":
+        return command.get("filter", {})
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return pipeline[0].get("$match", {}) if pipeline and "$match" in pipeline[0] else {}
+    if command_name in ("count", "distinct", "findAndModify"):
+        return command.get("query", {})
+    if command_name in ("update", "delete"):
+        statements = command.get(f"{command_name}s") or []
+        return statements[0].get("q", {}) if statements else {}
+    return {}
+
+
+def filter_shape(command_name: str, command: Dict[str, Any]) -> str:
+    """Redacted filter (and sort) of a command as a compact, stable string"""
+    shape = {"filter": redact_filter(command_filter(command_name, command))}
+    if command.get("sort"):
+        shape["sort"] = {key: direction for key, direction in command["sort"].items()}
+    return json.dumps(shape, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def summarize_plan(explain: Dict[str, Any]) -> str:
+    """'FETCH > IXSCAN user_id_1' from an explain result's winning plan"""
+    planner = explain.get("queryPlanner") or {}
+    # Aggregations nest the planner in their first ($cursor) stage
+    if not planner and explain.get("stages"):
+        planner = (explain["stages"][0].get("$cursor") or {}).get("queryPlanner") or {}
+    stage = planner.get("winningPlan") or {}
+    stage = stage.get("queryPlan", stage)  # Slot-based engine wraps the classic plan
+    
+    stages = []
+    while stage:
+        name = stage.get("stage", "?")
+        if stage.get("indexName"):
+            name = f"{name} {stage['indexName']}"
+        stages.append(name)
+        children = stage.get("inputStages") or [stage.get("inputStage")]
+        stage = children[0] if children and children[0] else None
+    return " > ".join(stages) or "unknown"
+
+
+def _collection_of(command_name: str, command: Dict[str, Any]) -> str:
+    if command_name == "getMore":
+        return str(command.get("collection", ""))
+    value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Record the latency of every command per collection and operation
+    
+    Commands slower than `slow_ms` are printed with their redacted filter shape
+    and the last known plan for that shape. A sample of them is re-run through
+    `explain` on the event loop (never on the driver thread that reported them),
+    at most once per shape every `explain_interval` seconds.
+    """
+    
+    def __init__(self, slow_ms: float, explain_sample_rate: float, explain_interval: float):
+        self.slow_ms = slow_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_interval = explain_interval
+        self.histograms: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.failures: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.slow: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.collection_scans: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.plans: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._explained_at: Dict[Tuple[str, str, str], float] = {}
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def attach(self, client, loop: asyncio.AbstractEventLoop) -> None:
+        """Let sampled explains run through `client` on `loop`"""
+        self._client = client
+        self._loop = loop
+    
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = _collection_of(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                collection, event.command_name, event.command
+            )
+    
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+    
+    def failed(self, event):
+        self._finished(event, failed=True)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Copies of all counters, safe to render while commands keep arriving"""
+        with self._lock:
+            return {
+                "histograms": {
+                    key: (h.cumulative(), h.sum, h.count) for key, h in self.histograms.items()
+                },
+                "failures": dict(self.failures),
+                "slow": dict(self.slow),
+                "collection_scans": dict(self.collection_scans),
+                "plans": dict(self.plans),
+            }
+    
+    def _finished(self, event, failed: bool) -> None:
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        collection, operation, command = pending
+        seconds = event.duration_micros / 1_000_000
+        key = (collection, operation)
+        
+        with self._lock:
+            self.histograms[key].observe(seconds)
+            if failed:
+                self.failures[key] += 1
+        
+        if seconds * 1000 >= self.slow_ms:
+            self._slow(event.database_name, collection, operation, command, seconds)
+    
+    def _slow(self, database: str, collection: str, operation: str, command: Dict[str, Any], seconds: float) -> None:
+        shape = filter_shape(operation, command)
+        plan_key = (collection, operation, shape)
+        with self._lock:
+            self.slow[(collection, operation)] += 1
+            plan = self.plans.get(plan_key)
+        print(
+            f"Slow MongoDB {operation} on {collection}: {seconds * 1000:.1f} ms "
+            f"shape={shape} plan={plan or 'not sampled'}"
+        )
+        
+        if operation not in EXPLAINABLE_COMMANDS or self._client is None or self._loop is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained_at.get(plan_key, float("-inf")) < self.explain_interval:
+                return
+            if random.random() >= self.explain_sample_rate:
+                return
+            self._explained_at[plan_key] = now
+        
+        explain = {k: v for k, v in command.items() if not k.startswith("$") and k not in DRIVER_FIELDS}
+        self._loop.call_soon_threadsafe(
+            lambda: asyncio.ensure_future(self._explain(database, plan_key, explain), loop=self._loop)
+        )
+    
+    async def _explain(self, database: str, plan_key: Tuple[str, str, str], command: Dict[str, Any]) -> None:
+        try:
+            result = await self._client[database].command({"explain": command, "verbosity": "queryPlanner"})
+        except Exception as e:
+            print(f"MongoDB explain failed for {plan_key[1]} on {plan_key[0]}: {e}")
+            return
+        
+        plan = summarize_plan(result)
+        with self._lock:
+            self.plans[plan_key] = plan
+            self.plans.move_to_end(plan_key)
+            while len(self.plans) > MAX_TRACKED_PLANS:
+                self.plans.popitem(last=False)
+            if "COLLSCAN" in plan:
+                self.collection_scans[plan_key[:2]] += 1
+        print(f"MongoDB plan for {plan_key[1]} on {plan_key[0]} shape={plan_key[2]}: {plan}")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_metrics(commands: Optional[Dict[str, Any]], pool: Optional[Dict[str, Any]]) -> str:
+    """Prometheus text exposition of command and connection pool metrics"""
+    lines: List[str] = []
+    
+    if commands is not None:
+        lines += [
+            "# HELP mongodb_command_duration_seconds MongoDB command latency by collection and operation",
+            "# TYPE mongodb_command_duration_seconds histogram",
+        ]
+        for (collection, operation), (buckets, total, count) in sorted(commands["histograms"].items()):
+            for le, value in buckets:
+                lines.append(
+                    f"mongodb_command_duration_seconds_bucket"
+                    f"{_labels(collection=collection, operation=operation, le=le)} {value}"
+                )
+            labels = _labels(collection=collection, operation=operation)
+            lines.append(f"mongodb_command_duration_seconds_sum{labels} {total:.6f}")
+            lines.append(f"mongodb_command_duration_seconds_count{labels} {count}")
+        
+        for name, key, help_text in (
+            ("mongodb_command_failures_total", "failures", "Failed MongoDB commands"),
+            ("mongodb_slow_commands_total", "slow", "MongoDB commands over the slow-query threshold"),
+            ("mongodb_collection_scans_total", "collection_scans", "Sampled slow commands whose plan scans a collection"),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (collection, operation), value in sorted(commands[key].items()):
+                lines.append(f"{name}{_labels(collection=collection, operation=operation)} {value}")
+        
+        lines += [
+            "# HELP mongodb_slow_query_plan_info Winning plan last sampled for a slow query shape",
+            "# TYPE mongodb_slow_query_plan_info gauge",
+        ]
+        for (collection, operation, shape), plan in sorted(commands["plans"].items()):
+            labels = _labels(collection=collection, operation=operation, shape=shape, plan=plan)
+            lines.append(f"mongodb_slow_query_plan_info{labels} 1")
+    
+    if pool is not None:
+        lines += [
+            "# HELP mongodb_pool_connections Connections per server by state",
+            "# TYPE mongodb_pool_connections gauge",
+        ]
+        for server, stats in sorted(pool["servers"].items()):
+            for state in ("open", "checked_out", "waiting"):
+                lines.append(f"mongodb_pool_connections{_labels(server=server, state=state)} {stats[state]}")
+        lines += [
+            "# HELP mongodb_pool_saturation Checked-out connections as a fraction of the pool size",
+            "# TYPE mongodb_pool_saturation gauge",
+        ]
+        for server, stats in sorted(pool["servers"].items()):
+            lines.append(f"mongodb_pool_saturation{_labels(server=server)} {stats['saturation']}")
+    
+    return "\n".join(lines) + "\n"
+
+
+@lru_cache()
+def get_command_monitor() -> CommandMonitor:
+    """Get the process-wide MongoDB command monitor"""
+    settings = get_settings()
+    return CommandMonitor(
+        settings.mongodb_slow_query_ms,
+        settings.mongodb_explain_sample_rate,
+        settings.mongodb_explain_interval_seconds
+    )
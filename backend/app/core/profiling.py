@@ -0,0 +1,247 @@
+"""Opt-in sampling profiler for individual requests
+
+A request is profiled when it carries a valid signed `X-Debug-Profile` header
+or falls into `profiling_sample_rate`. While it runs, a background thread
+samples the event loop thread every `profiling_interval_ms`:
+
+- when the request's task is the one running, the loop thread's Python stack
+  is recorded as a CPU sample (dependency resolution, Pydantic validation,
+  Beanie decoding, BeautifulSoup parsing all show up here);
+- otherwise the task's await chain is recorded, ending in `[awaiting ...]`,
+  so the wall-clock profile also shows where the request was blocked.
+
+Profiles are written in collapsed-stack format (`frame;frame;frame count`),
+readable by flamegraph.pl, speedscope and inferno, as
+`<id>.cpu.folded` and `<id>.wall.folded`; the id is returned in the
+`X-Profile-Id` response header. Every save prunes the directory down to the
+newest `profiling_max_profiles` profiles no older than `profiling_max_age_hours`.
+The middleware is only installed when profiling is configured, so unprofiled
+deployments pay nothing.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+
+
+PROFILE_HEADER = b"x-debug-profile"
+
+# Signed headers are rejected when they expire further out than this
+MAX_SIGNATURE_TTL = 3600
+
+PROFILE_SUFFIXES = (".cpu.folded", ".wall.folded")
+
+
+def sign_profile_request(secret: str, path: str, ttl: int = 300) -> str:
+    """Header value that asks for `path` to be profiled during the next `ttl` seconds"""
+    expires = int(time.time()) + ttl
+    digest = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify_profile_request(secret: str, path: str, value: str) -> bool:
+    expires, _, digest = value.partition(".")
+    try:
+        remaining = int(expires) - time.time()
+    except ValueError:
+        return False
+    if not 0 < remaining <= MAX_SIGNATURE_TTL:
+        return False
+    expected = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, digest)
+
+
+@lru_cache(maxsize=8192)
+def _frame_name(code) -> str:
+    """'fastapi/routing.py:run_endpoint_function', 'app/api/recipes.py:get_recipes'"""
+    parts = code.co_filename.replace(os.sep, "/").split("/")
+    if "site-packages" in parts:
+        parts = parts[parts.index("site-packages") + 1:]
+    elif "app" in parts:
+        parts = parts[len(parts) - 1 - parts[::-1].index("app"):]
+    else:
+        parts = parts[-1:]
+    # Semicolons separate frames in the collapsed format
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{'/'.join(parts)}:{name}".replace(";", ",")
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    """Frames of a running task, outermost first, without the event loop's own frames"""
+    names = []
+    while frame is not None:
+        name = _frame_name(frame.f_code)
+        if name.endswith(":Handle._run"):
+            break
+        names.append(name)
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+def _await_chain(task: asyncio.Task) -> Tuple[str, ...]:
+    """Frames of a suspended task, outermost coroutine first, ending with what it awaits"""
+    names: List[str] = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            names.append(f"[awaiting {type(awaitable).__name__}]")
+            break
+        names.append(_frame_name(frame.f_code))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    else:
+        names.append("[awaiting]")
+    return tuple(names)
+
+
+class RequestProfiler:
+    """Samples one request from a helper thread until stopped"""
+    
+    def __init__(self, interval: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.interval = interval
+        self.cpu: Counter = Counter()
+        self.wall: Counter = Counter()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+    
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+    
+    def _sample(self) -> None:
+        if self._task.done():
+            return
+        if asyncio.current_task(self._loop) is self._task:
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                stack = _stack(frame)
+                self.cpu[stack] += 1
+                self.wall[stack] += 1
+        else:
+            try:
+                self.wall[_await_chain(self._task)] += 1
+            except RuntimeError:
+                pass  # The coroutine chain changed under us; skip this sample
+    
+    def save(
+        self,
+        directory: str,
+        label: str,
+        max_profiles: Optional[int] = None,
+        max_age: Optional[float] = None
+    ) -> None:
+        """Write both profiles, then prune older ones beyond `max_profiles` or `max_age` seconds"""
+        os.makedirs(directory, exist_ok=True)
+        for kind, samples in (("cpu", self.cpu), ("wall", self.wall)):
+            path = os.path.join(directory, f"{self.id}.{kind}.folded")
+            with open(path, "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{label};{';'.join(stack)} {count}\n")
+        prune_profiles(directory, max_profiles, max_age)
+
+
+def prune_profiles(directory: str, max_profiles: Optional[int], max_age: Optional[float]) -> int:
+    """Delete profiles beyond the newest `max_profiles` or older than `max_age` seconds
+    
+    A profile's cpu and wall files go together. Returns how many profiles were deleted.
+    """
+    profiles: Dict[str, List[Tuple[str, float]]] = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            for suffix in PROFILE_SUFFIXES:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    try:
+                        modified = entry.stat().st_mtime
+                    except FileNotFoundError:
+                        continue  # Pruned by another worker
+                    profiles.setdefault(entry.name[:-len(suffix)], []).append((entry.path, modified))
+    
+    newest_first = sorted(profiles.values(), key=lambda files: max(m for _, m in files), reverse=True)
+    cutoff = time.time() - max_age if max_age else None
+    deleted = 0
+    for position, files in enumerate(newest_first):
+        too_many = max_profiles is not None and position >= max_profiles
+        too_old = cutoff is not None and max(m for _, m in files) < cutoff
+        if not (too_many or too_old):
+            continue
+        for path, _ in files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        deleted += 1
+    return deleted
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it or are sampled"""
+    
+    def __init__(self, app):
+        settings = get_settings()
+        self.app = app
+        self.secret = settings.profiling_secret
+        self.sample_rate = settings.profiling_sample_rate
+        self.interval = settings.profiling_interval_ms / 1000
+        self.directory = settings.profiling_output_dir
+        self.max_profiles = settings.profiling_max_profiles
+        self.max_age = settings.profiling_max_age_hours * 3600
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._triggered(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        profiler = RequestProfiler(self.interval)
+        
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(b"x-profile-id", profiler.id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            label = f"{scope['method']} {scope['path']}".replace(";", ",")
+            await asyncio.to_thread(profiler.save, self.directory, label, self.max_profiles, self.max_age)
+            print(f"Profiled {label} in {elapsed_ms:.1f} ms: {profiler.id} "
+                  f"({sum(profiler.cpu.values())} cpu / {sum(profiler.wall.values())} wall samples)")
+    
+    def _triggered(self, scope) -> bool:
+        if self.secret:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return verify_profile_request(self.secret, scope["path"], value.decode("latin-1"))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+def profiling_configured() -> bool:
+    """Whether to install the middleware at all"""
+    settings = get_settings()
+    return bool(settings.profiling_secret) or settings.profiling_sample_rate > 0
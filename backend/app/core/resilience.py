@@ -0,0 +1,283 @@
+"""Resilience primitives for calls to upstream model providers"""
+
+import asyncio
+import functools
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Optional
+
+
+# HTTP-style status codes worth retrying; google.api_core exceptions expose these as `code`
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class GeminiUnavailableError(Exception):
+    """Raised when the model provider is unavailable and the call should fail fast"""
+    
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Classify an exception as transient (worth retrying) or permanent"""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    
+    code = getattr(error, "code", None)
+    # google.api_core reports the HTTP status as an int or an enum with a `value`
+    code = getattr(code, "value", code)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    
+    return type(error).__name__ in {
+        "ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded",
+        "InternalServerError", "TooManyRequests", "BadGateway", "GatewayTimeout",
+    }
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures, probing again after a cool-down.
+    
+    closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    once `reset_timeout` has passed, letting a single probe call through; the probe's
+    outcome closes or re-opens the circuit.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+    
+    def allow(self) -> bool:
+        """Whether a call may proceed right now"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        
+        return True
+    
+    def retry_after(self) -> float:
+        """Seconds until the circuit will next let a probe through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+    
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+    
+    def record_ignored(self) -> None:
+        """The call ended without saying anything about upstream health; free the probe slot"""
+        self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class RateGovernor:
+    """Cap concurrent calls and smooth request rate with a token bucket"""
+    
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: int = 60):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, float(max_concurrency))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def _take_token(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    async def acquire(self) -> None:
+        """Take a concurrency slot and a rate token; pair with `release`"""
+        await self._semaphore.acquire()
+        try:
+            await self._take_token()
+        except BaseException:
+            self._semaphore.release()
+            raise
+    
+    def release(self) -> None:
+        self._semaphore.release()
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class LatencyTracker:
+    """Rolling window of call latencies for percentile estimates"""
+    
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+    
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+    
+    def __len__(self) -> int:
+        return len(self._samples)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class ResilientCaller:
+    """Run blocking upstream calls with retries, a circuit breaker, a rate governor
+    and optional hedging.
+    
+    `call` runs the function in a worker thread. With hedging enabled, a second
+    attempt starts once the first has been running longer than the observed p95
+    latency, and whichever finishes first wins.
+    """
+    
+    def __init__(
+        self,
+        retry_policy: RetryPolicy,
+        breaker: CircuitBreaker,
+        governor: RateGovernor,
+        timeout: Optional[float] = None,
+        hedge: bool = False,
+        hedge_min_samples: int = 20
+    ):
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+        self.governor = governor
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.latency = LatencyTracker()
+    
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Call `fn(*args)` resiliently; raises GeminiUnavailableError on upstream outage"""
+        last_error: Optional[BaseException] = None
+        
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if not self.breaker.allow():
+                raise GeminiUnavailableError(
+                    "Gemini is temporarily unavailable", retry_after=self.breaker.retry_after()
+                )
+            
+            recorded = False
+            try:
+                result = await self._attempt(fn, *args)
+            except Exception as e:
+                recorded = True
+                if not is_retryable(e):
+                    # Permanent errors say nothing about upstream health
+                    self.breaker.record_ignored()
+                    raise
+                self.breaker.record_failure()
+                last_error = e
+            else:
+                recorded = True
+                self.breaker.record_success()
+                return result
+            finally:
+                if not recorded:
+                    # Cancelled mid-call: free the half-open probe so the breaker can close again
+                    self.breaker.record_ignored()
+            
+            if attempt < self.retry_policy.max_attempts:
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+        
+        raise GeminiUnavailableError(
+            f"Gemini request failed after {self.retry_policy.max_attempts} attempts: {last_error}",
+            retry_after=self.breaker.retry_after() or None
+        )
+    
+    async def _attempt(self, fn: Callable[..., Any], *args: Any) -> Any:
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None:
+            return await self._timed(fn, *args)
+        
+        primary = asyncio.ensure_future(self._timed(fn, *args))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+        
+        hedged = asyncio.ensure_future(self._timed(fn, *args))
+        pending = {primary, hedged}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+    
+    async def _timed(self, fn: Callable[..., Any], *args: Any) -> Any:
+        await self.governor.acquire()
+        try:
+            worker = asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+        except BaseException:
+            self.governor.release()
+            raise
+        # A timed-out or cancelled attempt can't stop its thread, which still holds
+        # an upstream request; the slot is only freed once the thread returns
+        worker.add_done_callback(self._worker_done)
+        
+        started = time.monotonic()
+        result = await asyncio.wait_for(asyncio.shield(worker), timeout=self.timeout)
+        self.latency.record(time.monotonic() - started)
+        return result
+    
+    def _worker_done(self, worker: "asyncio.Future[Any]") -> None:
+        self.governor.release()
+        if not worker.cancelled():
+            # Abandoned attempts fail unobserved; retrieve the error so it isn't logged
+            worker.exception()
+    
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(95)
@@ -0,0 +1,161 @@
+"""Schema-constrained Gemini output: response schema, incremental parsing and validation"""
+
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from pydantic import ValidationError
+
+from app.schemas.recipe import RecipeBase
+
+
+# Fields we fill in ourselves after extraction; the model never sees them
+SERVER_MANAGED_FIELDS = {"images", "source", "is_favorite"}
+
+# JSON Schema keywords that the Gemini response schema (an OpenAPI subset) accepts
+SUPPORTED_SCHEMA_KEYS = {
+    "type", "format", "description", "nullable", "enum",
+    "properties", "required", "items",
+}
+
+
+class RecipeParseError(ValueError):
+    """Raised when model output is not a valid recipe JSON object"""
+
+
+def _to_gemini_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Inline $refs and translate a Pydantic JSON schema node for Gemini"""
+    if "$ref" in node:
+        return _to_gemini_schema(defs[node["$ref"].split("/")[-1]], defs)
+
+    # Optional[X] is rendered by Pydantic as anyOf [X, null]
+    if "anyOf" in node:
+        variants = [v for v in node["anyOf"] if v.get("type") != "null"]
+        converted = _to_gemini_schema(variants[0], defs) if variants else {"type": "string"}
+        if len(variants) < len(node["anyOf"]):
+            converted["nullable"] = True
+        if node.get("description"):
+            converted["description"] = node["description"]
+        return converted
+
+    converted = {k: v for k, v in node.items() if k in SUPPORTED_SCHEMA_KEYS}
+    if "properties" in node:
+        converted["properties"] = {
+            name: _to_gemini_schema(prop, defs) for name, prop in node["properties"].items()
+        }
+    if "items" in node:
+        converted["items"] = _to_gemini_schema(node["items"], defs)
+    return converted
+
+
+@lru_cache()
+def recipe_response_schema() -> Dict[str, Any]:
+    """Gemini response schema derived from RecipeBase"""
+    schema = RecipeBase.model_json_schema()
+    defs = schema.get("$defs", {})
+
+    for field in SERVER_MANAGED_FIELDS:
+        schema["properties"].pop(field, None)
+    schema["required"] = [f for f in schema.get("required", []) if f not in SERVER_MANAGED_FIELDS]
+
+    return _to_gemini_schema(schema, defs)
+
+
+@lru_cache()
+def batch_response_schema() -> Dict[str, Any]:
+    """Gemini response schema for a multi-document extraction"""
+    recipe = dict(recipe_response_schema())
+    recipe["properties"] = {
+        "document_id": {"type": "integer", "description": "Number of the source document"},
+        **recipe["properties"],
+    }
+    recipe["required"] = ["document_id", *recipe.get("required", [])]
+
+    return {
+        "type": "object",
+        "properties": {"recipes": {"type": "array", "items": recipe}},
+        "required": ["recipes"],
+    }
+
+
+class IncrementalJSONParser:
+    """Incrementally scan streamed text for the first complete top-level JSON object.
+
+    Text before the opening brace (prose, markdown fences) is skipped. Once the
+    matching closing brace arrives, `complete` is set and further input is ignored,
+    so callers can stop consuming the stream early.
+    """
+
+    def __init__(self):
+        self._buffer: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.complete = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Feed a chunk of text; returns the parsed object once it is complete"""
+        if self.complete or not chunk:
+            return None
+
+        if not self._started:
+            start = chunk.find("{")
+            if start < 0:
+                return None
+            self._started = True
+            chunk = chunk[start:]
+
+        for i, char in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{" or char == "[":
+                self._depth += 1
+            elif char == "}" or char == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(chunk[:i + 1])
+                    self.complete = True
+                    return self.result()
+
+        self._buffer.append(chunk)
+        return None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._buffer)
+
+    def result(self) -> Dict[str, Any]:
+        """Decode the buffered object, raising RecipeParseError if it is not valid JSON"""
+        if not self._started:
+            raise RecipeParseError("No JSON object found in model output")
+        if not self.complete:
+            raise RecipeParseError("Model output ended before the JSON object was closed")
+        try:
+            data = json.loads(self.text)
+        except json.JSONDecodeError as e:
+            raise RecipeParseError(f"Invalid JSON: {e}")
+        if not isinstance(data, dict):
+            raise RecipeParseError("Top-level JSON value is not an object")
+        return data
+
+
+def validate_recipe_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate extracted data against RecipeBase and return the normalized fields"""
+    payload = {k: v for k, v in data.items() if k not in SERVER_MANAGED_FIELDS}
+    try:
+        recipe = RecipeBase(**payload)
+    except ValidationError as e:
+        raise RecipeParseError(f"Recipe does not match schema: {e}")
+
+    if not recipe.title.strip() or not (recipe.ingredients or recipe.instructions):
+        raise RecipeParseError("Recipe has no title or no ingredients and instructions")
+
+    return recipe.model_dump(exclude_unset=True, exclude=SERVER_MANAGED_FIELDS)
@@ -0,0 +1,43 @@
+"""Import the heavy, lazily loaded subsystems ahead of the first request"""
+
+import importlib
+import time
+from typing import Dict, Tuple
+
+from app.core.security import get_pwd_context
+from app.services.extractors import ExtractorFactory
+
+
+# Third-party modules the app defers until first use
+HEAVY_MODULES: Tuple[str, ...] = (
+    "google.generativeai",
+    "numpy",
+)
+
+
+def warm_up() -> Dict[str, float]:
+    """Load deferred modules, the bcrypt backend and built-in extractors; returns seconds spent per step
+    
+    Only imports code and compiles rule packs: no clients, sessions or worker
+    processes are created, so it is safe to run before gunicorn forks workers.
+    Modules that are not installed are skipped.
+    """
+    timings: Dict[str, float] = {}
+    for name in HEAVY_MODULES:
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+            dir(module)  # Force modules wrapped by lazy_module to execute
+        except ImportError as e:
+            print(f"Warm-up skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    get_pwd_context().handler("bcrypt").get_backend()
+    timings["bcrypt"] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    ExtractorFactory.load_builtins()
+    timings["extractors"] = time.perf_counter() - started
+    return timings
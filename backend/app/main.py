@@ -1,36 +1,80 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from beanie import init_beanie
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 
 from app.config import get_settings
-from app.models.user import User
-from app.models.recipe import Recipe
-from app.api import auth, recipes, users
+from app.models.user import AccountDeletionJob, User
+from app.models.recipe import LibraryStats, Recipe, RecipeTombstone
+from app.api import auth, images, recipes, users
+from app.core.database import get_database
+from app.core.monitoring import render_metrics
+from app.core.profiling import ProfilingMiddleware, profiling_configured
 from app.core.security import get_limiter
+from app.core.warmup import warm_up
+from app.services.account_deletion import get_account_janitor
+from app.services.change_feed import MongoChangeSource, get_change_feed
+from app.services.dietary import run_dietary_backfill
+from app.services.duplicates import run_signature_backfill
+from app.services.extractors import watch_rule_packs
+from app.services.images import get_image_pipeline
+from app.services.library_stats import run_reconciliation
 
 settings = get_settings()
 
+# With gunicorn --preload, workers fork from a master that already imported these
+if settings.preload_modules:
+    warm_up()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database connection on startup"""
     # Startup
-    client = AsyncIOMotorClient(settings.mongodb_url)
-    database = client.get_default_database()
+    database = get_database()
+    await database.connect([User, AccountDeletionJob, Recipe, RecipeTombstone, LibraryStats])
     
-    await init_beanie(
-        database=database,
-        document_models=[User, Recipe]
-    )
+    # Load Gemini, bcrypt, numpy and the extractors off the event loop, so the
+    # first requests that need them don't pay for the imports
+    warmer = None
+    if settings.warm_up_on_startup and not settings.preload_modules:
+        warmer = asyncio.create_task(asyncio.to_thread(warm_up))
+    
+    # One change stream per process feeds every connected client
+    if settings.change_feed_enabled:
+        get_change_feed().start(MongoChangeSource(database.database))
+    
+    # Remove deleted accounts' data in the background, resuming unfinished jobs
+    janitor = asyncio.create_task(get_account_janitor().run())
+    
+    # Recompute dietary masks saved under older dietary rules
+    dietary_backfill = asyncio.create_task(run_dietary_backfill())
+    
+    # Sign recipes saved before duplicate detection existed
+    signature_backfill = asyncio.create_task(run_signature_backfill())
+    
+    # Repair drift in the incrementally maintained library stats
+    stats_reconciler = asyncio.create_task(run_reconciliation())
+    
+    # Pick up edited site rule packs without a restart
+    rules_watcher = asyncio.create_task(watch_rule_packs(settings.extraction_rules_reload_seconds))
     
     yield
     
     # Shutdown
-    client.close()
+    if warmer is not None:
+        warmer.cancel()
+    rules_watcher.cancel()
+    janitor.cancel()
+    stats_reconciler.cancel()
+    dietary_backfill.cancel()
+    signature_backfill.cancel()
+    get_change_feed().stop()
+    get_image_pipeline().shutdown()
+    database.close()
 
 
 # Create FastAPI app
@@ -50,6 +94,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile requests that ask for it with a signed header, or a sample of all requests
+if profiling_configured():
+    app.add_middleware(ProfilingMiddleware)
+
 # Add rate limiting
 limiter = get_limiter()
 app.state.limiter = limiter
@@ -59,6 +107,7 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.include_router(auth.router, prefix=f"{settings.api_prefix}/auth", tags=["Authentication"])
 app.include_router(users.router, prefix=f"{settings.api_prefix}/users", tags=["Users"])
 app.include_router(recipes.router, prefix=f"{settings.api_prefix}/recipes", tags=["Recipes"])
+app.include_router(images.router, prefix=f"{settings.api_prefix}/images", tags=["Images"])
 
 
 @app.get("/")
@@ -72,4 +121,29 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    """Liveness: the process is up, whatever the state of its dependencies"""
+    return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: MongoDB answers a ping; reports connection pool saturation"""
+    report = await get_database().readiness()
+    return JSONResponse(
+        status_code=200 if report["ready"] else 503,
+        content={"status": "ready" if report["ready"] else "unavailable", "mongodb": report}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: MongoDB command latency, slow queries, sampled plans and pool usage"""
+    database = get_database()
+    monitor = database.command_monitor
+    return PlainTextResponse(
+        render_metrics(
+            monitor.snapshot() if monitor is not None else None,
+            database.pool_monitor.stats(database.max_pool_size)
+        ),
+        media_type="text/plain; version=0.0.4"
+    )
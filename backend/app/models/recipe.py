@@ -1,7 +1,13 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
-from beanie import Document, Indexed
+from beanie import Document, Indexed, Insert, PydanticObjectId, Replace, Save, SaveChanges, before_event
 from pydantic import Field, BaseModel
+import pymongo
+from app.config import get_settings
+from app.core.constants import DIETARY_RULES_VERSION
+from app.utils.dietary import allergen_scan_mask, dietary_mask
+from app.utils.minhash import get_min_hasher, recipe_features
+from app.utils.quantities import parse_quantity
 
 
 class Ingredient(BaseModel):
@@ -9,6 +15,18 @@ class Ingredient(BaseModel):
     quantity: str
     unit: str
     notes: Optional[str] = None
+    
+    # Normalized from quantity/unit on save; None when there is no amount
+    quantity_value: Optional[float] = None
+    quantity_max: Optional[float] = None  # Upper bound of ranges like "2-3"
+    unit_key: Optional[str] = None  # Canonical unit, None for counts
+    
+    def normalize(self):
+        """Refresh the numeric fields from the free-form quantity and unit"""
+        parsed = parse_quantity(self.quantity, self.unit)
+        self.quantity_value = float(parsed.low) if parsed else None
+        self.quantity_max = float(parsed.high) if parsed and parsed.high is not None else None
+        self.unit_key = parsed.unit if parsed else None
 
 
 class Instruction(BaseModel):
@@ -30,6 +48,51 @@ class RecipeSource(BaseModel):
     platform: Optional[str] = None
 
 
+class ImageAsset(BaseModel):
+    digest: str  # sha256 of the downloaded source image
+    source_url: str
+    width: int
+    height: int
+    phash: str  # 64-bit difference hash as hex, for near-duplicate detection
+    sizes: List[int] = Field(default_factory=list)  # Stored thumbnail widths
+
+
+# Compound indexes for the recipe list, laid out equality, sort, range; the
+# filter language (app.services.recipe_query) hints the best one for each query.
+# Sorts end with an _id tiebreaker, so the sortable indexes end with _id too.
+QUERY_INDEXES = [
+    [("user_id", pymongo.ASCENDING), ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)],
+    [
+        ("user_id", pymongo.ASCENDING), ("recipe_type", pymongo.ASCENDING),
+        ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)
+    ],
+    [
+        ("user_id", pymongo.ASCENDING), ("cuisine", pymongo.ASCENDING),
+        ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)
+    ],
+    [
+        ("user_id", pymongo.ASCENDING), ("difficulty", pymongo.ASCENDING),
+        ("total_time", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)
+    ],
+    [
+        ("user_id", pymongo.ASCENDING), ("tags", pymongo.ASCENDING),
+        ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)
+    ],
+    [
+        ("user_id", pymongo.ASCENDING), ("is_favorite", pymongo.ASCENDING),
+        ("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)
+    ],
+    [("user_id", pymongo.ASCENDING), ("total_time", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    [("user_id", pymongo.ASCENDING), ("prep_time", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    [("user_id", pymongo.ASCENDING), ("cook_time", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    [("user_id", pymongo.ASCENDING), ("servings", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    [("user_id", pymongo.ASCENDING), ("title", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+    # $bitsAllSet is checked on the index keys, so only matching recipes are fetched.
+    # Bit tests can't bound the scan, so the planner never hints this one.
+    [("user_id", pymongo.ASCENDING), ("dietary_mask", pymongo.ASCENDING)],
+]
+
+
 class Recipe(Document):
     """Recipe document model for MongoDB"""
     
@@ -42,6 +105,9 @@ class Recipe(Document):
     
     # Dietary Information
     dietary_info: List[str] = Field(default_factory=list)
+    dietary_mask: int = 0  # DIETARY_BITS of the dietary_info labels, less any an ingredient contradicts
+    allergen_scan_mask: int = 0  # Allergen-free bits no ingredient contradicts; display only, never filtered on
+    dietary_rules_version: int = 0  # DIETARY_RULES_VERSION the mask was computed with
     
     # Time Information
     prep_time: Optional[int] = None  # in minutes
@@ -61,6 +127,7 @@ class Recipe(Document):
     
     # Media
     images: List[str] = Field(default_factory=list)
+    image_assets: List[ImageAsset] = Field(default_factory=list)
     
     # Source Information
     source: Optional[RecipeSource] = None
@@ -70,10 +137,43 @@ class Recipe(Document):
     notes: Optional[str] = None
     is_favorite: bool = False
     
+    # Near-duplicate detection: MinHash signature and its LSH band keys
+    minhash: List[int] = Field(default_factory=list)
+    lsh_bands: List[str] = Field(default_factory=list)
+    
     # Timestamps
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def refresh_derived_fields(self):
+        """Recompute fields derived from ingredients and title before every write"""
+        self.normalize_ingredients()
+        self.compute_lsh_bands()
+        self.compute_dietary_mask()
+    
+    def normalize_ingredients(self):
+        # Updates may assign plain dicts; coerce them so they can be normalized
+        self.ingredients = [
+            i if isinstance(i, Ingredient)
+            else Ingredient.model_validate(i if isinstance(i, dict) else i.model_dump())
+            for i in self.ingredients
+        ]
+        for ingredient in self.ingredients:
+            ingredient.normalize()
+    
+    def compute_lsh_bands(self):
+        hasher = get_min_hasher()
+        self.minhash = hasher.signature(
+            recipe_features(self.title, (i.name for i in self.ingredients))
+        )
+        self.lsh_bands = hasher.band_keys(self.minhash)
+    
+    def compute_dietary_mask(self):
+        self.dietary_mask = dietary_mask(self.dietary_info, (i.name for i in self.ingredients))
+        self.allergen_scan_mask = allergen_scan_mask(i.name for i in self.ingredients)
+        self.dietary_rules_version = DIETARY_RULES_VERSION
+    
     class Settings:
         name = "recipes"
         indexes = [
@@ -83,7 +183,13 @@ class Recipe(Document):
             "cuisine",
             "tags",
             "is_favorite",
-            "created_at"
+            "created_at",
+            [("user_id", pymongo.ASCENDING), ("lsh_bands", pymongo.ASCENDING)],
+            # Delta sync pages through a user's changes in (updated_at, _id) order
+            [("user_id", pymongo.ASCENDING), ("updated_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)],
+            # Finds recipes whose mask predates the current dietary rules
+            "dietary_rules_version",
+            *QUERY_INDEXES
         ]
     
     class Config:
@@ -115,4 +221,97 @@ class Recipe(Document):
                 ],
                 "tags": ["pasta", "italian", "quick"]
             }
-        }
\ No newline at end of file
+        }
+
+
+class RecipeTombstone(Document):
+    """Record of a deleted recipe, kept so other devices can sync the deletion
+    
+    Expires after `sync_tombstone_ttl_days`; clients whose cursor is older than
+    that must resync from scratch.
+    """
+    
+    user_id: str
+    recipe_id: str
+    deleted_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "recipe_tombstones"
+        indexes = [
+            [("user_id", pymongo.ASCENDING), ("deleted_at", pymongo.ASCENDING), ("recipe_id", pymongo.ASCENDING)],
+            # Changing the TTL needs the index dropped first; MongoDB won't update it in place
+            pymongo.IndexModel(
+                [("deleted_at", pymongo.ASCENDING)],
+                expireAfterSeconds=get_settings().sync_tombstone_ttl_days * 86400
+            )
+        ]
+
+
+class LibraryStats(Document):
+    """Per-user facet counts, kept current with $inc on every recipe write
+    
+    Facet values become field names, so they are stored escaped (see
+    app.services.library_stats); a periodic reconciliation recounts them from
+    the recipes themselves.
+    """
+    
+    user_id: Indexed(str, unique=True)
+    total: int = 0
+    favorites: int = 0
+    recipe_types: Dict[str, int] = Field(default_factory=dict)
+    cuisines: Dict[str, int] = Field(default_factory=dict)
+    difficulties: Dict[str, int] = Field(default_factory=dict)
+    tags: Dict[str, int] = Field(default_factory=dict)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    reconciled_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    class Settings:
+        name = "library_stats"
+        indexes = ["reconciled_at"]
+
+
+class RecipeIdView(BaseModel):
+    """Projection of a recipe to its id, for batch operations"""
+    id: PydanticObjectId = Field(alias="_id")
+
+
+class RecipeDietaryView(BaseModel):
+    """Projection of a recipe to what its dietary mask is computed from"""
+    id: PydanticObjectId = Field(alias="_id")
+    dietary_info: List[str] = Field(default_factory=list)
+    ingredients: List[Ingredient] = Field(default_factory=list)
+
+
+class RecipeIngredientsView(BaseModel):
+    """Projection of a recipe down to what is needed to shop for it"""
+    id: PydanticObjectId = Field(alias="_id")
+    servings: Optional[int] = None
+    ingredients: List[Ingredient] = Field(default_factory=list)
+
+
+class RecipeSignatureView(BaseModel):
+    """Projection of a recipe used to score duplicate candidates"""
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    minhash: List[int] = Field(default_factory=list)
+
+
+class RecipeFeaturesView(BaseModel):
+    """Projection of a recipe with the fields recommendations are computed from"""
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    recipe_type: Optional[str] = None
+    cuisine: Optional[str] = None
+    difficulty: Optional[str] = None
+    dietary_info: List[str] = Field(default_factory=list)
+    ingredients: List[Ingredient] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+    is_favorite: bool = False
+
+
+class RecipeTextView(BaseModel):
+    """Projection of a recipe with the text semantic search embeds"""
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    description: Optional[str] = None
+    ingredients: List[Ingredient] = Field(default_factory=list)
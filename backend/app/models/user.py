@@ -2,6 +2,7 @@ from typing import Optional, List
 from datetime import datetime
 from beanie import Document, Indexed
 from pydantic import Field, EmailStr
+import pymongo
 
 
 class User(Document):
@@ -24,6 +25,7 @@ class User(Document):
     # Preferences
     preferred_cuisines: List[str] = Field(default_factory=list)
     dietary_restrictions: List[str] = Field(default_factory=list)
+    auto_apply_dietary_restrictions: bool = False  # Filter recipe lists by dietary_restrictions
     
     # OAuth Information (for future use)
     oauth_provider: Optional[str] = None
@@ -33,6 +35,7 @@ class User(Document):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None  # Set when deletion is requested; the janitor removes the rest
     
     class Settings:
         name = "users"
@@ -52,4 +55,31 @@ class User(Document):
                 "preferred_cuisines": ["Italian", "Mexican"],
                 "dietary_restrictions": ["vegetarian"]
             }
-        }
\ No newline at end of file
+        }
+
+
+class AccountDeletionJob(Document):
+    """Progress of removing a deleted account's data, resumable after a restart
+    
+    A janitor claims a job by taking its lease and renews the lease after every
+    batch. A job whose lease has lapsed, because its janitor crashed or was
+    redeployed, is picked up again from wherever the data left off.
+    """
+    
+    user_id: Indexed(str, unique=True)
+    status: str = "pending"  # pending, running, done
+    recipes_total: int = 0  # Counted when deletion was requested
+    recipes_deleted: int = 0
+    batches: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    
+    class Settings:
+        name = "account_deletions"
+        indexes = [
+            [("status", pymongo.ASCENDING), ("lease_expires_at", pymongo.ASCENDING)]
+        ]
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field, validator
 from app.core.constants import RecipeType, Difficulty
@@ -11,6 +11,12 @@ class IngredientBase(BaseModel):
     notes: Optional[str] = None
 
 
+class IngredientResponse(IngredientBase):
+    quantity_value: Optional[float] = None
+    quantity_max: Optional[float] = None
+    unit_key: Optional[str] = None
+
+
 class InstructionBase(BaseModel):
     step_number: int
     instruction: str
@@ -30,6 +36,14 @@ class RecipeSourceBase(BaseModel):
     platform: Optional[str] = None
 
 
+class ImageAssetResponse(BaseModel):
+    digest: str
+    source_url: str
+    width: int
+    height: int
+    thumbnails: Dict[int, str]  # Thumbnail width -> URL
+
+
 class RecipeBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -79,6 +93,11 @@ class RecipeCreate(BaseModel):
     tags: List[str] = Field(default_factory=list)
 
 
+class RecipeBatchCreate(BaseModel):
+    """Schema for extracting several recipes from URLs in one call"""
+    items: List[RecipeCreate] = Field(min_length=1, max_length=20)
+
+
 class RecipeUpdate(BaseModel):
     """Schema for updating a recipe"""
     title: Optional[str] = None
@@ -100,10 +119,29 @@ class RecipeUpdate(BaseModel):
     is_favorite: Optional[bool] = None
 
 
+class RecipeDuplicate(BaseModel):
+    """A recipe in the same library that is probably the same dish"""
+    id: str
+    title: str
+    similarity: float  # Estimated Jaccard similarity of ingredients and title words
+
+
+class RecipeRecommendation(BaseModel):
+    """A recommended recipe with its relevance score"""
+    id: str
+    title: str
+    score: float
+
+
 class RecipeResponse(RecipeBase):
     """Schema for recipe response"""
     id: str = Field(alias="_id")
     user_id: str
+    dietary_flags: List[str] = Field(default_factory=list)  # Normalized from dietary_info and ingredients
+    allergen_scan_flags: List[str] = Field(default_factory=list)  # No ingredient mentions the allergen; a hint only
+    ingredients: List[IngredientResponse] = Field(default_factory=list)
+    image_assets: List[ImageAssetResponse] = Field(default_factory=list)
+    possible_duplicates: List[RecipeDuplicate] = Field(default_factory=list)  # Set when saving
     created_at: datetime
     updated_at: datetime
     
@@ -117,4 +155,77 @@ class RecipeList(BaseModel):
     total: int
     page: int
     per_page: int
-    pages: int
\ No newline at end of file
+    pages: int
+
+
+class RecipeTombstoneResponse(BaseModel):
+    """A recipe deleted since the sync cursor"""
+    id: str
+    deleted_at: datetime
+
+
+class RecipeChanges(BaseModel):
+    """Recipes written and deleted since a sync cursor, oldest first"""
+    recipes: List[RecipeResponse]
+    deleted: List[RecipeTombstoneResponse]
+    cursor: str  # Pass as `since` on the next sync
+    has_more: bool  # Fetch again right away with the new cursor
+
+
+class LibraryStatsResponse(BaseModel):
+    """Recipe counts per facet value across the user's library"""
+    total: int
+    favorites: int
+    recipe_types: Dict[str, int]
+    cuisines: Dict[str, int]
+    difficulties: Dict[str, int]
+    tags: Dict[str, int]
+    updated_at: datetime
+
+
+class TagCount(BaseModel):
+    """A tag and the number of recipes carrying it"""
+    tag: str
+    count: int
+
+
+class RecipeBatchResult(BaseModel):
+    """Outcome of extracting a single URL in a batch"""
+    url: str
+    recipe: Optional[RecipeResponse] = None
+    error: Optional[str] = None
+
+
+class RecipeBatchResponse(BaseModel):
+    """Schema for batch extraction results, in request order"""
+    results: List[RecipeBatchResult]
+
+
+class ShoppingListRecipe(BaseModel):
+    """A recipe to shop for, optionally scaled to a number of servings"""
+    recipe_id: str
+    servings: Optional[int] = Field(None, ge=1, le=1000)
+
+
+class ShoppingListRequest(BaseModel):
+    """Schema for building a shopping list from several recipes"""
+    recipes: List[ShoppingListRecipe] = Field(min_length=1, max_length=50)
+    system: Optional[str] = Field(None, pattern="^(metric|imperial)$")
+
+
+class ShoppingListItem(BaseModel):
+    name: str
+    quantity: str
+    unit: str
+    recipe_ids: List[str]
+
+
+class ShoppingListCategory(BaseModel):
+    category: str
+    items: List[ShoppingListItem]
+
+
+class ShoppingListResponse(BaseModel):
+    """Schema for a consolidated shopping list grouped by store section"""
+    categories: List[ShoppingListCategory]
+    missing_recipe_ids: List[str] = Field(default_factory=list)
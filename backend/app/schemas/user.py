@@ -23,6 +23,7 @@ class UserUpdate(BaseModel):
     avatar_url: Optional[str] = None
     preferred_cuisines: Optional[List[str]] = None
     dietary_restrictions: Optional[List[str]] = None
+    auto_apply_dietary_restrictions: Optional[bool] = None
 
 
 class UserResponse(UserBase):
@@ -31,6 +32,7 @@ class UserResponse(UserBase):
     is_verified: bool
     preferred_cuisines: List[str]
     dietary_restrictions: List[str]
+    auto_apply_dietary_restrictions: bool = False
     created_at: datetime
     last_login: Optional[datetime]
     
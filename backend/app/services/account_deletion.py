@@ -0,0 +1,182 @@
+"""Account deletion: the request marks the user deleted, a janitor removes the data later"""
+
+import asyncio
+import socket
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from beanie import PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.models.recipe import LibraryStats, Recipe, RecipeIdView, RecipeTombstone
+from app.models.user import AccountDeletionJob, User
+from app.services.recommendations import get_recommendation_service
+from app.services.semantic_search import get_semantic_search
+
+
+async def request_account_deletion(user: User) -> AccountDeletionJob:
+    """Deactivate `user` now and queue the removal of their data
+    
+    Deactivated users can no longer log in or refresh tokens, so nothing new is
+    written for them while the janitor works. Requesting deletion twice returns
+    the existing job.
+    """
+    now = datetime.utcnow()
+    user.is_active = False
+    user.deleted_at = user.deleted_at or now
+    user.updated_at = now
+    await user.save()
+    
+    user_id = str(user.id)
+    job = AccountDeletionJob(
+        user_id=user_id,
+        recipes_total=await Recipe.find({"user_id": user_id}).count()
+    )
+    try:
+        await job.insert()
+    except DuplicateKeyError:
+        job = await AccountDeletionJob.find_one({"user_id": user_id})
+    
+    get_account_janitor().wake()
+    return job
+
+
+class AccountJanitor:
+    """Works through pending account deletions in small, throttled batches
+    
+    Each job is claimed with a lease that is renewed after every batch, so
+    several processes can run a janitor without deleting the same account
+    twice, and a job abandoned by a crash or a redeploy is resumed by whoever
+    claims it once the lease runs out. Every step is idempotent: a resumed job
+    just deletes whatever is left.
+    """
+    
+    def __init__(self):
+        settings = get_settings()
+        self.batch_size = settings.account_deletion_batch_size
+        self.batch_pause = settings.account_deletion_batch_pause_seconds
+        self.poll_interval = settings.account_deletion_poll_seconds
+        self.lease = timedelta(seconds=settings.account_deletion_lease_seconds)
+        self.owner = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup: Optional[asyncio.Event] = None
+    
+    def wake(self) -> None:
+        """Start on a new job now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                while await self.run_once():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Account deletion janitor error: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+    
+    async def run_once(self) -> bool:
+        """Claim and finish one job; False when there was nothing to do"""
+        job = await self._claim()
+        if job is None:
+            return False
+        try:
+            await self._process(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Leave the lease to expire; the job is retried from where it stopped
+            print(f"Account deletion for user {job.user_id} failed, will retry: {e}")
+            await AccountDeletionJob.find_one(
+                {"_id": job.id, "lease_owner": self.owner}
+            ).update({"$set": {"last_error": str(e)}})
+            return False
+        return True
+    
+    async def _claim(self) -> Optional[AccountDeletionJob]:
+        now = datetime.utcnow()
+        return await AccountDeletionJob.find_one({
+            "status": {"$in": ["pending", "running"]},
+            "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}],
+        }).update(
+            {"$set": {
+                "status": "running",
+                "lease_owner": self.owner,
+                "lease_expires_at": now + self.lease,
+                "updated_at": now,
+            }},
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
+    
+    async def _renew(self, job: AccountDeletionJob, deleted: int) -> bool:
+        """Record a finished batch and extend the lease; False if the lease was lost"""
+        now = datetime.utcnow()
+        updated = await AccountDeletionJob.find_one(
+            {"_id": job.id, "lease_owner": self.owner}
+        ).update(
+            {
+                "$inc": {"recipes_deleted": deleted, "batches": 1},
+                "$set": {"lease_expires_at": now + self.lease, "updated_at": now},
+            },
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
+        if updated is None:
+            return False
+        job.recipes_deleted = updated.recipes_deleted
+        return True
+    
+    async def _process(self, job: AccountDeletionJob) -> None:
+        user_id = job.user_id
+        print(f"Deleting account {user_id}: {job.recipes_deleted}/{job.recipes_total} recipes done")
+        
+        # Recipes go in id-ordered batches so no single delete holds the primary for long
+        while True:
+            batch = await Recipe.find(
+                {"user_id": user_id}
+            ).sort([("_id", 1)]).limit(self.batch_size).project(RecipeIdView).to_list()
+            if not batch:
+                break
+            result = await Recipe.find({"_id": {"$in": [r.id for r in batch]}}).delete()
+            deleted = result.deleted_count if result is not None else len(batch)
+            if not await self._renew(job, deleted):
+                print(f"Lost the lease on account deletion {user_id}; another janitor took over")
+                return
+            print(f"Deleting account {user_id}: {job.recipes_deleted}/{job.recipes_total} recipes done")
+            await asyncio.sleep(self.batch_pause)
+        
+        # Derived data: deletion history for sync clients, stats and the per-user indexes.
+        # Images are content-addressed and may be shared with other users' recipes,
+        # so they are left to the image store.
+        await RecipeTombstone.find({"user_id": user_id}).delete()
+        await LibraryStats.find({"user_id": user_id}).delete()
+        get_recommendation_service().user_deleted(user_id)
+        await get_semantic_search().user_deleted(user_id)
+        
+        await User.find_one({"_id": PydanticObjectId(user_id), "deleted_at": {"$ne": None}}).delete()
+        
+        now = datetime.utcnow()
+        await AccountDeletionJob.find_one({"_id": job.id, "lease_owner": self.owner}).update({"$set": {
+            "status": "done",
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "updated_at": now,
+            "finished_at": now,
+        }})
+        print(f"Deleted account {user_id}: {job.recipes_deleted} recipes")
+
+
+@lru_cache()
+def get_account_janitor() -> AccountJanitor:
+    """Get the process-wide account deletion janitor"""
+    return AccountJanitor()
@@ -0,0 +1,270 @@
+"""Live recipe change notifications fanned out from one shared MongoDB change stream"""
+
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from app.config import get_settings
+
+
+RECIPES = "recipes"
+TOMBSTONES = "recipe_tombstones"
+
+# MongoDB error codes meaning change streams can never work on this deployment
+UNSUPPORTED_CODES = {40573, 40324}  # Not a replica set / unsupported stage
+# The oplog no longer reaches back to our resume token
+HISTORY_LOST_CODES = {280, 286}
+
+# Only what subscribers are told about; the full recipe stays in MongoDB
+CHANGE_PIPELINE = [
+    {"$match": {"$or": [
+        {"ns.coll": RECIPES, "operationType": {"$in": ["insert", "update", "replace"]}},
+        {"ns.coll": TOMBSTONES, "operationType": "insert"},
+    ]}},
+    {"$project": {
+        "operationType": 1,
+        "ns": 1,
+        "documentKey": 1,
+        "fullDocument.user_id": 1,
+        "fullDocument.title": 1,
+        "fullDocument.updated_at": 1,
+        "fullDocument.recipe_id": 1,
+        "fullDocument.deleted_at": 1,
+    }},
+]
+
+
+def _isoformat(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else None
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """One notification for one user, with the change stream resume token as its id"""
+    id: str
+    user_id: str
+    type: str  # recipe.upserted, recipe.deleted
+    data: Dict[str, Any]
+    
+    @classmethod
+    def from_change(cls, change: Dict[str, Any]) -> Optional["ChangeEvent"]:
+        """Convert a raw change document; None for changes subscribers don't see
+        
+        Deletions are reported from tombstone inserts, which carry the user id
+        that a recipe delete event no longer has.
+        """
+        document = change.get("fullDocument")
+        if not document or not document.get("user_id"):
+            return None  # e.g. an update whose recipe was deleted before the lookup
+        token = change["_id"]["_data"]
+        if change["ns"]["coll"] == TOMBSTONES:
+            return cls(token, document["user_id"], "recipe.deleted", {
+                "id": document.get("recipe_id"),
+                "deleted_at": _isoformat(document.get("deleted_at")),
+            })
+        return cls(token, document["user_id"], "recipe.upserted", {
+            "id": str(change["documentKey"]["_id"]),
+            "title": document.get("title"),
+            "updated_at": _isoformat(document.get("updated_at")),
+        })
+    
+    def format(self) -> str:
+        """Server-Sent Events wire format"""
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+# Tells the client to catch up through GET /recipes/changes instead
+RESET_EVENT = "event: reset\ndata: {}\n\n"
+HEARTBEAT = ": keepalive\n\n"
+
+
+class Subscription:
+    """One connected client: a bounded queue the feed fills and the response drains
+    
+    When the client falls `buffer_size` events behind, the feed stops filling
+    the queue and marks it overflowed; the client is sent a reset and
+    disconnected rather than slowing down the shared stream.
+    """
+    
+    def __init__(self, user_id: str, buffer_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.overflowed = False
+        self.needs_reset = False
+    
+    def offer(self, event: ChangeEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflow()
+    
+    def overflow(self) -> None:
+        """Drop whatever is queued; the client is sent a reset and disconnected"""
+        if self.overflowed:
+            return
+        self.overflowed = True
+        # Wake the reader so it notices the overflow
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+    
+    async def messages(self, heartbeat: float) -> AsyncIterator[str]:
+        """SSE messages until the client disconnects or overflows"""
+        if self.needs_reset:
+            yield RESET_EVENT
+        while True:
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            if self.overflowed:
+                if not self.needs_reset:  # One reset covers everything missed so far
+                    yield RESET_EVENT
+                return
+            self.needs_reset = False
+            yield event.format()
+
+
+class MongoChangeSource:
+    """Raw change documents from one database-level change stream"""
+    
+    def __init__(self, database):
+        self.database = database
+    
+    async def changes(self, resume_after: Optional[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        async with self.database.watch(
+            CHANGE_PIPELINE, full_document="updateLookup", resume_after=resume_after
+        ) as stream:
+            async for change in stream:
+                yield change
+
+
+class InMemoryChangeSource:
+    """Replica-set stand-in for tests and standalone servers: changes are pushed by hand
+    
+    `emit` takes documents shaped like change stream events; a resume token
+    is added when missing.
+    """
+    
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._sequence = 0
+    
+    def emit(self, change: Dict[str, Any]) -> None:
+        self._sequence += 1
+        change.setdefault("_id", {"_data": f"{self._sequence:016x}"})
+        self._queue.put_nowait(change)
+    
+    async def changes(self, resume_after: Optional[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            yield await self._queue.get()
+
+
+class ChangeFeed:
+    """Reads one change stream per process and fans events out to subscribed users
+    
+    Recent events are kept in a bounded history so a reconnecting client can
+    resume from its Last-Event-ID; if that id has fallen out of the history,
+    the client is told to reset and catch up with a delta sync. The shared
+    stream itself resumes from its last token after errors.
+    """
+    
+    def __init__(self):
+        settings = get_settings()
+        self.buffer_size = settings.change_feed_client_buffer
+        self.heartbeat = settings.change_feed_heartbeat_seconds
+        self.max_connections_per_user = settings.change_feed_max_connections_per_user
+        self.history: Deque[ChangeEvent] = deque(maxlen=settings.change_feed_history_size)
+        self.available = False
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._resume_token: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self, source) -> None:
+        self.available = True
+        self._task = asyncio.create_task(self._run(source))
+    
+    def stop(self) -> None:
+        self.available = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+    
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Optional[Subscription]:
+        """Register a client, replaying what it missed; None when it has too many connections"""
+        subscribers = self._subscribers.setdefault(user_id, set())
+        if len(subscribers) >= self.max_connections_per_user:
+            return None
+        subscription = Subscription(user_id, self.buffer_size)
+        subscribers.add(subscription)
+        
+        if last_event_id:
+            missed = self._since(last_event_id)
+            if missed is None:
+                subscription.needs_reset = True
+            else:
+                for event in missed:
+                    if event.user_id == user_id:
+                        subscription.offer(event)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+    
+    def dispatch(self, event: ChangeEvent) -> None:
+        self.history.append(event)
+        for subscription in self._subscribers.get(event.user_id, ()):
+            subscription.offer(event)
+    
+    def _since(self, event_id: str) -> Optional[List[ChangeEvent]]:
+        for index in range(len(self.history) - 1, -1, -1):
+            if self.history[index].id == event_id:
+                return list(self.history)[index + 1:]
+        return None
+    
+    async def _run(self, source) -> None:
+        delay = 1.0
+        while True:
+            try:
+                async for change in source.changes(self._resume_token):
+                    self._resume_token = change["_id"]
+                    event = ChangeEvent.from_change(change)
+                    if event is not None:
+                        self.dispatch(event)
+                    delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                code = getattr(e, "code", None)
+                if code in UNSUPPORTED_CODES:
+                    print(f"Change feed disabled, change streams need a replica set: {e}")
+                    self.available = False
+                    return
+                if code in HISTORY_LOST_CODES:
+                    # Events were missed; connected clients and those resuming from older ids must reset
+                    self._resume_token = None
+                    self.history.clear()
+                    for subscribers in self._subscribers.values():
+                        for subscription in subscribers:
+                            subscription.overflow()
+                print(f"Change stream interrupted, resuming in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+
+@lru_cache()
+def get_change_feed() -> ChangeFeed:
+    """Get the process-wide change feed"""
+    return ChangeFeed()
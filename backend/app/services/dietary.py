@@ -0,0 +1,51 @@
+"""Keep recipes' dietary masks in step with the dietary rules"""
+
+import asyncio
+
+from pymongo import UpdateOne
+
+from app.config import get_settings
+from app.core.constants import DIETARY_RULES_VERSION
+from app.models.recipe import Recipe, RecipeDietaryView
+from app.utils.dietary import allergen_scan_mask, dietary_mask
+
+
+async def backfill_dietary_masks() -> int:
+    """Recompute the masks of every recipe saved under older rules (or none); returns the count
+    
+    New and edited recipes get their mask on save, so this only has work to do
+    after DIETARY_RULES_VERSION changes. Runs in small batches with a pause in
+    between; several processes running it at once only repeat some work.
+    `updated_at` is left alone so a rules change doesn't make every client
+    resync its whole library.
+    """
+    settings = get_settings()
+    stale = {"dietary_rules_version": {"$ne": DIETARY_RULES_VERSION}}
+    updated = 0
+    while True:
+        batch = await Recipe.find(stale).limit(
+            settings.dietary_backfill_batch_size
+        ).project(RecipeDietaryView).to_list()
+        if not batch:
+            return updated
+        
+        await Recipe.get_motor_collection().bulk_write([
+            UpdateOne({"_id": recipe.id, **stale}, {"$set": {
+                "dietary_mask": dietary_mask(recipe.dietary_info, (i.name for i in recipe.ingredients)),
+                "allergen_scan_mask": allergen_scan_mask(i.name for i in recipe.ingredients),
+                "dietary_rules_version": DIETARY_RULES_VERSION,
+            }})
+            for recipe in batch
+        ], ordered=False)
+        updated += len(batch)
+        await asyncio.sleep(settings.dietary_backfill_pause_seconds)
+
+
+async def run_dietary_backfill() -> None:
+    try:
+        updated = await backfill_dietary_masks()
+    except Exception as e:
+        print(f"Dietary mask backfill failed: {e}")
+        return
+    if updated:
+        print(f"Recomputed dietary masks for {updated} recipes")
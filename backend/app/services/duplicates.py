@@ -0,0 +1,93 @@
+"""Find probable duplicates of a recipe through its LSH band keys"""
+
+import asyncio
+from typing import List, Tuple
+
+from pymongo import UpdateOne
+
+from app.config import get_settings
+from app.models.recipe import Recipe, RecipeSignatureView, RecipeTextView
+from app.utils.minhash import MinHasher, get_min_hasher, recipe_features
+
+
+async def find_duplicates(recipe: Recipe, limit: int = 10) -> List[Tuple[RecipeSignatureView, float]]:
+    """Recipes in the same library sharing an LSH band, scored by estimated Jaccard.
+    
+    Only recipes with at least one matching band key are read, via the
+    (user_id, lsh_bands) index, so the cost tracks the number of candidates
+    rather than the size of the library. Candidates sharing the most bands are
+    scored first, so weak single-band collisions are the ones cut off by
+    `duplicate_max_candidates`.
+    """
+    if not recipe.lsh_bands:
+        return []
+    
+    settings = get_settings()
+    candidates = await Recipe.find(
+        {
+            "user_id": recipe.user_id,
+            "lsh_bands": {"$in": recipe.lsh_bands},
+            "_id": {"$ne": recipe.id}
+        }
+    ).aggregate(
+        [
+            {"$addFields": {"shared_bands": {"$size": {"$filter": {
+                "input": "$lsh_bands", "cond": {"$in": ["$$this", recipe.lsh_bands]}
+            }}}}},
+            {"$sort": {"shared_bands": -1, "_id": 1}},
+            {"$limit": settings.duplicate_max_candidates},
+        ],
+        projection_model=RecipeSignatureView
+    ).to_list()
+    
+    scored = [
+        (candidate, MinHasher.similarity(recipe.minhash, candidate.minhash))
+        for candidate in candidates
+    ]
+    scored = [(c, s) for c, s in scored if s >= settings.duplicate_similarity_threshold]
+    scored.sort(key=lambda pair: pair[1], reverse=True)
+    return scored[:limit]
+
+
+async def backfill_signatures() -> int:
+    """Compute the MinHash signature of every recipe saved without one; returns the count
+    
+    New and edited recipes get their signature on save, so this only has work
+    to do for recipes stored before duplicate detection existed. Pages through
+    the library in `_id` order, in small batches with a pause in between;
+    `updated_at` is left alone so clients don't resync their whole library.
+    """
+    settings = get_settings()
+    hasher = get_min_hasher()
+    missing = {"minhash": {"$exists": False}}
+    last_id = None
+    updated = 0
+    while True:
+        query = {**missing, "_id": {"$gt": last_id}} if last_id is not None else missing
+        batch = await Recipe.find(query).sort([("_id", 1)]).limit(
+            settings.duplicate_backfill_batch_size
+        ).project(RecipeTextView).to_list()
+        if not batch:
+            return updated
+        
+        updates = []
+        for recipe in batch:
+            signature = hasher.signature(recipe_features(recipe.title, (i.name for i in recipe.ingredients)))
+            updates.append(UpdateOne({"_id": recipe.id, **missing}, {"$set": {
+                "minhash": signature,
+                "lsh_bands": hasher.band_keys(signature),
+            }}))
+        await Recipe.get_motor_collection().bulk_write(updates, ordered=False)
+        updated += len(batch)
+        last_id = batch[-1].id
+        await asyncio.sleep(settings.duplicate_backfill_pause_seconds)
+
+
+async def run_signature_backfill() -> None:
+    try:
+        updated = await backfill_signatures()
+    except Exception as e:
+        print(f"Duplicate signature backfill failed: {e}")
+        return
+    if updated:
+        print(f"Computed duplicate signatures for {updated} recipes")
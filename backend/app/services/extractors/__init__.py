@@ -1,6 +1,10 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from enum import Enum
+from urllib.parse import urlsplit
 
 
 class ContentType(Enum):
@@ -14,6 +18,13 @@ class ContentType(Enum):
 class BaseExtractor(ABC):
     """Base class for all content extractors"""
     
+    # Hostnames this extractor is dedicated to; subdomains match too.
+    # Extractors without hosts are generic fallbacks tried after host matches.
+    hosts: Tuple[str, ...] = ()
+    
+    # Higher priority wins when several extractors match the same host
+    priority: int = 0
+    
     @abstractmethod
     async def extract(self, url: str) -> Dict[str, Any]:
         """Extract content from the given URL"""
@@ -31,20 +42,137 @@ class BaseExtractor(ABC):
         pass
 
 
+class _HostTrieNode:
+    """Node of a trie keyed on reversed hostname labels (com -> example -> www)"""
+    
+    __slots__ = ("children", "entries")
+    
+    def __init__(self):
+        self.children: Dict[str, "_HostTrieNode"] = {}
+        self.entries: List[Tuple[int, int, BaseExtractor]] = []
+
+
 class ExtractorFactory:
-    """Factory class to get the appropriate extractor for a URL"""
+    """Factory class to get the appropriate extractor for a URL
+    
+    Dispatch is host-indexed: an exact hostname lookup, then the longest
+    registered domain suffix in a label trie, then generic fallbacks. Within
+    each tier candidates are ordered by priority, then registration order, and
+    the first whose `can_handle` accepts the URL wins. Resolved candidate lists
+    are memoized per hostname in a bounded LRU, so the common case is a single
+    dict lookup.
+    
+    The built-in extractors pull in requests, BeautifulSoup and lxml, so they
+    are imported on first dispatch (or by the startup warm-up), not when this
+    package is imported.
+    """
     
     _extractors: list[BaseExtractor] = []
+    _registrations: List[Tuple[Tuple[int, int, BaseExtractor], Tuple[str, ...]]] = []
+    _sequence: int = 0
+    _exact: Dict[str, List[Tuple[int, int, BaseExtractor]]] = {}
+    _trie: _HostTrieNode = _HostTrieNode()
+    _fallbacks: List[Tuple[int, int, BaseExtractor]] = []
+    _resolved: "OrderedDict[str, List[BaseExtractor]]" = OrderedDict()
+    _resolved_size: int = 4096
+    _resolved_lock = threading.Lock()
+    _builtins_loaded: bool = False
+    _builtins_lock = threading.Lock()
+    
+    @classmethod
+    def load_builtins(cls):
+        """Import the built-in extractors, compile rule packs and load plugins, once per process"""
+        if cls._builtins_loaded:
+            return
+        with cls._builtins_lock:
+            if cls._builtins_loaded:
+                return
+            from . import website, youtube, rules  # noqa: F401
+            rules.get_rule_engine().load()
+            cls.load_plugins()
+            cls._builtins_loaded = True
     
     @classmethod
-    def register(cls, extractor: BaseExtractor):
-        """Register a new extractor"""
+    def register(
+        cls,
+        extractor: BaseExtractor,
+        hosts: Optional[Iterable[str]] = None,
+        priority: Optional[int] = None
+    ):
+        """Register a new extractor for its hosts, or as a fallback if it has none"""
+        hosts = tuple(h.lower().strip(".") for h in (hosts if hosts is not None else extractor.hosts))
+        entry = (extractor.priority if priority is None else priority, cls._sequence, extractor)
+        cls._sequence += 1
+        
         cls._extractors.append(extractor)
+        cls._registrations.append((entry, hosts))
+        cls._index(entry, hosts)
+        with cls._resolved_lock:
+            cls._resolved.clear()
+    
+    @classmethod
+    def unregister(cls, extractor: BaseExtractor):
+        """Remove a previously registered extractor"""
+        registrations = [r for r in cls._registrations if r[0][2] is not extractor]
+        
+        cls._extractors = [e for e in cls._extractors if e is not extractor]
+        cls._registrations = registrations
+        cls._exact = {}
+        cls._trie = _HostTrieNode()
+        cls._fallbacks = []
+        for entry, hosts in registrations:
+            cls._index(entry, hosts)
+        with cls._resolved_lock:
+            cls._resolved.clear()
+    
+    @classmethod
+    def _index(cls, entry: Tuple[int, int, BaseExtractor], hosts: Tuple[str, ...]):
+        if not hosts:
+            cls._fallbacks.append(entry)
+            cls._fallbacks.sort(key=cls._sort_key)
+        
+        for host in hosts:
+            if host.startswith("*."):
+                # Wildcards only match subdomains, never the bare domain
+                cls._trie_node(host[2:]).entries.append(entry)
+                continue
+            cls._exact.setdefault(host, []).append(entry)
+            cls._exact[host].sort(key=cls._sort_key)
+            cls._trie_node(host).entries.append(entry)
+    
+    @classmethod
+    def load_plugins(cls, group: str = "smart_recipe_keeper.extractors"):
+        """Register extractors advertised by installed packages via entry points.
+        
+        Each entry point must resolve to an extractor instance, or a class that
+        can be instantiated without arguments. A plugin that fails to load is
+        reported and skipped, leaving the built-in extractors in place.
+        """
+        from importlib.metadata import entry_points
+        
+        advertised = entry_points()
+        # Python 3.9 returns a dict of groups, later versions a selectable collection
+        if hasattr(advertised, "select"):
+            advertised = advertised.select(group=group)
+        else:
+            advertised = advertised.get(group, [])
+        for entry_point in advertised:
+            try:
+                plugin = entry_point.load()
+                cls.register(plugin() if isinstance(plugin, type) else plugin)
+            except Exception as e:
+                print(f"Failed to load extractor plugin {entry_point.name}: {e}")
     
     @classmethod
     def get_extractor(cls, url: str) -> Optional[BaseExtractor]:
         """Get the appropriate extractor for the given URL"""
-        for extractor in cls._extractors:
+        cls.load_builtins()
+        try:
+            host = (urlsplit(url).hostname or "").lower()
+        except ValueError:
+            return None
+        
+        for extractor in cls._candidates(host):
             if extractor.can_handle(url):
                 return extractor
         return None
@@ -53,4 +181,55 @@ class ExtractorFactory:
     def get_content_type(cls, url: str) -> Optional[ContentType]:
         """Get the content type for the given URL"""
         extractor = cls.get_extractor(url)
-        return extractor.content_type if extractor else None
\ No newline at end of file
+        return extractor.content_type if extractor else None
+    
+    @classmethod
+    def _candidates(cls, host: str) -> List[BaseExtractor]:
+        """Extractors to try for a hostname, most specific first"""
+        with cls._resolved_lock:
+            candidates = cls._resolved.get(host)
+            if candidates is not None:
+                cls._resolved.move_to_end(host)
+                return candidates
+        
+        entries = list(cls._exact.get(host, []))
+        
+        # Walk the trie from the TLD down, remembering the deepest match
+        node = cls._trie
+        suffix_entries: List[Tuple[int, int, BaseExtractor]] = []
+        for label in reversed(host.split(".")) if host else []:
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.entries:
+                suffix_entries = node.entries
+        entries += sorted(
+            (e for e in suffix_entries if e not in entries), key=cls._sort_key
+        )
+        
+        candidates = [e[2] for e in entries] + [e[2] for e in cls._fallbacks]
+        with cls._resolved_lock:
+            cls._resolved[host] = candidates
+            while len(cls._resolved) > cls._resolved_size:
+                cls._resolved.popitem(last=False)
+        return candidates
+    
+    @classmethod
+    def _trie_node(cls, domain: str) -> _HostTrieNode:
+        node = cls._trie
+        for label in reversed(domain.split(".")):
+            node = node.children.setdefault(label, _HostTrieNode())
+        return node
+    
+    @staticmethod
+    def _sort_key(entry: Tuple[int, int, BaseExtractor]) -> Tuple[int, int]:
+        return (-entry[0], entry[1])
+
+
+async def watch_rule_packs(poll_interval: float = 5.0):
+    """Hot-reload rule packs until cancelled, once the built-in extractors are loaded"""
+    while not ExtractorFactory._builtins_loaded:
+        await asyncio.sleep(poll_interval)
+    
+    from .rules import get_rule_engine
+    await get_rule_engine().watch()
@@ -0,0 +1,375 @@
+"""Declarative per-site extraction rules compiled into fast extractors"""
+
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+from cssselect import HTMLTranslator, SelectorError
+from lxml import etree, html
+
+from app.config import get_settings
+from app.core.structured_output import RecipeParseError, validate_recipe_data
+from . import BaseExtractor, ContentType, ExtractorFactory
+from .website import WebsiteExtractor
+
+
+DEFAULT_RULES_DIR = os.path.join(os.path.dirname(__file__), "rule_packs")
+
+# Rule packs outrank generic extractors but not hand-written platform extractors
+DEFAULT_RULE_PRIORITY = 5
+
+RECIPE_FIELDS = {
+    "title", "description", "recipe_type", "cuisine", "dietary_info", "prep_time",
+    "cook_time", "total_time", "servings", "difficulty", "tags", "images",
+}
+LIST_FIELDS = {"dietary_info", "tags", "images"}
+INGREDIENT_FIELDS = {"name", "quantity", "unit", "notes"}
+INSTRUCTION_FIELDS = {"instruction", "time"}
+
+DURATION_PART_REGEX = re.compile(
+    r'(\d+)\s*(hours?|hrs?|h|minutes?|mins?|m)\b', re.IGNORECASE
+)
+ISO_DURATION_REGEX = re.compile(r'^P(?:T)?(?:(\d+)H)?(?:(\d+)M)?', re.IGNORECASE)
+INT_REGEX = re.compile(r'\d+')
+
+_css_translator = HTMLTranslator()
+
+
+class RulePackError(ValueError):
+    """Raised when a rule pack cannot be compiled"""
+
+
+def parse_minutes(value: str) -> Optional[int]:
+    """Parse '1 hr 20 mins', 'PT1H20M' or a bare number of minutes"""
+    value = value.strip()
+    if not value:
+        return None
+    
+    iso = ISO_DURATION_REGEX.match(value)
+    if iso and (iso.group(1) or iso.group(2)):
+        return int(iso.group(1) or 0) * 60 + int(iso.group(2) or 0)
+    
+    parts = DURATION_PART_REGEX.findall(value)
+    if parts:
+        return sum(int(n) * (60 if unit.lower().startswith('h') else 1) for n, unit in parts)
+    
+    number = INT_REGEX.search(value)
+    return int(number.group()) if number else None
+
+
+@dataclass
+class CompiledSelector:
+    """A CSS or XPath selector compiled to an lxml XPath evaluator"""
+    xpath: etree.XPath
+    attr: Optional[str] = None
+    kind: str = "text"  # text, int or minutes
+    many: bool = False
+    
+    @classmethod
+    def compile(cls, spec: Dict[str, Any], where: str) -> "CompiledSelector":
+        try:
+            if "css" in spec:
+                expression = _css_translator.css_to_xpath(spec["css"])
+            elif "xpath" in spec:
+                expression = spec["xpath"]
+            else:
+                raise RulePackError(f"{where}: selector needs 'css' or 'xpath'")
+            return cls(
+                xpath=etree.XPath(expression),
+                attr=spec.get("attr"),
+                kind=spec.get("type", "text"),
+                many=bool(spec.get("all", False))
+            )
+        except (etree.XPathSyntaxError, SelectorError, SyntaxError) as e:
+            raise RulePackError(f"{where}: {e}")
+    
+    def values(self, node: Any) -> List[str]:
+        results = self.xpath(node)
+        if not isinstance(results, list):
+            results = [results]
+        
+        values = []
+        for result in results:
+            if isinstance(result, str):
+                value = result
+            elif self.attr:
+                value = result.get(self.attr) or ""
+            else:
+                value = result.text_content()
+            value = " ".join(value.split())
+            if value:
+                values.append(value)
+        return values
+    
+    def extract(self, node: Any) -> Any:
+        values = self.values(node)
+        if self.kind == "int":
+            values = [int(m.group()) for m in map(INT_REGEX.search, values) if m]
+        elif self.kind == "minutes":
+            values = [m for m in map(parse_minutes, values) if m is not None]
+        
+        if self.many:
+            return values
+        return values[0] if values else None
+
+
+@dataclass
+class ListRule:
+    """Selector for repeated items plus per-item field selectors"""
+    item: CompiledSelector
+    fields: Dict[str, CompiledSelector] = field(default_factory=dict)
+
+
+@dataclass
+class RulePack:
+    """A compiled rule pack for a set of hosts"""
+    name: str
+    hosts: Tuple[str, ...]
+    priority: int
+    recipe: Dict[str, CompiledSelector]
+    ingredients: Optional[ListRule]
+    instructions: Optional[ListRule]
+    
+    @classmethod
+    def compile(cls, name: str, spec: Dict[str, Any]) -> "RulePack":
+        hosts = tuple(spec.get("hosts") or ())
+        if not hosts:
+            raise RulePackError(f"{name}: rule pack needs at least one host")
+        
+        recipe = {}
+        for field_name, selector in (spec.get("recipe") or {}).items():
+            if field_name not in RECIPE_FIELDS:
+                raise RulePackError(f"{name}: unknown recipe field '{field_name}'")
+            recipe[field_name] = CompiledSelector.compile(selector, f"{name}.recipe.{field_name}")
+            if field_name in LIST_FIELDS:
+                recipe[field_name].many = True
+        
+        return cls(
+            name=spec.get("name", name),
+            hosts=hosts,
+            priority=int(spec.get("priority", DEFAULT_RULE_PRIORITY)),
+            recipe=recipe,
+            ingredients=cls._compile_list(name, "ingredients", spec, INGREDIENT_FIELDS),
+            instructions=cls._compile_list(name, "instructions", spec, INSTRUCTION_FIELDS)
+        )
+    
+    @staticmethod
+    def _compile_list(name: str, key: str, spec: Dict[str, Any], allowed: set) -> Optional[ListRule]:
+        rule = spec.get(key)
+        if not rule:
+            return None
+        fields = {}
+        for field_name, selector in (rule.get("fields") or {}).items():
+            if field_name not in allowed:
+                raise RulePackError(f"{name}: unknown {key} field '{field_name}'")
+            fields[field_name] = CompiledSelector.compile(selector, f"{name}.{key}.{field_name}")
+        item = CompiledSelector.compile(rule["item"], f"{name}.{key}.item")
+        item.many = True
+        return ListRule(item=item, fields=fields)
+    
+    def apply(self, document: Any, url: str) -> Dict[str, Any]:
+        """Run the rules against a parsed page and return raw recipe fields"""
+        recipe: Dict[str, Any] = {}
+        for field_name, selector in self.recipe.items():
+            value = selector.extract(document)
+            if value not in (None, []):
+                recipe[field_name] = value
+        
+        if recipe.get("images"):
+            images = recipe["images"] if isinstance(recipe["images"], list) else [recipe["images"]]
+            recipe["images"] = [urljoin(url, src) for src in images]
+        
+        if self.ingredients:
+            ingredients = []
+            for node in self.ingredients.item.xpath(document):
+                # Without field selectors the whole item text is the ingredient
+                values = self._item_fields(self.ingredients, node) or {
+                    "name": " ".join(node.text_content().split())
+                }
+                if values.get("name"):
+                    ingredients.append({
+                        "name": values["name"],
+                        "quantity": values.get("quantity") or "",
+                        "unit": values.get("unit") or "",
+                        "notes": values.get("notes")
+                    })
+            recipe["ingredients"] = ingredients
+        
+        if self.instructions:
+            steps = []
+            for node in self.instructions.item.xpath(document):
+                values = self._item_fields(self.instructions, node)
+                text = values.get("instruction") or " ".join(node.text_content().split())
+                if text:
+                    steps.append({
+                        "step_number": len(steps) + 1,
+                        "instruction": text,
+                        "time": values.get("time")
+                    })
+            recipe["instructions"] = steps
+        
+        return recipe
+    
+    @staticmethod
+    def _item_fields(rule: ListRule, node: Any) -> Dict[str, Any]:
+        return {name: selector.extract(node) for name, selector in rule.fields.items()}
+
+
+class RuleBasedExtractor(BaseExtractor):
+    """Extractor that applies a compiled rule pack, falling back to the generic path"""
+    
+    def __init__(self, pack: RulePack, fetcher: WebsiteExtractor):
+        self.pack = pack
+        self.fetcher = fetcher
+        self.hosts = pack.hosts
+        self.priority = pack.priority
+    
+    async def extract(self, url: str) -> Dict[str, Any]:
+        """Extract a fully structured recipe, or page content for the LLM path"""
+        try:
+            body = b''.join(self.fetcher.fetch_chunks(url))
+        except Exception as e:
+            raise Exception(f"Failed to extract content from {url}: {str(e)}")
+        
+        recipe = self.extract_recipe(body, url)
+        if recipe is None:
+            # Layout changed or page is not a recipe; let Gemini handle it
+            return self.fetcher.extract_from_body(url, body)
+        
+        return {
+            "url": url,
+            "title": recipe.get("title", ""),
+            "description": recipe.get("description") or "",
+            "images": recipe.pop("images", []),
+            "recipe_data": {},
+            "raw_content": "",
+            "content_type": self.content_type.value,
+            "structured_recipe": recipe
+        }
+    
+    def extract_recipe(self, body: bytes, url: str) -> Optional[Dict[str, Any]]:
+        """Apply the rules to a page body; None when they do not yield a usable recipe"""
+        try:
+            document = html.fromstring(body)
+        except (etree.ParserError, ValueError):
+            return None
+        
+        raw = self.pack.apply(document, url)
+        images = raw.get("images", [])
+        try:
+            recipe = validate_recipe_data(raw)
+        except RecipeParseError:
+            return None
+        if not recipe.get("ingredients") or not recipe.get("instructions"):
+            return None
+        
+        recipe["images"] = images
+        recipe["source"] = {"type": self.content_type.value, "url": url, "platform": "web"}
+        return recipe
+    
+    def can_handle(self, url: str) -> bool:
+        return urlparse(url).scheme in ("http", "https")
+    
+    @property
+    def content_type(self) -> ContentType:
+        return ContentType.WEBSITE
+
+
+class RuleEngine:
+    """Load rule packs from a directory, compile them once and hot-reload on change"""
+    
+    def __init__(self, directory: str, reload_interval: float = 5.0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.fetcher = WebsiteExtractor()
+        self.extractors: Dict[str, RuleBasedExtractor] = {}
+        self._signature: Tuple = ()
+    
+    def _files(self) -> List[str]:
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+        return [
+            os.path.join(self.directory, n) for n in names
+            if n.endswith((".json", ".yaml", ".yml"))
+        ]
+    
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for path in self._files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+    
+    @staticmethod
+    def _read(path: str) -> Dict[str, Any]:
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                spec = json.load(f)
+            else:
+                try:
+                    import yaml
+                except ImportError:
+                    raise RulePackError(f"{path}: PyYAML is required for YAML rule packs")
+                spec = yaml.safe_load(f) or {}
+        if not isinstance(spec, dict):
+            raise RulePackError(f"{path}: a rule pack must be a mapping, not {type(spec).__name__}")
+        return spec
+    
+    def load(self) -> None:
+        """Compile every pack and atomically swap the registered extractors"""
+        signature = self._current_signature()
+        compiled: Dict[str, RuleBasedExtractor] = {}
+        
+        for path, _, _ in signature:
+            name = os.path.splitext(os.path.basename(path))[0]
+            try:
+                pack = RulePack.compile(name, self._read(path))
+            except Exception as e:
+                # A broken pack (bad YAML, a bad selector, ...) only disables that site's fast path
+                print(f"Skipping rule pack {path}: {str(e)}")
+                continue
+            compiled[name] = RuleBasedExtractor(pack, self.fetcher)
+        
+        for extractor in self.extractors.values():
+            ExtractorFactory.unregister(extractor)
+        for extractor in compiled.values():
+            ExtractorFactory.register(extractor)
+        
+        self.extractors = compiled
+        self._signature = signature
+    
+    def reload_if_changed(self) -> bool:
+        """Recompile when pack files were added, removed or modified"""
+        if self._current_signature() == self._signature:
+            return False
+        self.load()
+        return True
+    
+    async def watch(self) -> None:
+        """Poll the rules directory for changes until cancelled"""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                print(f"Rule pack reload error: {str(e)}")
+
+
+@lru_cache()
+def get_rule_engine() -> RuleEngine:
+    """Get the shared rule engine"""
+    settings = get_settings()
+    return RuleEngine(
+        settings.extraction_rules_dir or DEFAULT_RULES_DIR,
+        settings.extraction_rules_reload_seconds
+    )
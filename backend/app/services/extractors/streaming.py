@@ -0,0 +1,202 @@
+"""Single-pass, incremental HTML scanning for recipe pages"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+
+from lxml import etree
+
+
+# Elements whose text is never visible
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head'}
+
+# Elements that start a new line of visible text
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'tr', 'td', 'th', 'table', 'section',
+    'article', 'header', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote',
+    'pre', 'dt', 'dd', 'figcaption', 'main', 'aside', 'nav', 'form', 'label',
+}
+
+
+def find_recipe_schema(data: Any) -> Optional[Dict[str, Any]]:
+    """Find a schema.org Recipe object in decoded JSON-LD, including inside @graph"""
+    if isinstance(data, list):
+        for item in data:
+            found = find_recipe_schema(item)
+            if found:
+                return found
+        return None
+    
+    if not isinstance(data, dict):
+        return None
+    
+    types = data.get('@type')
+    if types == 'Recipe' or (isinstance(types, list) and 'Recipe' in types):
+        return data
+    
+    if '@graph' in data:
+        return find_recipe_schema(data['@graph'])
+    
+    return None
+
+
+def is_complete_recipe(recipe: Optional[Dict[str, Any]]) -> bool:
+    """Whether JSON-LD carries enough to skip reading the rest of the page"""
+    return bool(recipe and recipe.get('recipeIngredient') and recipe.get('recipeInstructions'))
+
+
+class PageCollector:
+    """lxml parser target that gathers everything the extractor needs in one pass.
+    
+    Collects the <title>, first <h1>, meta/og tags, application/ld+json blocks,
+    image sources and visible text as the document streams in.
+    """
+    
+    def __init__(self, base_url: str, max_images: int = 5, max_text_chars: int = 60000):
+        self.base_url = base_url
+        self.max_images = max_images
+        self.max_text_chars = max_text_chars
+        
+        self.title = ''
+        self.h1 = ''
+        self.meta: Dict[str, str] = {}
+        self.images: List[str] = []
+        self.recipe_data: Optional[Dict[str, Any]] = None
+        
+        self._skip_depth = 0
+        self._capture: Optional[str] = None
+        self._captured: List[str] = []
+        self._text: List[str] = []
+        self._text_chars = 0
+    
+    @property
+    def recipe_complete(self) -> bool:
+        return is_complete_recipe(self.recipe_data)
+    
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ''
+        
+        if tag == 'meta':
+            key = attrib.get('property') or attrib.get('name')
+            if key and 'content' in attrib:
+                self.meta.setdefault(key.lower(), attrib['content'])
+        elif tag == 'img':
+            self._add_image(attrib.get('src', ''))
+        elif tag == 'script' and attrib.get('type', '').lower() == 'application/ld+json':
+            self._begin_capture('ld+json')
+        elif tag == 'title' and not self.title:
+            self._begin_capture('title')
+        elif tag == 'h1' and not self.h1:
+            self._begin_capture('h1')
+        
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._text.append('\n')
+    
+    def end(self, tag: str) -> None:
+        tag = tag.lower() if isinstance(tag, str) else ''
+        
+        if self._capture and tag == {'ld+json': 'script'}.get(self._capture, self._capture):
+            self._end_capture()
+        
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._text.append('\n')
+    
+    def data(self, data: str) -> None:
+        if self._capture:
+            self._captured.append(data)
+        
+        if self._skip_depth or self._text_chars >= self.max_text_chars:
+            return
+        self._text.append(data)
+        self._text_chars += len(data)
+    
+    def close(self) -> 'PageCollector':
+        if self._capture:
+            self._end_capture()
+        return self
+    
+    def _begin_capture(self, kind: str) -> None:
+        self._capture = kind
+        self._captured = []
+    
+    def _end_capture(self) -> None:
+        kind, text = self._capture, ''.join(self._captured)
+        self._capture, self._captured = None, []
+        
+        if kind == 'title':
+            self.title = text.strip()
+        elif kind == 'h1':
+            self.h1 = ' '.join(text.split())
+        elif kind == 'ld+json' and not self.recipe_complete:
+            try:
+                recipe = find_recipe_schema(json.loads(text))
+            except ValueError:
+                return
+            if recipe and (self.recipe_data is None or is_complete_recipe(recipe)):
+                self.recipe_data = recipe
+    
+    def _add_image(self, src: str) -> None:
+        if len(self.images) >= self.max_images or not src:
+            return
+        if src.startswith('http') or src.startswith('/'):
+            absolute = urljoin(self.base_url, src)
+            if absolute not in self.images:
+                self.images.append(absolute)
+    
+    def text_content(self) -> str:
+        """Visible text, one trimmed phrase per line"""
+        lines = (line.strip() for line in ''.join(self._text).splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return '\n'.join(chunk for chunk in chunks if chunk)[:self.max_text_chars]
+    
+    def to_content(self) -> Dict[str, Any]:
+        """Title, description, images, recipe data and text in the extractor's shape"""
+        title = self.title or self.meta.get('og:title', '') or self.h1
+        description = self.meta.get('description') or self.meta.get('og:description', '')
+        
+        images = list(self.images)
+        if self.meta.get('og:image'):
+            og_image = urljoin(self.base_url, self.meta['og:image'])
+            images = [og_image] + [image for image in images if image != og_image]
+        
+        return {
+            "title": title,
+            "description": description,
+            "images": images,
+            "recipe_data": self.recipe_data or {},
+            "raw_content": self.text_content(),
+        }
+
+
+class StreamingPageParser:
+    """Feed HTML bytes incrementally and stop as soon as a complete recipe is known"""
+    
+    def __init__(self, base_url: str, max_images: int = 5, max_text_chars: int = 60000):
+        self.collector = PageCollector(base_url, max_images, max_text_chars)
+        self._parser = etree.HTMLParser(target=self.collector, recover=True)
+        self.bytes_read = 0
+    
+    def feed(self, chunk: bytes) -> bool:
+        """Feed a chunk; returns True once the rest of the page can be skipped"""
+        self.bytes_read += len(chunk)
+        self._parser.feed(chunk)
+        return self.collector.recipe_complete
+    
+    def close(self) -> PageCollector:
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            # Truncated documents are expected when we stop early
+            pass
+        return self.collector
+    
+    def parse(self, chunks: Iterable[bytes]) -> PageCollector:
+        """Consume chunks until the page ends or the recipe is complete"""
+        for chunk in chunks:
+            if chunk and self.feed(chunk):
+                break
+        return self.close()
@@ -1,15 +1,27 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator
 from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
+from app.config import get_settings
+from app.services.http_cache import get_http_cache
 from . import BaseExtractor, ContentType, ExtractorFactory
+from .streaming import StreamingPageParser, find_recipe_schema
+
+
+# Size of each read from the network or the cache
+CHUNK_SIZE = 16384
 
 
 class WebsiteExtractor(BaseExtractor):
     """Extractor for general website URLs"""
     
     def __init__(self):
+        settings = get_settings()
+        self.streaming = settings.extractor_streaming
+        self.max_page_bytes = settings.extractor_max_page_bytes
+        self.max_text_chars = settings.extractor_max_text_chars
+        
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -18,33 +30,90 @@ class WebsiteExtractor(BaseExtractor):
     async def extract(self, url: str) -> Dict[str, Any]:
         """Extract content from a website URL"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'lxml')
+            if self.streaming:
+                return self._extract_streaming(url, self.fetch_chunks(url))
             
-            # Extract basic metadata
-            title = self._extract_title(soup)
-            description = self._extract_description(soup)
-            images = self._extract_images(soup, url)
+            return self.extract_from_body(url, b''.join(self.fetch_chunks(url)))
+        except Exception as e:
+            raise Exception(f"Failed to extract content from {url}: {str(e)}")
+    
+    def extract_from_body(self, url: str, body: bytes) -> Dict[str, Any]:
+        """Extract content from an already downloaded page"""
+        if self.streaming:
+            return self._extract_streaming(url, self._split(body))
+        
+        soup = BeautifulSoup(body, 'lxml')
+        
+        # Extract basic metadata
+        title = self._extract_title(soup)
+        description = self._extract_description(soup)
+        images = self._extract_images(soup, url)
+        
+        # Extract recipe-specific data if available (schema.org)
+        recipe_data = self._extract_recipe_schema(soup)
+        
+        # Extract raw text content for Gemini processing
+        text_content = self._extract_text_content(soup)
+        
+        return {
+            "url": url,
+            "title": title,
+            "description": description,
+            "images": images,
+            "recipe_data": recipe_data,
+            "raw_content": text_content,
+            "content_type": self.content_type.value
+        }
+    
+    def _extract_streaming(self, url: str, chunks: Iterable[bytes]) -> Dict[str, Any]:
+        """Scan the page in one incremental pass, stopping once a complete recipe is found"""
+        parser = StreamingPageParser(url, max_images=5, max_text_chars=self.max_text_chars)
+        collector = parser.parse(chunks)
+        
+        return {
+            "url": url,
+            **collector.to_content(),
+            "content_type": self.content_type.value
+        }
+    
+    def fetch_chunks(self, url: str) -> Iterator[bytes]:
+        """Stream a page, revalidating any cached copy with ETag/Last-Modified.
+        
+        The body is only cached when it was read to the end; a consumer that
+        stops early also stops the download.
+        """
+        cache = get_http_cache()
+        cached = cache.lookup(url) if cache else None
+        
+        if cached and cached.is_fresh():
+            yield from self._split(cached.body)
+            return
+        
+        headers = cached.conditional_headers() if cached else {}
+        with self.session.get(url, timeout=10, headers=headers, stream=True) as response:
+            if cached and response.status_code == 304:
+                cache.revalidated(cached, response.headers)
+                yield from self._split(cached.body)
+                return
             
-            # Extract recipe-specific data if available (schema.org)
-            recipe_data = self._extract_recipe_schema(soup)
+            response.raise_for_status()
             
-            # Extract raw text content for Gemini processing
-            text_content = self._extract_text_content(soup)
+            parts = []
+            size = 0
+            for chunk in response.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_page_bytes:
+                    return
+                parts.append(chunk)
+                yield chunk
             
-            return {
-                "url": url,
-                "title": title,
-                "description": description,
-                "images": images,
-                "recipe_data": recipe_data,
-                "raw_content": text_content,
-                "content_type": self.content_type.value
-            }
-        except Exception as e:
-            raise Exception(f"Failed to extract content from {url}: {str(e)}")
+            if cache:
+                cache.store(url, response.headers, b''.join(parts))
+    
+    @staticmethod
+    def _split(body: bytes) -> Iterator[bytes]:
+        for start in range(0, len(body), CHUNK_SIZE):
+            yield body[start:start + CHUNK_SIZE]
     
     def can_handle(self, url: str) -> bool:
         """Check if this is a valid website URL"""
@@ -117,15 +186,9 @@ class WebsiteExtractor(BaseExtractor):
         for script in scripts:
             try:
                 import json
-                data = json.loads(script.string)
-                
-                # Check if it's a recipe schema
-                if isinstance(data, dict) and data.get('@type') == 'Recipe':
-                    return data
-                elif isinstance(data, list):
-                    for item in data:
-                        if isinstance(item, dict) and item.get('@type') == 'Recipe':
-                            return item
+                recipe = find_recipe_schema(json.loads(script.string))
+                if recipe:
+                    return recipe
             except:
                 continue
         
@@ -149,8 +212,9 @@ class WebsiteExtractor(BaseExtractor):
         # Drop blank lines
         text = '\n'.join(chunk for chunk in chunks if chunk)
         
-        # Limit text length for API calls
-        return text[:10000]
+        # Keep generously more than the prompt budget; the Gemini service
+        # selects the recipe-relevant window from this
+        return text[:get_settings().extractor_max_text_chars]
 
 
 # Register the extractor
@@ -1,37 +1,173 @@
+import asyncio
 import re
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+from app.config import get_settings
+from app.services.youtube_api import (
+    TranscriptClient,
+    TranscriptSegment,
+    VideoMetadataBatcher,
+    YouTubeDataClient
+)
+from app.utils.content_window import (
+    INGREDIENT_HEADING_REGEX,
+    QUANTITY_REGEX,
+    SECTION_HEADING_REGEX,
+    select_recipe_window
+)
 from . import BaseExtractor, ContentType, ExtractorFactory
 
 
+# Transcript captions are grouped into lines of roughly this many seconds
+TRANSCRIPT_LINE_SECONDS = 30.0
+
+BULLET_REGEX = re.compile(r'^\s*([-*•·▪►✓✔]|\d+[.)])\s*')
+TIMESTAMP_REGEX = re.compile(r'^\s*\(?\d{1,2}:\d{2}(:\d{2})?\)?\s*[-–]?\s*')
+ISO_DURATION_REGEX = re.compile(r'^PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$')
+
+
+def parse_description_ingredients(description: str) -> List[str]:
+    """Pull an ingredient list out of a video description.
+    
+    Prefers the lines under an "Ingredients" heading, up to the next section
+    heading or blank line after the list; otherwise falls back to any line that
+    looks like a measured ingredient.
+    """
+    lines = [line.strip() for line in description.splitlines()]
+    
+    ingredients: List[str] = []
+    in_section = False
+    for line in lines:
+        if INGREDIENT_HEADING_REGEX.match(line) and len(line) < 40:
+            in_section = True
+            ingredients = []
+            continue
+        if not in_section:
+            continue
+        if not line:
+            if ingredients:
+                in_section = False
+            continue
+        if SECTION_HEADING_REGEX.match(line) or (line.endswith(':') and not QUANTITY_REGEX.search(line)):
+            in_section = False
+            continue
+        ingredients.append(BULLET_REGEX.sub('', line))
+    
+    if ingredients:
+        return ingredients
+    
+    return [
+        BULLET_REGEX.sub('', TIMESTAMP_REGEX.sub('', line))
+        for line in lines
+        if line and len(line) < 120 and QUANTITY_REGEX.search(line)
+    ]
+
+
+def parse_iso_duration(duration: str) -> Optional[int]:
+    """Video length in seconds from an ISO 8601 duration such as PT12M30S"""
+    match = ISO_DURATION_REGEX.match(duration or '')
+    if not match:
+        return None
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def transcript_to_text(segments: List[TranscriptSegment]) -> str:
+    """Join caption segments into timestamped lines for windowing"""
+    lines = []
+    current: List[str] = []
+    line_start = 0.0
+    for segment in segments:
+        if current and segment.start - line_start >= TRANSCRIPT_LINE_SECONDS:
+            lines.append(f"[{int(line_start) // 60}:{int(line_start) % 60:02d}] {' '.join(current)}")
+            current = []
+        if not current:
+            line_start = segment.start
+        current.append(segment.text)
+    if current:
+        lines.append(f"[{int(line_start) // 60}:{int(line_start) % 60:02d}] {' '.join(current)}")
+    return '\n'.join(lines)
+
+
 class YouTubeExtractor(BaseExtractor):
-    """Extractor for YouTube video URLs"""
+    """Extractor for YouTube video URLs
+    
+    Video metadata comes from the Data API; lookups made concurrently (e.g. a
+    bulk import) are coalesced into shared `videos.list` calls of up to 50 IDs.
+    Ingredients are parsed from the description, and the transcript is cached
+    per video and trimmed to its most recipe-like segments before it is handed
+    to Gemini.
+    """
+    
+    hosts = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+    priority = 10
     
     YOUTUBE_REGEX = re.compile(
-        r'(https?://)?(www\.)?(youtube\.com/(watch\?v=|embed/|v/)|youtu\.be/)[\w-]+'
+        r'(https?://)?([\w-]+\.)?(youtube(-nocookie)?\.com/(watch\?v=|embed/|v/|shorts/)|youtu\.be/)[\w-]+'
     )
     
+    def __init__(self):
+        settings = get_settings()
+        self.transcript_token_budget = settings.youtube_transcript_token_budget
+        self._batcher: Optional[VideoMetadataBatcher] = None
+    
     async def extract(self, url: str) -> Dict[str, Any]:
         """Extract content from a YouTube URL"""
-        # TODO: Implement YouTube extraction
-        # This will use YouTube Data API v3 to get video metadata
-        # and potentially transcripts for recipe extraction
-        
         video_id = self._extract_video_id(url)
+        if not video_id:
+            raise ValueError("Could not find a video ID in the YouTube URL")
+        
+        video = await self.metadata_batcher.get(video_id)
+        if video is None:
+            raise ValueError(f"YouTube video {video_id} was not found")
+        
+        snippet = video.get('snippet', {})
+        description = snippet.get('description', '')
+        ingredients = parse_description_ingredients(description)
+        
+        try:
+            segments = await asyncio.to_thread(get_transcript_client().get, video_id)
+        except Exception as e:
+            # Description and metadata are still worth extracting from
+            print(f"Error fetching transcript for {video_id}: {e}")
+            segments = []
+        transcript = select_recipe_window(transcript_to_text(segments), self.transcript_token_budget)
+        
+        raw_parts = [description]
+        if transcript:
+            raw_parts.append(f"Transcript:\n{transcript}")
         
         return {
             "url": url,
             "video_id": video_id,
-            "title": "YouTube extraction not yet implemented",
-            "description": "",
-            "images": [],
-            "raw_content": "",
+            "title": snippet.get('title', ''),
+            "description": description,
+            "images": self._thumbnails(snippet.get('thumbnails', {})),
+            "raw_content": '\n\n'.join(raw_parts),
+            "recipe_data": {"recipeIngredient": ingredients} if ingredients else {},
             "content_type": self.content_type.value,
             "platform_data": {
                 "platform": "youtube",
-                "video_id": video_id
+                "video_id": video_id,
+                "channel": snippet.get('channelTitle'),
+                "published_at": snippet.get('publishedAt'),
+                "duration_seconds": parse_iso_duration(video.get('contentDetails', {}).get('duration')),
+                "has_transcript": bool(segments)
             }
         }
     
+    @property
+    def metadata_batcher(self) -> VideoMetadataBatcher:
+        """Shared batcher, created lazily so the API key is only required on use"""
+        if self._batcher is None:
+            settings = get_settings()
+            if not settings.youtube_api_key:
+                raise ValueError("YouTube extraction requires YOUTUBE_API_KEY to be set")
+            self._batcher = VideoMetadataBatcher(
+                YouTubeDataClient(settings.youtube_api_key, settings.youtube_api_base_url)
+            )
+        return self._batcher
+    
     def can_handle(self, url: str) -> bool:
         """Check if this is a YouTube URL"""
         return bool(self.YOUTUBE_REGEX.match(url))
@@ -40,6 +176,15 @@ class YouTubeExtractor(BaseExtractor):
     def content_type(self) -> ContentType:
         return ContentType.YOUTUBE
     
+    def _thumbnails(self, thumbnails: Dict[str, Any]) -> List[str]:
+        """Thumbnail URLs, largest first"""
+        ranked = sorted(
+            (t for t in thumbnails.values() if t.get('url')),
+            key=lambda t: t.get('width', 0),
+            reverse=True
+        )
+        return [t['url'] for t in ranked[:1]]
+    
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
         patterns = [
@@ -56,5 +201,17 @@ class YouTubeExtractor(BaseExtractor):
         return ""
 
 
+@lru_cache()
+def get_transcript_client() -> TranscriptClient:
+    """Get the process-wide transcript client and its cache"""
+    settings = get_settings()
+    return TranscriptClient(
+        settings.youtube_transcript_url,
+        languages=tuple(settings.youtube_transcript_languages),
+        cache_size=settings.youtube_transcript_cache_size,
+        cache_ttl=settings.youtube_transcript_cache_ttl
+    )
+
+
 # Register the extractor
-ExtractorFactory.register(YouTubeExtractor())
\ No newline at end of file
+ExtractorFactory.register(YouTubeExtractor())
@@ -0,0 +1,223 @@
+"""Persistent on-disk HTTP response cache with validators and LRU eviction"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, Mapping, Optional
+
+from app.config import get_settings
+
+
+@dataclass
+class CachedResponse:
+    """A cached page body together with its HTTP validators"""
+    url: str
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: float = 0.0
+    no_cache: bool = False
+    
+    def is_fresh(self) -> bool:
+        """Whether the body can be served without revalidating upstream"""
+        return not self.no_cache and time.time() < self.expires_at
+    
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers that let the origin answer 304 Not Modified"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a directive -> argument mapping"""
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> float:
+    """Seconds a response stays fresh, from max-age or Expires (0 if unspecified)"""
+    directives = parse_cache_control(headers.get('Cache-Control'))
+    for name in ('s-maxage', 'max-age'):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    
+    if headers.get('Expires'):
+        try:
+            return max(0.0, parsedate_to_datetime(headers['Expires']).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    
+    return 0.0
+
+
+class HttpCache:
+    """Cache of fetched pages keyed by URL.
+    
+    Bodies are stored as content files named by the URL hash; an SQLite index
+    tracks validators, expiry, size and last access for LRU eviction once the
+    total size exceeds `max_bytes`.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(directory, 'index.sqlite3'), check_same_thread=False
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                no_cache INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._db.commit()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+    
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, marking it as recently used"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT key, etag, last_modified, expires_at, no_cache FROM entries WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if not row:
+                return None
+            
+            key, etag, last_modified, expires_at, no_cache = row
+            try:
+                with open(self._path(key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                # Index and content store drifted apart; forget the entry
+                self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._db.commit()
+                return None
+            
+            self._db.execute(
+                "UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url)
+            )
+            self._db.commit()
+        
+        return CachedResponse(
+            url=url,
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            expires_at=expires_at,
+            no_cache=bool(no_cache)
+        )
+    
+    def store(self, url: str, headers: Mapping[str, str], body: bytes) -> None:
+        """Store a 200 response unless Cache-Control forbids it"""
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives or len(body) > self.max_bytes:
+            return
+        
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # Write then rename so readers never see a partial body
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (url, key, etag, last_modified, expires_at, no_cache, size, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    url,
+                    key,
+                    headers.get('ETag'),
+                    headers.get('Last-Modified'),
+                    now + freshness_lifetime(headers),
+                    int('no-cache' in directives),
+                    len(body),
+                    now
+                )
+            )
+            self._evict()
+            self._db.commit()
+    
+    def revalidated(self, cached: CachedResponse, headers: Mapping[str, str]) -> None:
+        """Record a 304 for a cached entry, refreshing its validators and expiry"""
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE entries
+                SET etag = ?, last_modified = ?, expires_at = ?, no_cache = ?, last_access = ?
+                WHERE url = ?
+                """,
+                (
+                    headers.get('ETag') or cached.etag,
+                    headers.get('Last-Modified') or cached.last_modified,
+                    time.time() + freshness_lifetime(headers),
+                    int('no-cache' in directives),
+                    time.time(),
+                    cached.url
+                )
+            )
+            self._db.commit()
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits its size budget"""
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        
+        rows = self._db.execute(
+            "SELECT url, key, size FROM entries ORDER BY last_access ASC"
+        ).fetchall()
+        for url, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+
+
+@lru_cache()
+def get_http_cache() -> Optional[HttpCache]:
+    """Get the shared HTTP cache, or None when caching is disabled"""
+    settings = get_settings()
+    if not settings.http_cache_enabled:
+        return None
+    return HttpCache(settings.http_cache_dir, settings.http_cache_max_mb * 1024 * 1024)
@@ -0,0 +1,223 @@
+"""Download, dedupe, thumbnail and store recipe images under content addresses"""
+
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+
+
+THUMBNAIL_FORMAT = "jpg"
+THUMBNAIL_QUALITY = 85
+
+
+def perceptual_hash(image) -> int:
+    """64-bit difference hash: compares neighbouring pixels of a 9x8 grayscale image"""
+    from PIL import Image
+    
+    pixels = list(image.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def render_thumbnails(data: bytes, sizes: Tuple[int, ...]) -> Tuple[int, int, int, Dict[int, bytes]]:
+    """Decode an image and encode it at each width; runs in a worker process.
+    
+    Returns (perceptual hash, width, height, {width: jpeg bytes}). Widths
+    larger than the original are skipped, except that the smallest requested
+    size is always produced.
+    """
+    from PIL import Image, ImageOps
+    
+    with Image.open(io.BytesIO(data)) as source:
+        # Let the JPEG decoder downscale while decoding; a no-op for other formats
+        source.draft("RGB", (max(sizes), max(sizes)))
+        image = ImageOps.exif_transpose(source).convert("RGB")
+    
+    width, height = image.size
+    thumbnails: Dict[int, bytes] = {}
+    for size in sorted(sizes):
+        if size > width and thumbnails:
+            break
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size * 4), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        thumbnails[size] = buffer.getvalue()
+    
+    return perceptual_hash(image), width, height, thumbnails
+
+
+@dataclass
+class StoredImage:
+    """An image kept in the local store, addressed by the sha256 of its source bytes"""
+    digest: str
+    source_url: str
+    width: int
+    height: int
+    phash: int
+    sizes: List[int] = field(default_factory=list)
+
+
+class ImageStore:
+    """Content-addressed thumbnail storage on local disk
+    
+    Files live at `<root>/<digest[:2]>/<digest>/<size>.jpg`. A digest never
+    changes meaning, so files are written once and never updated.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def path(self, digest: str, size: int) -> str:
+        return os.path.join(self.root, digest[:2], digest, f"{size}.{THUMBNAIL_FORMAT}")
+    
+    def exists(self, digest: str, size: int) -> bool:
+        return os.path.exists(self.path(digest, size))
+    
+    def write(self, digest: str, size: int, data: bytes) -> None:
+        """Write atomically so concurrent readers never see a partial file"""
+        path = self.path(digest, size)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class ImagePipeline:
+    """Fetch the images chosen during extraction and replace them with local thumbnails"""
+    
+    def __init__(self):
+        settings = get_settings()
+        self.store = ImageStore(settings.image_storage_dir)
+        self.sizes = tuple(sorted(settings.image_thumbnail_sizes))
+        self.max_bytes = settings.image_max_download_bytes
+        self.dedupe_distance = settings.image_dedupe_distance
+        self.worker_processes = settings.image_worker_processes
+        self._download_slots = asyncio.Semaphore(settings.image_download_concurrency)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._session = None
+    
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            
+            self._session = requests.Session()
+        return self._session
+    
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.worker_processes)
+        return self._executor
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def process(self, urls: List[str]) -> List[StoredImage]:
+        """Download, thumbnail and store images, dropping near-duplicates.
+        
+        Images that fail to download or decode are skipped; order follows `urls`.
+        """
+        urls = list(dict.fromkeys(u for u in urls if u))
+        downloads = await asyncio.gather(*(self._download(url) for url in urls))
+        
+        processed = await asyncio.gather(*(
+            self._store(url, data) for url, data in zip(urls, downloads) if data
+        ))
+        
+        kept: List[StoredImage] = []
+        for image in processed:
+            if image is None:
+                continue
+            if any(
+                existing.digest == image.digest
+                or hamming_distance(existing.phash, image.phash) <= self.dedupe_distance
+                for existing in kept
+            ):
+                continue
+            kept.append(image)
+        return kept
+    
+    async def _download(self, url: str) -> Optional[bytes]:
+        async with self._download_slots:
+            try:
+                return await asyncio.to_thread(self._fetch, url)
+            except Exception as e:
+                print(f"Error downloading image {url}: {e}")
+                return None
+    
+    def _fetch(self, url: str) -> Optional[bytes]:
+        with self.session.get(url, stream=True, timeout=10, headers={
+            'User-Agent': 'Mozilla/5.0 (compatible; SmartRecipeKeeper/1.0)'
+        }) as response:
+            response.raise_for_status()
+            if not response.headers.get('Content-Type', 'image/').startswith('image/'):
+                return None
+            
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    return None
+            return bytes(body)
+    
+    async def _store(self, url: str, data: bytes) -> Optional[StoredImage]:
+        digest = hashlib.sha256(data).hexdigest()
+        loop = asyncio.get_running_loop()
+        try:
+            phash, width, height, thumbnails = await loop.run_in_executor(
+                self.executor, render_thumbnails, data, self.sizes
+            )
+        except Exception as e:
+            print(f"Error processing image {url}: {e}")
+            return None
+        
+        for size, encoded in thumbnails.items():
+            await asyncio.to_thread(self.store.write, digest, size, encoded)
+        
+        return StoredImage(
+            digest=digest,
+            source_url=url,
+            width=width,
+            height=height,
+            phash=phash,
+            sizes=sorted(thumbnails)
+        )
+
+
+def image_url(digest: str, size: int) -> str:
+    """Public URL of a stored thumbnail"""
+    return f"{get_settings().api_prefix}/images/{digest}/{size}.{THUMBNAIL_FORMAT}"
+
+
+@lru_cache()
+def get_image_pipeline() -> ImagePipeline:
+    """Get the process-wide image pipeline and its worker pool"""
+    return ImagePipeline()
@@ -0,0 +1,192 @@
+"""Materialized library statistics: facet counts and the tag dictionary per user
+
+Every recipe insert, update and delete turns into one `$inc` on the user's
+`library_stats` document, so the dashboard and tag autocomplete read a single
+document instead of aggregating the whole library. The document is built by
+aggregation the first time it is needed, and recounted periodically to repair
+any drift from writes that raced a rebuild or failed halfway.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import unquote
+
+from beanie.odm.queries.update import UpdateResponse
+
+from app.config import get_settings
+from app.models.recipe import LibraryStats, Recipe
+
+
+# Stats field -> recipe field for the single-valued facets
+FACETS = {
+    "recipe_types": "recipe_type",
+    "cuisines": "cuisine",
+    "difficulties": "difficulty",
+}
+
+
+def field_key(value: str) -> str:
+    """Escape a facet value for use as a MongoDB field name ('.' and '$' are not allowed)"""
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def field_value(key: str) -> str:
+    return unquote(key)
+
+
+@dataclass(frozen=True)
+class RecipeFacets:
+    """What a recipe contributes to its owner's stats"""
+    recipe_type: Optional[str]
+    cuisine: Optional[str]
+    difficulty: Optional[str]
+    tags: FrozenSet[str]
+    is_favorite: bool
+    
+    @classmethod
+    def of(cls, recipe: Recipe) -> "RecipeFacets":
+        return cls(
+            recipe_type=recipe.recipe_type or None,
+            cuisine=recipe.cuisine or None,
+            difficulty=recipe.difficulty or None,
+            tags=frozenset(tag for tag in recipe.tags if tag and tag.strip()),
+            is_favorite=recipe.is_favorite
+        )
+
+
+def stats_delta(before: Optional[RecipeFacets], after: Optional[RecipeFacets]) -> Dict[str, int]:
+    """The `$inc` document for a recipe going from `before` to `after` (None: absent)"""
+    delta: Dict[str, int] = {}
+    
+    def add(path: str, amount: int) -> None:
+        delta[path] = delta.get(path, 0) + amount
+    
+    for facets, sign in ((before, -1), (after, 1)):
+        if facets is None:
+            continue
+        add("total", sign)
+        if facets.is_favorite:
+            add("favorites", sign)
+        for stats_field, recipe_field in FACETS.items():
+            value = getattr(facets, recipe_field)
+            if value:
+                add(f"{stats_field}.{field_key(value)}", sign)
+        for tag in facets.tags:
+            add(f"tags.{field_key(tag)}", sign)
+    
+    return {path: amount for path, amount in delta.items() if amount}
+
+
+async def record_change(user_id: str, before: Optional[RecipeFacets], after: Optional[RecipeFacets]) -> None:
+    """Apply one recipe write to the user's stats document, if it has been built yet
+    
+    Nothing is upserted: a missing document is built from scratch by
+    `get_library_stats`, which would otherwise count this change twice.
+    """
+    delta = stats_delta(before, after)
+    if not delta:
+        return
+    await LibraryStats.get_motor_collection().update_one(
+        {"user_id": user_id},
+        {"$inc": delta, "$set": {"updated_at": datetime.utcnow()}}
+    )
+
+
+def _counts(rows: List[dict]) -> Dict[str, int]:
+    return {field_key(row["_id"]): row["n"] for row in rows if row["_id"]}
+
+
+async def reconcile(user_id: str) -> LibraryStats:
+    """Recount the user's stats from their recipes and store them"""
+    facet = {
+        "total": [{"$count": "n"}],
+        "favorites": [{"$match": {"is_favorite": True}}, {"$count": "n"}],
+        "tags": [
+            # A tag listed twice on one recipe still counts once
+            {"$project": {"tags": {"$setUnion": [{"$ifNull": ["$tags", []]}, []]}}},
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "n": {"$sum": 1}}},
+        ],
+    }
+    for stats_field, recipe_field in FACETS.items():
+        facet[stats_field] = [{"$group": {"_id": f"${recipe_field}", "n": {"$sum": 1}}}]
+    
+    [result] = await Recipe.get_motor_collection().aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$facet": facet},
+    ]).to_list(length=None)
+    
+    now = datetime.utcnow()
+    stats = LibraryStats(
+        user_id=user_id,
+        total=result["total"][0]["n"] if result["total"] else 0,
+        favorites=result["favorites"][0]["n"] if result["favorites"] else 0,
+        tags={key: n for key, n in _counts(result["tags"]).items() if key.strip()},
+        updated_at=now,
+        reconciled_at=now,
+        **{stats_field: _counts(result[stats_field]) for stats_field in FACETS}
+    )
+    document = stats.model_dump(exclude={"id", "revision_id"})
+    await LibraryStats.get_motor_collection().replace_one({"user_id": user_id}, document, upsert=True)
+    return stats
+
+
+async def get_library_stats(user_id: str) -> LibraryStats:
+    """The user's stats document, built on first use"""
+    stats = await LibraryStats.find_one({"user_id": user_id})
+    if stats is None:
+        stats = await reconcile(user_id)
+    return stats
+
+
+def decoded(counts: Dict[str, int]) -> Dict[str, int]:
+    """Facet counts keyed by their original values, without facets counted down to zero"""
+    return {field_value(key): n for key, n in counts.items() if n > 0}
+
+
+def complete_tags(stats: LibraryStats, prefix: str, limit: int) -> List[Tuple[str, int]]:
+    """The user's tags starting with `prefix` (case-insensitive), most used first"""
+    prefix = prefix.lower()
+    matches = [
+        (tag, n) for tag, n in decoded(stats.tags).items()
+        if tag.lower().startswith(prefix)
+    ]
+    matches.sort(key=lambda match: (-match[1], match[0].lower()))
+    return matches[:limit]
+
+
+async def reconcile_stale(max_age: timedelta, pause: float) -> int:
+    """Recount every stats document older than `max_age`; returns how many were done
+    
+    Each document is claimed by moving its `reconciled_at` forward first, so
+    several processes running this share the work instead of repeating it.
+    """
+    done = 0
+    while True:
+        now = datetime.utcnow()
+        claimed = await LibraryStats.find_one(
+            {"reconciled_at": {"$lt": now - max_age}}
+        ).update({"$set": {"reconciled_at": now}}, response_type=UpdateResponse.NEW_DOCUMENT)
+        if claimed is None:
+            return done
+        await reconcile(claimed.user_id)
+        done += 1
+        await asyncio.sleep(pause)
+
+
+async def run_reconciliation() -> None:
+    """Recount stale stats documents until cancelled"""
+    settings = get_settings()
+    max_age = timedelta(seconds=settings.library_stats_reconcile_seconds)
+    while True:
+        try:
+            done = await reconcile_stale(max_age, settings.library_stats_reconcile_pause_seconds)
+            if done:
+                print(f"Reconciled library stats for {done} users")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Library stats reconciliation failed: {e}")
+        await asyncio.sleep(settings.library_stats_reconcile_poll_seconds)
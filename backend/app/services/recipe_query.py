@@ -0,0 +1,312 @@
+"""Filter and sort expressions for the recipe list, compiled to index-aware MongoDB queries
+
+A filter is a space-separated list of terms:
+
+    total_time<=30 difficulty:easy cuisine:Italian,Mexican -tag:spicy diet:vegan
+
+- `field:value` matches a value, `field:a,b` any of several (OR);
+- numeric fields also take `<`, `<=`, `>`, `>=` and ranges `field:10..30`
+  (either end may be left open);
+- a leading `-` (or `!=` instead of `:`) negates a term;
+- values containing spaces or commas are quoted: `cuisine:"Middle Eastern"`.
+
+Terms are ANDed. Text values match as stored (GET /recipes/stats lists them).
+A sort is a whitelisted field, prefixed with `-` for descending.
+
+Queries are planned against QUERY_INDEXES following the equality, sort, range
+rule, and the chosen index is sent as a hint. Equality terms, comparisons and
+ranges narrow an index scan; negations and dietary bit tests are checked on
+every recipe the scan reads. In libraries larger than
+`recipe_query_scan_threshold`, a query that would read every recipe the user
+has (a filter nothing narrows, or no filter and a sort no index provides) is
+rejected. A narrowed query whose sort no index provides is sorted in memory,
+and only its first `memory_sort_limit` results are listed. Sorts end with
+`_id`, so pages are stable when sort values tie.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pymongo
+
+from app.core.constants import DietaryInfo
+from app.models.recipe import QUERY_INDEXES
+from app.utils.dietary import labels_to_mask, parse_label
+
+
+class QuerySyntaxError(ValueError):
+    """The filter or sort expression can't be parsed"""
+
+
+class UnindexedQueryError(Exception):
+    """The query would have to read the whole library"""
+
+
+TEXT, NUMBER, BOOLEAN, DIET = "text", "number", "boolean", "diet"
+
+# Filter name -> (document field, kind)
+FIELDS: Dict[str, Tuple[str, str]] = {
+    "recipe_type": ("recipe_type", TEXT),
+    "type": ("recipe_type", TEXT),
+    "cuisine": ("cuisine", TEXT),
+    "difficulty": ("difficulty", TEXT),
+    "tag": ("tags", TEXT),
+    "tags": ("tags", TEXT),
+    "favorite": ("is_favorite", BOOLEAN),
+    "is_favorite": ("is_favorite", BOOLEAN),
+    "total_time": ("total_time", NUMBER),
+    "prep_time": ("prep_time", NUMBER),
+    "cook_time": ("cook_time", NUMBER),
+    "servings": ("servings", NUMBER),
+    "diet": ("dietary_mask", DIET),
+}
+
+SORT_FIELDS = ("created_at", "updated_at", "title", "total_time", "prep_time", "cook_time", "servings")
+DEFAULT_SORT = ("created_at", pymongo.DESCENDING)
+
+TERM_REGEX = re.compile(r'\s*(-?)([a-z_]+)(<=|>=|!=|<|>|:|=)("(?:[^"\\]|\\.)*"|[^\s"]+)')
+RANGE_REGEX = re.compile(r"^(-?\d*)\.\.(-?\d*)$")
+COMPARISONS = {"<": "$lt", "<=": "$lte", ">": "$gt", ">=": "$gte"}
+BOOLEANS = {"true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+
+# How a condition can use an index: only EQUALITY and RANGE narrow a scan
+EQUALITY, RANGE, BITS, UNBOUNDED = "equality", "range", "bits", "unbounded"
+
+
+@dataclass(frozen=True)
+class Condition:
+    """One term, compiled: `clause` is applied to `path` and `bound` says how an index can serve it"""
+    path: str
+    clause: Any
+    bound: str
+    
+    @classmethod
+    def equals(cls, path: str, value: Any) -> "Condition":
+        return cls(path, value, EQUALITY)
+    
+    @classmethod
+    def any_of(cls, path: str, values: Sequence[Any]) -> "Condition":
+        if len(values) == 1:
+            return cls.equals(path, values[0])
+        return cls(path, {"$in": list(values)}, EQUALITY)
+    
+    @classmethod
+    def all_bits(cls, path: str, mask: int) -> "Condition":
+        return cls(path, {"$bitsAllSet": mask}, BITS)
+
+
+@dataclass
+class CompiledQuery:
+    conditions: List[Condition]
+    sort: List[Tuple[str, int]]
+    hint: Optional[List[Tuple[str, int]]] = None
+    narrowed: bool = False  # The hinted index bounds the scan beyond user_id
+    sort_indexed: bool = False
+    max_results: Optional[int] = None  # Cap on results sorted in memory
+    
+    def apply(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the conditions to `query`; several on one field are ANDed"""
+        query = dict(query)
+        extra: List[Dict[str, Any]] = []
+        for condition in self.conditions:
+            existing = query.get(condition.path)
+            if condition.path not in query:
+                query[condition.path] = condition.clause
+            elif _mergeable(existing, condition.clause):
+                query[condition.path] = {**existing, **condition.clause}
+            else:
+                extra.append({condition.path: condition.clause})
+        if extra:
+            query["$and"] = query.get("$and", []) + extra
+        return query
+
+
+def _mergeable(a: Any, b: Any) -> bool:
+    """Both are operator documents with no operator in common"""
+    return (
+        isinstance(a, dict) and isinstance(b, dict)
+        and all(key.startswith("$") for key in (*a, *b))
+        and not set(a) & set(b)
+    )
+
+
+def _split_values(raw: str) -> List[str]:
+    if raw.startswith('"'):
+        return [re.sub(r'\\(.)', r'\1', raw[1:-1])]
+    values = [value for value in raw.split(",") if value]
+    if not values:
+        raise QuerySyntaxError("Empty value")
+    return values
+
+
+def _number(value: str, name: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise QuerySyntaxError(f"{name} needs whole numbers, got {value!r}")
+
+
+def _compile_term(name: str, operator: str, raw: str, negated: bool) -> Condition:
+    if name not in FIELDS:
+        raise QuerySyntaxError(f"Unknown filter field {name!r}; expected one of {', '.join(FIELDS)}")
+    path, kind = FIELDS[name]
+    if operator == "=":
+        operator = ":"
+    if operator == "!=":
+        operator, negated = ":", not negated
+    if operator in COMPARISONS and kind != NUMBER:
+        raise QuerySyntaxError(f"{name} can't be compared with {operator}")
+    values = _split_values(raw)
+    
+    if kind == NUMBER:
+        if operator in COMPARISONS:
+            if len(values) != 1:
+                raise QuerySyntaxError(f"{name}{operator} takes a single number")
+            clause: Any = {COMPARISONS[operator]: _number(values[0], name)}
+        elif len(values) == 1 and RANGE_REGEX.match(values[0]):
+            low, high = RANGE_REGEX.match(values[0]).groups()
+            clause = {}
+            if low:
+                clause["$gte"] = _number(low, name)
+            if high:
+                clause["$lte"] = _number(high, name)
+            if not clause:
+                raise QuerySyntaxError(f"{name} range needs at least one end")
+        else:
+            numbers = [_number(value, name) for value in values]
+            if negated:
+                return Condition(path, {"$nin": numbers}, UNBOUNDED)
+            return Condition.any_of(path, numbers)
+        if negated:
+            return Condition(path, {"$not": clause}, UNBOUNDED)
+        return Condition(path, clause, RANGE)
+    
+    if kind == BOOLEAN:
+        if len(values) != 1 or values[0].lower() not in BOOLEANS:
+            raise QuerySyntaxError(f"{name} takes true or false")
+        value = BOOLEANS[values[0].lower()]
+        return Condition.equals(path, not value if negated else value)
+    
+    if kind == DIET:
+        unknown = [value for value in values if parse_label(value) is None]
+        if unknown:
+            raise QuerySyntaxError(
+                f"Unknown dietary flags: {', '.join(unknown)}; "
+                f"expected any of {', '.join(flag.value for flag in DietaryInfo)}"
+            )
+        mask = labels_to_mask(values)
+        if negated:
+            return Condition(path, {"$bitsAllClear": mask}, BITS)
+        if len(values) == 1:
+            return Condition.all_bits(path, mask)
+        return Condition(path, {"$bitsAnySet": mask}, BITS)
+    
+    if negated:
+        return Condition(path, {"$nin": values} if len(values) > 1 else {"$ne": values[0]}, UNBOUNDED)
+    return Condition.any_of(path, values)
+
+
+def parse_filter(text: str) -> List[Condition]:
+    """Compile a filter expression; raises QuerySyntaxError"""
+    conditions = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TERM_REGEX.match(text, position)
+        if match is None:
+            raise QuerySyntaxError(f"Can't parse filter at {text[position:position + 20]!r}")
+        negated, name, operator, raw = match.groups()
+        conditions.append(_compile_term(name, operator, raw, bool(negated)))
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+    return conditions
+
+
+def parse_sort(text: Optional[str]) -> Tuple[str, int]:
+    """'-total_time' -> ('total_time', DESCENDING)"""
+    if not text:
+        return DEFAULT_SORT
+    name = text.strip()
+    direction = pymongo.ASCENDING
+    if name.startswith("-"):
+        name, direction = name[1:], pymongo.DESCENDING
+    if name not in SORT_FIELDS:
+        raise QuerySyntaxError(f"Can't sort by {name!r}; expected one of {', '.join(SORT_FIELDS)}")
+    return name, direction
+
+
+def _fit(index: List[Tuple[str, int]], conditions: List[Condition], sort_field: str) -> Tuple[int, bool]:
+    """How many conditions `index` bounds, and whether it yields `sort_field` in order
+    
+    Keys are consumed in equality, sort, range order, as MongoDB can use them.
+    Bit tests and negations never bound the scan, wherever their field is.
+    """
+    keys = [key for key, _ in index]
+    if keys[0] != "user_id":
+        return 0, False
+    equalities = {c.path for c in conditions if c.bound == EQUALITY}
+    ranges = {c.path for c in conditions if c.bound == RANGE}
+    
+    bounded = 0
+    position = 1
+    while position < len(keys) and keys[position] in equalities:
+        bounded += 1
+        position += 1
+    sort_indexed = position < len(keys) and keys[position] == sort_field
+    if sort_indexed:
+        position += 1
+        if sort_field in ranges:
+            bounded += 1  # A range on the sort key bounds the same scan
+    if position < len(keys) and keys[position] in ranges:
+        bounded += 1
+    return bounded, sort_indexed
+
+
+def _sortable(sort_field: str) -> bool:
+    """Whether some index yields a user's recipes in `sort_field` order"""
+    return any(_fit(index, [], sort_field)[1] for index in QUERY_INDEXES)
+
+
+def compile_query(
+    conditions: List[Condition],
+    sort: Tuple[str, int],
+    library_size: int,
+    scan_threshold: int,
+    memory_sort_limit: int = 1000
+) -> CompiledQuery:
+    """Pick the index for `conditions` and `sort`; raises UnindexedQueryError for large libraries
+    
+    The sort gets an `_id` tiebreaker in the same direction; the sortable
+    QUERY_INDEXES end in `_id` so the index still yields that order.
+    """
+    query = CompiledQuery(conditions=conditions, sort=[sort, ("_id", sort[1])])
+    best: Optional[Tuple[bool, int, bool, int]] = None
+    for index in QUERY_INDEXES:
+        bounded, sort_indexed = _fit(index, conditions, sort[0])
+        # An index that both narrows and sorts serves the page without a blocking sort
+        score = (bounded > 0 and sort_indexed, bounded, sort_indexed, -len(index))
+        if (bounded or sort_indexed) and (best is None or score > best):
+            best = score
+            query.hint = index
+            query.narrowed = bounded > 0
+            query.sort_indexed = sort_indexed
+    
+    if library_size > scan_threshold:
+        if conditions and not query.narrowed:
+            raise UnindexedQueryError(
+                f"This filter would read all {library_size} recipes; add a condition on "
+                f"recipe_type, cuisine, difficulty, tag or favorite, or a range "
+                f"such as total_time<=30"
+            )
+        if not query.sort_indexed and not query.narrowed:
+            usable = [field for field in SORT_FIELDS if _sortable(field)]
+            raise UnindexedQueryError(
+                f"Sorting by {sort[0]} would sort all {library_size} recipes in memory; "
+                f"sort by {' or '.join(usable)} instead, or add a filter"
+            )
+        if not query.sort_indexed:
+            # Narrowed, but sorted in memory: bound the sort to the first pages
+            query.max_results = memory_sort_limit
+    return query
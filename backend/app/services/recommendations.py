@@ -0,0 +1,354 @@
+"""Content-based recipe recommendations over per-user in-memory vector indexes"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.core.constants import Difficulty, RecipeType
+from app.models.recipe import Recipe, RecipeFeaturesView, RecipeTombstone
+from app.utils.ingredient_names import normalize_ingredient_name
+from app.utils.lazy import lazy_module
+
+
+# Imported on first use so the app starts without paying for numpy
+np = lazy_module("numpy")
+
+RECIPE_TYPES = [t.value for t in RecipeType]
+DIFFICULTIES = [d.value for d in Difficulty]
+
+# Relative weight of each one-hot block against the unit-length TF-IDF part
+RECIPE_TYPE_WEIGHT = 0.5
+CUISINE_WEIGHT = 0.5
+DIFFICULTY_WEIGHT = 0.2
+
+INITIAL_CAPACITY = 32
+
+
+def normalize_label(value: Optional[str]) -> str:
+    """'Gluten-Free' and 'gluten_free' compare equal"""
+    return (value or "").strip().lower().replace("-", "_").replace(" ", "_")
+
+
+def _bucket(text: str, size: int) -> int:
+    return zlib.crc32(text.encode("utf-8")) % size
+
+
+class RecipeVectorIndex:
+    """Array-backed feature vectors for one user's recipes
+    
+    Raw term counts are kept per row together with document frequencies, so
+    inserts and deletes are O(dim); TF-IDF weighting and row normalization are
+    applied in one vectorized pass the next time the index is queried.
+    """
+    
+    def __init__(self, term_dim: int, cuisine_buckets: int):
+        self.term_dim = term_dim
+        self.cuisine_buckets = cuisine_buckets
+        self.category_dim = len(RECIPE_TYPES) + cuisine_buckets + len(DIFFICULTIES)
+        
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.cuisines: List[str] = []
+        self.dietary: List[frozenset] = []
+        self._rows: Dict[str, int] = {}
+        self._terms = np.zeros((INITIAL_CAPACITY, term_dim), dtype=np.float32)
+        self._categories = np.zeros((INITIAL_CAPACITY, self.category_dim), dtype=np.float32)
+        self._favorites = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._df = np.zeros(term_dim, dtype=np.float32)
+        self._vectors: Optional[np.ndarray] = None
+        # Every recipe written or deleted up to this time is reflected in the index
+        self.synced_until = datetime(1970, 1, 1)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._rows
+    
+    def title(self, recipe_id: str) -> str:
+        return self.titles[self._rows[recipe_id]]
+    
+    def upsert(self, recipe) -> None:
+        """Add or replace a recipe (a Recipe or RecipeFeaturesView)"""
+        recipe_id = str(recipe.id)
+        row = self._rows.get(recipe_id)
+        if row is None:
+            row = len(self.ids)
+            self._grow(row + 1)
+            self._rows[recipe_id] = row
+            self.ids.append(recipe_id)
+            self.titles.append("")
+            self.cuisines.append("")
+            self.dietary.append(frozenset())
+        else:
+            self._df -= self._terms[row] > 0
+        
+        self._terms[row] = self._term_counts(recipe)
+        self._categories[row] = self._category_vector(recipe)
+        self._favorites[row] = bool(recipe.is_favorite)
+        self._df += self._terms[row] > 0
+        self.titles[row] = recipe.title
+        self.cuisines[row] = normalize_label(recipe.cuisine)
+        self.dietary[row] = frozenset(normalize_label(d) for d in recipe.dietary_info)
+        self._vectors = None
+    
+    def remove(self, recipe_id: str) -> None:
+        """Drop a recipe by moving the last row into its slot"""
+        row = self._rows.pop(recipe_id, None)
+        if row is None:
+            return
+        self._df -= self._terms[row] > 0
+        
+        last = len(self.ids) - 1
+        if row != last:
+            for column in (self._terms, self._categories, self._favorites):
+                column[row] = column[last]
+            for values in (self.ids, self.titles, self.cuisines, self.dietary):
+                values[row] = values[last]
+            self._rows[self.ids[row]] = row
+        for values in (self.ids, self.titles, self.cuisines, self.dietary):
+            values.pop()
+        self._terms[last] = 0
+        self._categories[last] = 0
+        self._favorites[last] = False
+        self._vectors = None
+    
+    def similar(self, recipe_id: str, k: int) -> List[Tuple[str, float]]:
+        """Recipes closest to `recipe_id` by cosine similarity"""
+        row = self._rows.get(recipe_id)
+        if row is None:
+            return []
+        vectors = self.vectors()
+        scores = vectors @ vectors[row]
+        scores[row] = -np.inf
+        return self._top_k(scores, k)
+    
+    def for_you(
+        self,
+        preferred_cuisines: Sequence[str],
+        dietary_restrictions: Sequence[str],
+        k: int,
+        boost: float
+    ) -> List[Tuple[str, float]]:
+        """Non-favorite recipes closest to the user's favorites, boosted by stated preferences
+        
+        Without favorites the profile is the centroid of the whole library, so
+        the ranking degrades to "most typical" plus preference boosts.
+        """
+        n = len(self.ids)
+        if not n:
+            return []
+        vectors = self.vectors()
+        favorites = self._favorites[:n]
+        
+        profile = vectors[favorites].sum(axis=0) if favorites.any() else vectors.sum(axis=0)
+        norm = np.linalg.norm(profile)
+        scores = vectors @ (profile / norm) if norm else np.zeros(n, dtype=np.float32)
+        
+        preferred = {normalize_label(c) for c in preferred_cuisines}
+        if preferred:
+            scores += boost * np.fromiter((c in preferred for c in self.cuisines), dtype=bool, count=n)
+        
+        restrictions = frozenset(normalize_label(d) for d in dietary_restrictions)
+        if restrictions:
+            # Partial matches get a proportional share of the boost
+            matched = np.fromiter((len(restrictions & d) for d in self.dietary), dtype=np.float32, count=n)
+            scores += boost * matched / len(restrictions)
+        
+        if favorites.any() and not favorites.all():
+            scores[favorites] = -np.inf
+        return self._top_k(scores, k)
+    
+    def vectors(self) -> np.ndarray:
+        """Unit-length TF-IDF + one-hot vectors, recomputed only after changes"""
+        if self._vectors is not None:
+            return self._vectors
+        
+        n = len(self.ids)
+        idf = np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+        terms = self._terms[:n] * idf
+        norms = np.linalg.norm(terms, axis=1, keepdims=True)
+        terms /= np.where(norms == 0, 1.0, norms)
+        
+        vectors = np.hstack([terms, self._categories[:n]])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        self._vectors = vectors.astype(np.float32, copy=False)
+        return self._vectors
+    
+    def _top_k(self, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+    
+    def _grow(self, size: int) -> None:
+        capacity = self._terms.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        n = len(self.ids)
+        for name in ("_terms", "_categories", "_favorites"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:n] = old[:n]
+            setattr(self, name, new)
+    
+    def _term_counts(self, recipe) -> np.ndarray:
+        counts = np.zeros(self.term_dim, dtype=np.float32)
+        for term in recipe_terms(recipe.ingredients, recipe.tags):
+            counts[_bucket(term, self.term_dim)] += 1.0
+        return counts
+    
+    def _category_vector(self, recipe) -> np.ndarray:
+        vector = np.zeros(self.category_dim, dtype=np.float32)
+        if recipe.recipe_type in RECIPE_TYPES:
+            vector[RECIPE_TYPES.index(recipe.recipe_type)] = RECIPE_TYPE_WEIGHT
+        if recipe.cuisine:
+            offset = len(RECIPE_TYPES)
+            vector[offset + _bucket(normalize_label(recipe.cuisine), self.cuisine_buckets)] = CUISINE_WEIGHT
+        if recipe.difficulty in DIFFICULTIES:
+            offset = len(RECIPE_TYPES) + self.cuisine_buckets
+            vector[offset + DIFFICULTIES.index(recipe.difficulty)] = DIFFICULTY_WEIGHT
+        return vector
+
+
+def recipe_terms(ingredients: Iterable, tags: Iterable[str]) -> List[str]:
+    """Ingredient and tag terms of a recipe, prefixed so the vocabularies never mix"""
+    terms = [f"i:{normalize_ingredient_name(i.name)}" for i in ingredients if i.name]
+    terms.extend(f"t:{tag.strip().lower()}" for tag in tags if tag.strip())
+    return terms
+
+
+class RecommendationService:
+    """Keeps recently used per-user indexes in memory and answers recommendation queries
+    
+    An index is built from the database on first use. Writes made by this
+    process are applied at once through `recipe_saved` / `recipe_deleted`;
+    before serving, the index also catches up on recipes written and deleted
+    since its `synced_until` (by other workers, say), which reads the
+    (user_id, updated_at) and tombstone indexes for just those changes. The
+    least recently used indexes are dropped beyond `max_indexes` users.
+    """
+    
+    def __init__(self):
+        settings = get_settings()
+        self.term_dim = settings.recommendation_term_dim
+        self.cuisine_buckets = settings.recommendation_cuisine_buckets
+        self.preference_boost = settings.recommendation_preference_boost
+        self.max_indexes = settings.recommendation_max_indexes
+        self.settle = timedelta(seconds=settings.sync_settle_seconds)
+        self.history = timedelta(days=settings.sync_tombstone_ttl_days)
+        self._indexes: "OrderedDict[str, RecipeVectorIndex]" = OrderedDict()
+        self._building: Dict[str, asyncio.Future] = {}
+    
+    async def index_for(self, user_id: str) -> RecipeVectorIndex:
+        """The user's index, caught up with the database"""
+        index = self._indexes.get(user_id)
+        if index is not None and index.synced_until > datetime.utcnow() - self.history:
+            self._indexes.move_to_end(user_id)
+            await self._catch_up(user_id, index)
+            return index
+        
+        # Concurrent first requests for a user share one build
+        building = self._building.get(user_id)
+        if building is not None:
+            return await building
+        
+        future = asyncio.get_running_loop().create_future()
+        self._building[user_id] = future
+        try:
+            index = await self._build(user_id)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved; waiters re-raise it themselves
+            raise
+        finally:
+            self._building.pop(user_id, None)
+        
+        self._indexes[user_id] = index
+        while len(self._indexes) > self.max_indexes:
+            self._indexes.popitem(last=False)
+        future.set_result(index)
+        return index
+    
+    async def _build(self, user_id: str) -> RecipeVectorIndex:
+        index = RecipeVectorIndex(self.term_dim, self.cuisine_buckets)
+        synced_until = self._settled_until()
+        recipes = await Recipe.find(
+            {"user_id": user_id}, projection_model=RecipeFeaturesView
+        ).to_list()
+        for recipe in recipes:
+            index.upsert(recipe)
+        index.synced_until = synced_until
+        return index
+    
+    async def _catch_up(self, user_id: str, index: RecipeVectorIndex) -> None:
+        """Apply recipes written and deleted since the index was last synced
+        
+        Writes stamped within `sync_settle_seconds` of now may not be committed
+        yet, so they are read again on the next call; upserts and removals are
+        idempotent.
+        """
+        since = index.synced_until
+        synced_until = self._settled_until()
+        recipes = await Recipe.find(
+            {"user_id": user_id, "updated_at": {"$gt": since}}, projection_model=RecipeFeaturesView
+        ).to_list()
+        tombstones = await RecipeTombstone.find(
+            {"user_id": user_id, "deleted_at": {"$gt": since}}
+        ).to_list()
+        for recipe in recipes:
+            index.upsert(recipe)
+        for tombstone in tombstones:
+            index.remove(tombstone.recipe_id)
+        index.synced_until = max(since, synced_until)
+    
+    def _settled_until(self) -> datetime:
+        return datetime.utcnow() - self.settle
+    
+    def recipe_saved(self, recipe: Recipe) -> None:
+        index = self._indexes.get(recipe.user_id)
+        if index is not None:
+            index.upsert(recipe)
+    
+    def recipe_deleted(self, user_id: str, recipe_id: str) -> None:
+        index = self._indexes.get(user_id)
+        if index is not None:
+            index.remove(recipe_id)
+    
+    def user_deleted(self, user_id: str) -> None:
+        self._indexes.pop(user_id, None)
+    
+    async def similar(self, user_id: str, recipe_id: str, k: int) -> List[Tuple[str, str, float]]:
+        index = await self.index_for(user_id)
+        return self._with_titles(index, index.similar(recipe_id, k))
+    
+    async def for_you(self, user, k: int) -> List[Tuple[str, str, float]]:
+        index = await self.index_for(str(user.id))
+        ranked = index.for_you(
+            user.preferred_cuisines, user.dietary_restrictions, k, self.preference_boost
+        )
+        return self._with_titles(index, ranked)
+    
+    @staticmethod
+    def _with_titles(index: RecipeVectorIndex, ranked: List[Tuple[str, float]]) -> List[Tuple[str, str, float]]:
+        return [
+            (recipe_id, index.title(recipe_id), score if math.isfinite(score) else 0.0)
+            for recipe_id, score in ranked
+        ]
+
+
+@lru_cache()
+def get_recommendation_service() -> RecommendationService:
+    """Get the process-wide recommendation service"""
+    return RecommendationService()
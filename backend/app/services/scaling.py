@@ -0,0 +1,79 @@
+"""Serve recipes scaled to a number of servings and/or converted between unit systems"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.recipe import Ingredient, Recipe
+from app.utils.quantities import parse_quantity, scale_quantities
+
+
+class ScaledIngredientCache:
+    """LRU of scaled ingredient lists keyed by (recipe, revision, servings, system)
+    
+    The recipe's `updated_at` is part of the key, so edits never serve stale
+    results and old entries simply age out.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, List[Ingredient]]" = OrderedDict()
+    
+    def get_or_compute(
+        self,
+        recipe: Recipe,
+        servings: Optional[int],
+        system: Optional[str]
+    ) -> List[Ingredient]:
+        key = (str(recipe.id), recipe.updated_at, servings, system)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            return cached
+        
+        factor = servings / recipe.servings if servings and recipe.servings else 1.0
+        scaled = scale_ingredients(recipe.ingredients, factor, system)
+        
+        self._entries[key] = scaled
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return scaled
+
+
+def _normalized(ingredient: Ingredient) -> Optional[Tuple[float, Optional[float], Optional[str]]]:
+    if ingredient.quantity_value is not None:
+        return ingredient.quantity_value, ingredient.quantity_max, ingredient.unit_key
+    
+    # Recipes saved before quantities were normalized
+    parsed = parse_quantity(ingredient.quantity, ingredient.unit)
+    if parsed is None:
+        return None
+    return float(parsed.low), float(parsed.high) if parsed.high is not None else None, parsed.unit
+
+
+def scale_ingredients(
+    ingredients: List[Ingredient],
+    factor: float,
+    system: Optional[str] = None
+) -> List[Ingredient]:
+    """Copies of `ingredients` with quantities multiplied by `factor` and converted to `system`"""
+    results = scale_quantities([_normalized(i) for i in ingredients], factor, system)
+    
+    scaled = []
+    for ingredient, result in zip(ingredients, results):
+        if result is None:
+            scaled.append(ingredient)
+            continue
+        quantity, unit = result
+        scaled.append(ingredient.model_copy(update={
+            "quantity": quantity,
+            "unit": unit if unit is not None else ingredient.unit
+        }))
+    return scaled
+
+
+@lru_cache()
+def get_scaling_cache() -> ScaledIngredientCache:
+    """Get the process-wide cache of scaled ingredient lists"""
+    return ScaledIngredientCache(get_settings().scaling_cache_size)
@@ -0,0 +1,400 @@
+"""Semantic recipe search: local embeddings with a persisted per-user ANN index
+
+Index files are shared by every worker process. Writers take an exclusive
+lock on `<index>.lock`, reload the file if another worker replaced it since
+it was read, apply their change and write it back; readers reload whenever
+the file changes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import tempfile
+import time
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import IO, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.config import get_settings
+from app.models.recipe import Recipe, RecipeTextView
+from app.utils.lazy import lazy_module
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development process needs no file lock
+    fcntl = None
+
+# Imported on first use so the app starts without paying for numpy
+np = lazy_module("numpy")
+
+# Maps a batch of texts to an (n, dim) float32 array of embeddings
+EmbeddingFunction = Callable[[List[str]], "np.ndarray"]
+
+# Reciprocal rank fusion constant; 60 is the value from the original paper
+RRF_K = 60
+
+TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Dependency-free fallback: hashed word and character trigram features
+    
+    Captures lexical overlap only, but keeps semantic search usable (and
+    testable) where no embedding model is installed.
+    """
+    
+    name = "hashing-v1"
+    
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+    
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in TOKEN_REGEX.findall(text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+                padded = f"#{word}#"
+                for i in range(len(padded) - 2):
+                    vectors[row, zlib.crc32(padded[i:i + 3].encode()) % self.dim] += 0.5
+        return vectors
+
+
+class SentenceTransformerEmbedder:
+    """Small local CPU model via sentence-transformers, loaded on first use"""
+    
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        
+        self.name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+    
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=32, convert_to_numpy=True).astype(np.float32)
+
+
+def recipe_text(recipe) -> str:
+    """Text a recipe is embedded from: title, description and ingredient names"""
+    ingredients = ", ".join(i.name for i in recipe.ingredients if i.name)
+    return f"{recipe.title}. {recipe.description or ''} Ingredients: {ingredients}".strip()
+
+
+def _stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Identifies one version of a file; every save replaces the inode"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _lock_file(path: str) -> IO:
+    """Block until `path`.lock is exclusively locked; closing the returned file releases it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    f = open(f"{path}.lock", "a")
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class SemanticIndex:
+    """float16 embeddings with random-hyperplane LSH buckets for candidate lookup
+    
+    Each vector gets a `bits`-bit signature from the signs of its projections
+    on fixed random hyperplanes. A query scores only the rows whose signature
+    is within a small Hamming radius of its own (multi-probe LSH), widening
+    the radius until enough candidates are found, then re-ranks them exactly.
+    """
+    
+    def __init__(self, dim: int, model: str, bits: int = 16):
+        self.dim = dim
+        self.model = model
+        self.bits = bits
+        self.ids: List[str] = []
+        self.vectors = np.zeros((0, dim), dtype=np.float16)
+        self.codes = np.zeros(0, dtype=np.uint32)
+        self._rows: Dict[str, int] = {}
+        self.stamp: Optional[Tuple[int, int]] = None  # Version of the file last loaded or saved
+        self._planes = np.random.default_rng(7).standard_normal((bits, dim)).astype(np.float32)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def upsert(self, ids: Sequence[str], embeddings: np.ndarray) -> None:
+        embeddings = _normalize(embeddings.astype(np.float32))
+        codes = self._codes(embeddings)
+        new_ids, new_rows = [], []
+        for i, recipe_id in enumerate(ids):
+            row = self._rows.get(recipe_id)
+            if row is None:
+                new_ids.append(recipe_id)
+                new_rows.append(i)
+            else:
+                self.vectors[row] = embeddings[i]
+                self.codes[row] = codes[i]
+        
+        if new_ids:
+            for recipe_id in new_ids:
+                self._rows[recipe_id] = len(self.ids)
+                self.ids.append(recipe_id)
+            self.vectors = np.vstack([self.vectors, embeddings[new_rows].astype(np.float16)])
+            self.codes = np.concatenate([self.codes, codes[new_rows]])
+    
+    def remove(self, recipe_id: str) -> None:
+        row = self._rows.pop(recipe_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            self.ids[row] = self.ids[last]
+            self.vectors[row] = self.vectors[last]
+            self.codes[row] = self.codes[last]
+            self._rows[self.ids[row]] = row
+        self.ids.pop()
+        self.vectors = self.vectors[:last]
+        self.codes = self.codes[:last]
+    
+    def search(self, embedding: np.ndarray, k: int, min_candidates: int) -> List[Tuple[str, float]]:
+        if not self.ids:
+            return []
+        query = _normalize(embedding.reshape(1, -1).astype(np.float32))
+        code = self._codes(query)[0]
+        
+        distances = self._popcount(self.codes ^ code)
+        candidates = np.array([], dtype=np.int64)
+        for radius in range(self.bits + 1):
+            candidates = np.flatnonzero(distances <= radius)
+            if len(candidates) >= min_candidates or len(candidates) == len(self.ids):
+                break
+        
+        scores = self.vectors[candidates].astype(np.float32) @ query[0]
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[candidates[i]], float(scores[i])) for i in top]
+    
+    def save(self, path: str) -> None:
+        """Write atomically so a crash never leaves a truncated index"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    ids=np.array(self.ids, dtype=str),
+                    vectors=self.vectors,
+                    codes=self.codes,
+                    model=np.array(self.model),
+                    bits=np.array(self.bits)
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.stamp = _stamp(path)
+    
+    @classmethod
+    def load(cls, path: str) -> Optional["SemanticIndex"]:
+        # Taken first: if the file is replaced while loading, the next check reloads it
+        stamp = _stamp(path)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                index = cls(data["vectors"].shape[1], str(data["model"]), int(data["bits"]))
+                index.ids = [str(i) for i in data["ids"]]
+                index.vectors = data["vectors"].astype(np.float16)
+                index.codes = data["codes"].astype(np.uint32)
+        except (OSError, KeyError, ValueError):
+            return None
+        index._rows = {recipe_id: row for row, recipe_id in enumerate(index.ids)}
+        index.stamp = stamp
+        return index
+    
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._planes.T) > 0
+        return (bits * (1 << np.arange(self.bits, dtype=np.uint32))).sum(axis=1).astype(np.uint32)
+    
+    @staticmethod
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        as_bytes = values.astype("<u4").view(np.uint8).reshape(-1, 4)
+        return np.unpackbits(as_bytes, axis=1).sum(axis=1)
+
+
+class SemanticSearchService:
+    """Per-user semantic indexes, persisted to disk and updated on every recipe write
+    
+    Embeddings are computed before the file lock is taken, so the lock is only
+    held for the reload-modify-save of the index file.
+    """
+    
+    def __init__(self, embedder: Optional[EmbeddingFunction] = None):
+        settings = get_settings()
+        self.directory = settings.semantic_index_dir
+        self.model_name = settings.semantic_search_model
+        self.candidates = settings.semantic_search_candidates
+        self.max_indexes = settings.semantic_max_indexes
+        self._embedder = embedder
+        self._indexes: "OrderedDict[str, SemanticIndex]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    @property
+    def embedder(self) -> EmbeddingFunction:
+        if self._embedder is None:
+            self._embedder = self._load_embedder()
+        return self._embedder
+    
+    def set_embedder(self, embedder: EmbeddingFunction) -> None:
+        """Swap the embedding function; indexes built with another model are rebuilt"""
+        self._embedder = embedder
+        self._indexes.clear()
+    
+    async def search(self, user_id: str, query: str, k: int) -> List[Tuple[str, float]]:
+        async with self._lock(user_id):
+            index = await self._index_for(user_id)
+        embedding = await asyncio.to_thread(self.embedder, [query])
+        return index.search(embedding[0], k, min_candidates=max(k, self.candidates))
+    
+    async def recipe_saved(self, recipe: Recipe) -> None:
+        if not self._known(recipe.user_id):
+            return  # Built from the database, including this recipe, on first search
+        async with self._lock(recipe.user_id):
+            index = await self._index_for(recipe.user_id)
+            embeddings = await asyncio.to_thread(self.embedder, [recipe_text(recipe)])
+            await self._update(recipe.user_id, index, lambda i: i.upsert([str(recipe.id)], embeddings))
+    
+    async def recipe_deleted(self, user_id: str, recipe_id: str) -> None:
+        if not self._known(user_id):
+            return
+        async with self._lock(user_id):
+            index = await self._index_for(user_id)
+            await self._update(user_id, index, lambda i: i.remove(recipe_id))
+    
+    async def user_deleted(self, user_id: str) -> None:
+        """Drop the user's index from memory and disk"""
+        async with self._lock(user_id):
+            self._indexes.pop(user_id, None)
+            path = self._path(user_id)
+            lock = await asyncio.to_thread(_lock_file, path)
+            try:
+                if os.path.exists(path):
+                    await asyncio.to_thread(os.remove, path)
+            finally:
+                lock.close()
+            if os.path.exists(lock.name):
+                os.remove(lock.name)
+        self._locks.pop(user_id, None)
+    
+    async def _index_for(self, user_id: str) -> SemanticIndex:
+        """The user's index, reloaded if another worker has replaced the file"""
+        path = self._path(user_id)
+        index = self._indexes.get(user_id)
+        stamp = await asyncio.to_thread(_stamp, path)
+        if index is None or (stamp is not None and stamp != index.stamp):
+            index = await asyncio.to_thread(SemanticIndex.load, path)
+            if index is None or index.model != self._model_id():
+                index = await self._build(user_id)
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(user_id)
+        return index
+    
+    async def _update(
+        self,
+        user_id: str,
+        index: SemanticIndex,
+        change: Callable[[SemanticIndex], None]
+    ) -> None:
+        """Apply `change` to the newest version of the index file and save it
+        
+        Without the lock two workers could each load the file, apply their own
+        change and save, and the second save would drop the first change.
+        """
+        path = self._path(user_id)
+        lock = await asyncio.to_thread(_lock_file, path)
+        try:
+            if await asyncio.to_thread(_stamp, path) not in (None, index.stamp):
+                latest = await asyncio.to_thread(SemanticIndex.load, path)
+                if latest is not None and latest.model == index.model:
+                    index = latest
+            change(index)
+            await asyncio.to_thread(index.save, path)
+        finally:
+            lock.close()
+        if user_id in self._indexes:
+            self._indexes[user_id] = index
+    
+    async def _build(self, user_id: str) -> SemanticIndex:
+        # Files written after this were built or updated by another worker from newer data
+        started = time.time_ns()
+        recipes = await Recipe.find(
+            {"user_id": user_id}, projection_model=RecipeTextView
+        ).to_list()
+        texts = [recipe_text(r) for r in recipes]
+        embeddings = await asyncio.to_thread(self.embedder, texts) if texts else None
+        
+        index = SemanticIndex(
+            embeddings.shape[1] if embeddings is not None else self._probe_dim(),
+            self._model_id()
+        )
+        if embeddings is not None:
+            index.upsert([str(r.id) for r in recipes], embeddings)
+        
+        path = self._path(user_id)
+        lock = await asyncio.to_thread(_lock_file, path)
+        try:
+            stamp = await asyncio.to_thread(_stamp, path)
+            if stamp is not None and stamp[1] >= started:
+                latest = await asyncio.to_thread(SemanticIndex.load, path)
+                if latest is not None and latest.model == index.model:
+                    return latest
+            await asyncio.to_thread(index.save, path)
+        finally:
+            lock.close()
+        return index
+    
+    def _known(self, user_id: str) -> bool:
+        return user_id in self._indexes or os.path.exists(self._path(user_id))
+    
+    def _lock(self, user_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(user_id, asyncio.Lock())
+    
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, f"{re.sub(r'[^A-Za-z0-9_-]', '_', user_id)}.npz")
+    
+    def _model_id(self) -> str:
+        return getattr(self.embedder, "name", None) or getattr(self.embedder, "__name__", "custom")
+    
+    def _probe_dim(self) -> int:
+        return int(self.embedder(["probe"]).shape[1])
+    
+    def _load_embedder(self) -> EmbeddingFunction:
+        if self.model_name:
+            try:
+                return SentenceTransformerEmbedder(self.model_name)
+            except ImportError:
+                print("sentence-transformers is not installed; semantic search uses hashed features")
+        return HashingEmbedder()
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[str]:
+    """Merge ranked ID lists; items ranked well by several lists come first"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+@lru_cache()
+def get_semantic_search() -> SemanticSearchService:
+    """Get the process-wide semantic search service"""
+    return SemanticSearchService()
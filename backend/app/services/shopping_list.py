@@ -0,0 +1,185 @@
+"""Merge the ingredients of several recipes into one shopping list"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.recipe import Ingredient
+from app.utils.ingredient_names import normalize_ingredient_name
+from app.utils.quantities import (
+    IMPERIAL,
+    METRIC,
+    UNITS,
+    format_amount,
+    format_measure,
+    parse_quantity
+)
+
+
+OTHER_CATEGORY = "other"
+
+# Units that often end up in the name ('3 garlic cloves'); moved to the unit
+COUNT_NOUNS = {"clove", "can", "stick", "slice", "sprig", "bunch", "head", "stalk", "sheet", "fillet"}
+
+# Checked in this order, so a keyword listed under an earlier category wins
+CATEGORY_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("spices & seasonings", (
+        "salt", "pepper flakes", "black pepper", "peppercorn", "paprika", "cumin", "oregano",
+        "thyme", "rosemary", "cinnamon", "nutmeg", "turmeric", "chili powder", "curry powder",
+        "bay leaf", "garam masala", "cayenne", "seasoning", "vanilla",
+    )),
+    ("meat & seafood", (
+        "chicken", "beef", "pork", "lamb", "turkey", "bacon", "sausage", "ham", "mince",
+        "steak", "fish", "salmon", "tuna", "cod", "shrimp", "prawn", "anchovy", "chorizo",
+    )),
+    ("dairy & eggs", (
+        "milk", "butter", "cream", "cheese", "parmesan", "mozzarella", "cheddar", "yogurt",
+        "yoghurt", "egg", "ricotta", "feta", "creme fraiche", "buttermilk",
+    )),
+    ("produce", (
+        "onion", "garlic", "shallot", "tomato", "potato", "carrot", "celery", "lettuce",
+        "spinach", "kale", "cabbage", "broccoli", "cauliflower", "zucchini", "courgette",
+        "bell pepper", "chili", "jalapeno", "cucumber", "mushroom", "lemon", "lime", "orange",
+        "apple", "banana", "berry", "avocado", "ginger", "parsley", "cilantro", "coriander",
+        "basil", "mint", "dill", "scallion", "leek", "pea", "corn", "squash", "pumpkin",
+    )),
+    ("bakery", ("bread", "baguette", "bun", "tortilla", "pita", "naan", "roll")),
+    ("frozen", ("frozen", "ice cream")),
+    ("beverages", ("wine", "beer", "juice", "coffee", "tea", "soda")),
+    ("pantry", (
+        "flour", "sugar", "rice", "pasta", "spaghetti", "noodle", "oil", "vinegar", "broth",
+        "stock", "lentil", "bean", "chickpea", "oat", "honey", "syrup", "soy sauce", "sauce",
+        "baking powder", "baking soda", "yeast", "cocoa", "chocolate", "nut", "almond",
+        "tomato paste", "mustard", "mayonnaise", "ketchup",
+    )),
+)
+
+# Multi-word keywords must be matched before their single words
+_KEYWORD_INDEX: List[Tuple[Tuple[str, ...], str]] = sorted(
+    ((tuple(keyword.split()), category)
+     for category, keywords in CATEGORY_KEYWORDS for keyword in keywords),
+    key=lambda entry: -len(entry[0])
+)
+
+
+@lru_cache(maxsize=8192)
+def categorize(normalized_name: str) -> str:
+    """Store section for a normalized ingredient name"""
+    words = tuple(normalized_name.split())
+    for keyword, category in _KEYWORD_INDEX:
+        size = len(keyword)
+        if any(words[i:i + size] == keyword for i in range(len(words) - size + 1)):
+            return category
+    return OTHER_CATEGORY
+
+
+@dataclass
+class _Line:
+    """Running total for one ingredient in one dimension (or one count unit)"""
+    name: str
+    category: str
+    dimension: Optional[str] = None
+    unit_text: str = ""
+    low: float = 0.0
+    high: float = 0.0
+    has_range: bool = False
+    has_amount: bool = False
+    recipe_ids: List[str] = field(default_factory=list)
+
+
+class ShoppingListBuilder:
+    """Accumulate recipe ingredients, summing compatible quantities in base units"""
+    
+    def __init__(self, system: Optional[str] = None):
+        self.system = system
+        self._lines: Dict[Tuple[str, str], _Line] = {}
+        self._systems_seen: Dict[str, int] = {METRIC: 0, IMPERIAL: 0}
+    
+    def add_recipe(self, recipe_id: str, ingredients: Iterable[Ingredient], factor: float = 1.0):
+        for ingredient in ingredients:
+            self.add(recipe_id, ingredient, factor)
+    
+    def add(self, recipe_id: str, ingredient: Ingredient, factor: float = 1.0):
+        name = normalize_ingredient_name(ingredient.name)
+        low, high, unit_key = self._amount(ingredient)
+        unit = UNITS.get(unit_key) if unit_key else None
+        unit_text = ingredient.unit.strip()
+        
+        if unit is not None:
+            group = unit.dimension
+            low, high = low * unit.to_base, high * unit.to_base if high is not None else None
+            self._systems_seen[unit.system] += 1
+        elif low is None:
+            group = "unmeasured"
+        else:
+            head, _, last = name.rpartition(" ")
+            if not unit_text and head and last in COUNT_NOUNS:
+                name, unit_text = head, last + ("s" if low * factor > 1 else "")
+            group = "count:" + (normalize_ingredient_name(unit_text) if unit_text else "")
+        
+        line = self._lines.get((name, group))
+        if line is None:
+            line = self._lines[(name, group)] = _Line(
+                name=name,
+                category=categorize(name),
+                dimension=unit.dimension if unit else None,
+                unit_text=unit_text if unit is None else ""
+            )
+        
+        if low is not None:
+            line.has_amount = True
+            line.low += low * factor
+            line.high += (high if high is not None else low) * factor
+            line.has_range = line.has_range or high is not None
+        if recipe_id not in line.recipe_ids:
+            line.recipe_ids.append(recipe_id)
+    
+    def build(self) -> Dict[str, List[Dict[str, object]]]:
+        """Items grouped by category, each category sorted by name"""
+        # Without an explicit system, use whichever the recipes mostly measure in
+        system = self.system or max(self._systems_seen, key=lambda s: (self._systems_seen[s], s == IMPERIAL))
+        
+        # "Salt, to taste" adds nothing to a line that already has an amount
+        measured = {}
+        for (name, group), line in self._lines.items():
+            if group != "unmeasured":
+                measured.setdefault(name, line)
+        lines = []
+        for (name, group), line in self._lines.items():
+            if group == "unmeasured" and name in measured:
+                target = measured[name].recipe_ids
+                target.extend(r for r in line.recipe_ids if r not in target)
+            else:
+                lines.append(line)
+        
+        categories: Dict[str, List[Dict[str, object]]] = {}
+        for line in sorted(lines, key=lambda line: (line.category, line.name)):
+            high = line.high if line.has_range else None
+            if not line.has_amount:
+                quantity, unit = "", line.unit_text
+            elif line.dimension:
+                quantity, unit = format_measure(line.low, high, line.dimension, system)
+            else:
+                quantity = format_amount(line.low, None)
+                if high is not None:
+                    quantity = f"{quantity}-{format_amount(high, None)}"
+                unit = line.unit_text
+            
+            categories.setdefault(line.category, []).append({
+                "name": line.name,
+                "quantity": quantity,
+                "unit": unit,
+                "recipe_ids": line.recipe_ids
+            })
+        return categories
+    
+    @staticmethod
+    def _amount(ingredient: Ingredient) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+        if ingredient.quantity_value is not None:
+            return ingredient.quantity_value, ingredient.quantity_max, ingredient.unit_key
+        
+        # Recipes saved before quantities were normalized
+        parsed = parse_quantity(ingredient.quantity, ingredient.unit)
+        if parsed is None:
+            return None, None, None
+        return float(parsed.low), float(parsed.high) if parsed.high is not None else None, parsed.unit
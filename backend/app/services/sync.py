@@ -0,0 +1,162 @@
+"""Delta sync: a user's recipe changes and deletions after an opaque cursor"""
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from app.config import get_settings
+from app.models.recipe import Recipe, RecipeTombstone
+
+
+# Sorts after every ObjectId hex string: a cursor at (t, END_ID) is past everything at t
+END_ID = "f" * 24
+# Sorts before every other one: a cursor at (t, START_ID) is before everything after t
+START_ID = "0" * 24
+
+
+class InvalidCursorError(ValueError):
+    """The cursor was not issued by this server"""
+
+
+class CursorExpiredError(Exception):
+    """Tombstones the cursor depends on may have expired; the client must resync"""
+
+
+def _to_millis(value: datetime) -> int:
+    return int((value - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def _from_millis(value: str) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(milliseconds=int(value))
+
+
+@dataclass(frozen=True)
+class SyncCursor:
+    """Position in a user's change history: everything up to (timestamp, id) has been seen
+    
+    `issued_at` is when the sync that produced the cursor started from
+    scratch; deletions before it concern recipes the client never received.
+    While a full sync pages through old recipes, `timestamp` lies far in the
+    past but only deletions after `issued_at` are needed.
+    """
+    timestamp: datetime
+    id: str
+    issued_at: Optional[datetime] = None
+    
+    @property
+    def deletions_since(self) -> "SyncCursor":
+        """Where the client's deletion history starts"""
+        if self.issued_at is not None and self.issued_at >= self.timestamp:
+            return SyncCursor(self.issued_at, START_ID)
+        return self
+    
+    def encode(self) -> str:
+        raw = f"{_to_millis(self.timestamp)}:{self.id}"
+        if self.issued_at is not None:
+            raw += f":{_to_millis(self.issued_at)}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @classmethod
+    def decode(cls, value: str) -> "SyncCursor":
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+            # Cursors issued before `issued_at` existed have two parts
+            millis, object_id, *issued = raw.split(":")
+            timestamp = _from_millis(millis)
+            issued_at = _from_millis(issued[0]) if issued else None
+        except (ValueError, UnicodeDecodeError, OverflowError):
+            raise InvalidCursorError("Malformed sync cursor")
+        if len(object_id) != 24 or any(c not in "0123456789abcdef" for c in object_id) or len(issued) > 1:
+            raise InvalidCursorError("Malformed sync cursor")
+        return cls(timestamp, object_id, issued_at)
+
+
+@dataclass
+class ChangeSet:
+    recipes: List[Recipe]
+    deleted: List[RecipeTombstone]
+    cursor: SyncCursor
+    has_more: bool
+
+
+def _keyset(time_field: str, id_field: str, position: Optional[SyncCursor], to_id, upper: datetime) -> dict:
+    """Condition for (time_field, id_field) > position and time_field <= upper"""
+    if position is None:
+        return {time_field: {"$lte": upper}}
+    if position.id == END_ID:
+        return {time_field: {"$gt": position.timestamp, "$lte": upper}}
+    return {
+        # The range bounds the index scan; $or resolves ties on the timestamp
+        time_field: {"$gte": position.timestamp, "$lte": upper},
+        "$or": [
+            {time_field: {"$gt": position.timestamp}},
+            {id_field: {"$gt": to_id(position.id)}},
+        ],
+    }
+
+
+def _settled_until() -> datetime:
+    """Changes stamped after this may still be in flight, so they wait for the next sync
+    
+    Truncated to milliseconds, the precision MongoDB stores dates with.
+    """
+    now = datetime.utcnow() - timedelta(seconds=get_settings().sync_settle_seconds)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+async def changes_since(user_id: str, cursor: Optional[str], limit: int) -> ChangeSet:
+    """Recipes written and deleted after `cursor`, oldest first
+    
+    Without a cursor every recipe is returned (a full sync, paged like any
+    other) and only deletions after the first page was read are needed, so
+    paging through recipes older than the deletion history works. Each query
+    walks the (user_id, updated_at, _id) index from the cursor, so the cost
+    follows the number of changes rather than the size of the library.
+    """
+    settings = get_settings()
+    position = SyncCursor.decode(cursor) if cursor else None
+    expiry = datetime.utcnow() - timedelta(days=settings.sync_tombstone_ttl_days)
+    if position is not None and position.deletions_since.timestamp < expiry:
+        raise CursorExpiredError("Sync cursor is older than the deletion history; resync from scratch")
+    
+    upper = _settled_until()
+    issued_at = upper if position is None else position.issued_at
+    recipes = await Recipe.find({
+        "user_id": user_id,
+        **_keyset("updated_at", "_id", position, PydanticObjectId, upper),
+    }).sort([("updated_at", 1), ("_id", 1)]).limit(limit + 1).to_list()
+    
+    tombstones: List[RecipeTombstone] = []
+    if position is not None:
+        tombstones = await RecipeTombstone.find({
+            "user_id": user_id,
+            **_keyset("deleted_at", "recipe_id", position.deletions_since, str, upper),
+        }).sort([("deleted_at", 1), ("recipe_id", 1)]).limit(limit + 1).to_list()
+    
+    # Merge both streams in cursor order and keep the first `limit` changes
+    merged: List[Tuple[datetime, str, object]] = sorted(
+        [(r.updated_at, str(r.id), r) for r in recipes]
+        + [(t.deleted_at, t.recipe_id, t) for t in tombstones],
+        key=lambda change: (change[0], change[1])
+    )
+    has_more = len(merged) > limit
+    page = merged[:limit]
+    
+    if has_more:
+        last_time, last_id, _ = page[-1]
+        # Until the full sync's position passes its start, deletions are counted from the start
+        still_full_sync = issued_at is not None and issued_at >= last_time
+        next_cursor = SyncCursor(last_time, last_id, issued_at if still_full_sync else None)
+    else:
+        # Caught up: everything settled so far has been seen
+        next_cursor = SyncCursor(upper, END_ID)
+    
+    return ChangeSet(
+        recipes=[change for _, _, change in page if isinstance(change, Recipe)],
+        deleted=[change for _, _, change in page if isinstance(change, RecipeTombstone)],
+        cursor=next_cursor,
+        has_more=has_more
+    )
@@ -0,0 +1,175 @@
+"""Clients for the YouTube Data API and video transcripts"""
+
+import asyncio
+import html
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+
+# videos.list accepts at most this many IDs per request
+MAX_IDS_PER_REQUEST = 50
+
+
+@dataclass
+class TranscriptSegment:
+    """One caption line with its start offset and duration in seconds"""
+    start: float
+    duration: float
+    text: str
+
+
+class YouTubeDataClient:
+    """Minimal YouTube Data API v3 client using batched videos.list calls"""
+    
+    def __init__(self, api_key: str, base_url: str, session: Optional[requests.Session] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.session = session or requests.Session()
+    
+    def videos_list(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch snippet and contentDetails for many videos, 50 IDs per request"""
+        videos: Dict[str, Dict[str, Any]] = {}
+        unique_ids = list(dict.fromkeys(video_ids))
+        
+        for start in range(0, len(unique_ids), MAX_IDS_PER_REQUEST):
+            response = self.session.get(
+                f"{self.base_url}/videos",
+                params={
+                    'part': 'snippet,contentDetails',
+                    'id': ','.join(unique_ids[start:start + MAX_IDS_PER_REQUEST]),
+                    'key': self.api_key,
+                    'maxResults': MAX_IDS_PER_REQUEST
+                },
+                timeout=10
+            )
+            response.raise_for_status()
+            for item in response.json().get('items', []):
+                videos[item['id']] = item
+        
+        return videos
+
+
+class VideoMetadataBatcher:
+    """Coalesce concurrent metadata lookups into shared videos.list calls"""
+    
+    def __init__(self, client: YouTubeDataClient, window_seconds: float = 0.02):
+        self.client = client
+        self.window_seconds = window_seconds
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+    
+    async def get(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata for one video, or None if the video does not exist"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(video_id, []).append(future)
+        
+        if len(self._pending) >= MAX_IDS_PER_REQUEST:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+    
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.create_task(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, pending: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            videos = await asyncio.to_thread(self.client.videos_list, list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        
+        for video_id, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(videos.get(video_id))
+
+
+class TranscriptClient:
+    """Fetch caption tracks, caching parsed transcripts by video ID
+    
+    `get` is called from worker threads, so the cache is guarded by a lock;
+    fetches run outside it.
+    """
+    
+    def __init__(
+        self,
+        base_url: str,
+        languages: Tuple[str, ...] = ('en',),
+        cache_size: int = 1024,
+        cache_ttl: float = 86400.0,
+        session: Optional[requests.Session] = None
+    ):
+        self.base_url = base_url
+        self.languages = languages
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.session = session or requests.Session()
+        self._cache: "OrderedDict[str, Tuple[float, List[TranscriptSegment]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def get(self, video_id: str) -> List[TranscriptSegment]:
+        """Transcript segments for a video; empty when no captions are available"""
+        with self._cache_lock:
+            cached = self._cache.get(video_id)
+            if cached and time.monotonic() - cached[0] < self.cache_ttl:
+                self._cache.move_to_end(video_id)
+                return cached[1]
+        
+        segments: List[TranscriptSegment] = []
+        for language in self.languages:
+            segments = self._fetch(video_id, language)
+            if segments:
+                break
+        
+        with self._cache_lock:
+            self._cache[video_id] = (time.monotonic(), segments)
+            self._cache.move_to_end(video_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        
+        return segments
+    
+    def _fetch(self, video_id: str, language: str) -> List[TranscriptSegment]:
+        response = self.session.get(
+            self.base_url, params={'v': video_id, 'lang': language}, timeout=10
+        )
+        if response.status_code == 404 or not response.content.strip():
+            return []
+        response.raise_for_status()
+        
+        try:
+            root = ElementTree.fromstring(response.content)
+        except ElementTree.ParseError:
+            return []
+        
+        segments = []
+        for node in root.iter('text'):
+            text = html.unescape(''.join(node.itertext())).replace('\n', ' ').strip()
+            if text:
+                segments.append(TranscriptSegment(
+                    start=float(node.get('start', 0)),
+                    duration=float(node.get('dur', 0)),
+                    text=text
+                ))
+        return segments
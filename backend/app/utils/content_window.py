@@ -0,0 +1,173 @@
+"""Relevance-based windowing of page text before it is sent to Gemini"""
+
+import re
+from dataclasses import dataclass
+from typing import List
+
+
+# Rough chars-per-token ratio for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Target size of a block before scoring
+BLOCK_CHARS = 600
+
+SECTION_HEADING_REGEX = re.compile(
+    r'^\s*(ingredients?|instructions?|directions?|method|preparation|steps|'
+    r'nutrition(\s+facts)?|notes?|equipment|yield|servings?)\s*:?\s*$',
+    re.IGNORECASE
+)
+INGREDIENT_HEADING_REGEX = re.compile(r'^\s*ingredients?\b', re.IGNORECASE)
+INSTRUCTION_HEADING_REGEX = re.compile(
+    r'^\s*(instructions?|directions?|method|preparation|steps)\b', re.IGNORECASE
+)
+QUANTITY_REGEX = re.compile(
+    r'(\d+\s*/\s*\d+|\d+(\.\d+)?|[¼-¾⅐-⅞])\s*'
+    r'(cups?|c\.|tbsps?|tablespoons?|tsps?|teaspoons?|oz|ounces?|lbs?|pounds?|'
+    r'g|grams?|kg|kilograms?|ml|millilit(er|re)s?|l|lit(er|re)s?|pinch|dash|'
+    r'cloves?|cans?|sticks?|slices?|pieces?|large|medium|small)\b',
+    re.IGNORECASE
+)
+STEP_REGEX = re.compile(r'^\s*(step\s*\d+|\d+[.)])\s+', re.IGNORECASE)
+TIME_REGEX = re.compile(
+    r'\b\d+\s*(minutes?|mins?|hours?|hrs?)\b|\b(prep|cook|total)\s+time\b', re.IGNORECASE
+)
+COOKING_VERB_REGEX = re.compile(
+    r'\b(preheat|bake|boil|simmer|stir|whisk|mix|combine|chop|dice|saute|sauté|'
+    r'fry|roast|season|serve|drain|knead|fold|pour|heat|add)\b',
+    re.IGNORECASE
+)
+BOILERPLATE_REGEX = re.compile(
+    r'\b(cookie|privacy policy|subscribe|newsletter|sign up|all rights reserved|'
+    r'advertisement|affiliate|comments?|reply|share this|pin it)\b',
+    re.IGNORECASE
+)
+
+
+@dataclass
+class TextBlock:
+    """A contiguous run of lines with its recipe relevance score"""
+    index: int
+    text: str
+    score: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_blocks(text: str, block_chars: int = BLOCK_CHARS) -> List[TextBlock]:
+    """Split text into blocks, starting a new block at every section heading"""
+    blocks: List[TextBlock] = []
+    current: List[str] = []
+    size = 0
+
+    def flush():
+        nonlocal current, size
+        if current:
+            blocks.append(TextBlock(index=len(blocks), text='\n'.join(current)))
+        current = []
+        size = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if SECTION_HEADING_REGEX.match(line) or size + len(line) > block_chars:
+            flush()
+        current.append(line)
+        size += len(line) + 1
+
+    flush()
+    return blocks
+
+
+def score_line(line: str) -> float:
+    """Score a single line by how recipe-like it looks"""
+    score = 0.0
+
+    if INGREDIENT_HEADING_REGEX.match(line) or INSTRUCTION_HEADING_REGEX.match(line):
+        score += 6.0
+    elif SECTION_HEADING_REGEX.match(line):
+        score += 3.0
+
+    quantities = len(QUANTITY_REGEX.findall(line))
+    if quantities:
+        # Short lines with a quantity are almost always ingredient list entries
+        score += 2.0 * min(quantities, 3) + (1.5 if len(line) < 80 else 0.0)
+
+    if STEP_REGEX.match(line):
+        score += 2.0
+
+    if TIME_REGEX.search(line):
+        score += 1.0
+
+    score += 0.5 * min(len(COOKING_VERB_REGEX.findall(line)), 4)
+
+    if BOILERPLATE_REGEX.search(line):
+        score -= 2.0
+
+    return score
+
+
+def score_block(block: TextBlock) -> float:
+    """Score a block as the line-length-normalized sum of its line scores"""
+    lines = block.text.splitlines()
+    if not lines:
+        return 0.0
+
+    total = sum(score_line(line) for line in lines)
+    # Normalize by size so one long story paragraph cannot outweigh a dense list
+    return total / max(1.0, len(block.text) / 200)
+
+
+def select_recipe_window(text: str, max_tokens: int) -> str:
+    """Pack the highest-value blocks of text into a token budget.
+
+    Blocks are chosen by score density and emitted in their original order,
+    with a marker wherever content was skipped.
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+
+    blocks = split_blocks(text)
+    for block in blocks:
+        block.score = score_block(block)
+
+    # A heading's body usually lands in the following block; let it borrow relevance
+    for i in range(1, len(blocks)):
+        if blocks[i - 1].score > blocks[i].score and SECTION_HEADING_REGEX.match(
+            blocks[i - 1].text.splitlines()[0]
+        ):
+            blocks[i].score += 0.5 * blocks[i - 1].score
+
+    ranked = sorted(blocks, key=lambda b: (b.score, -b.index), reverse=True)
+
+    selected: List[TextBlock] = []
+    used = 0
+    for block in ranked:
+        if block.score <= 0 and selected:
+            break
+        if used + block.tokens > max_tokens:
+            continue
+        selected.append(block)
+        used += block.tokens
+
+    if not selected:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    selected.sort(key=lambda b: b.index)
+
+    parts: List[str] = []
+    previous = -1
+    for block in selected:
+        if block.index != previous + 1:
+            parts.append('[...]')
+        parts.append(block.text)
+        previous = block.index
+
+    return '\n'.join(parts)
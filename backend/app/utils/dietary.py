@@ -0,0 +1,241 @@
+"""Normalize dietary labels and ingredient allergens into a DietaryInfo bitmask
+
+A recipe's mask holds the flags of its free-form `dietary_info` labels
+('Gluten-Free', 'plant based', 'GF') and the flags those imply (vegan recipes
+are vegetarian), less any flag one of its ingredients contradicts: a 'vegan'
+recipe listing butter is not vegan. Ingredients can only remove flags, since
+a keyword list cannot prove a dish vegetarian or gluten-free. That no
+ingredient mentions gluten, dairy or nuts is kept apart in
+`allergen_scan_mask`, a hint for display that filters never use.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.constants import DIETARY_BITS, DietaryInfo
+from app.utils.ingredient_names import normalize_ingredient_name
+
+
+LABEL_REGEX = re.compile(r"[^a-z]+")
+
+# Normalized label -> flag; labels like 'gluten-free-optional' promise nothing and stay unmapped
+LABEL_ALIASES: Dict[str, DietaryInfo] = {
+    "vegetarian": DietaryInfo.VEGETARIAN,
+    "veggie": DietaryInfo.VEGETARIAN,
+    "lactoovovegetarian": DietaryInfo.VEGETARIAN,
+    "vegan": DietaryInfo.VEGAN,
+    "plantbased": DietaryInfo.VEGAN,
+    "glutenfree": DietaryInfo.GLUTEN_FREE,
+    "gf": DietaryInfo.GLUTEN_FREE,
+    "coeliac": DietaryInfo.GLUTEN_FREE,
+    "celiac": DietaryInfo.GLUTEN_FREE,
+    "dairyfree": DietaryInfo.DAIRY_FREE,
+    "df": DietaryInfo.DAIRY_FREE,
+    "nondairy": DietaryInfo.DAIRY_FREE,
+    "nutfree": DietaryInfo.NUT_FREE,
+    "treenutfree": DietaryInfo.NUT_FREE,
+    "lowcarb": DietaryInfo.LOW_CARB,
+    "lowcarbohydrate": DietaryInfo.LOW_CARB,
+    "keto": DietaryInfo.KETO,
+    "ketogenic": DietaryInfo.KETO,
+    "paleo": DietaryInfo.PALEO,
+    "paleolithic": DietaryInfo.PALEO,
+    "halal": DietaryInfo.HALAL,
+    "kosher": DietaryInfo.KOSHER,
+    "pescatarian": DietaryInfo.PESCATARIAN,
+    "pescetarian": DietaryInfo.PESCATARIAN,
+}
+
+# A recipe carrying the key flag also satisfies these
+IMPLIED_FLAGS: Dict[DietaryInfo, Tuple[DietaryInfo, ...]] = {
+    DietaryInfo.VEGAN: (DietaryInfo.VEGETARIAN, DietaryInfo.DAIRY_FREE),
+    DietaryInfo.VEGETARIAN: (DietaryInfo.PESCATARIAN,),
+    DietaryInfo.KETO: (DietaryInfo.LOW_CARB,),
+    DietaryInfo.PALEO: (DietaryInfo.GLUTEN_FREE, DietaryInfo.DAIRY_FREE),
+}
+
+# Allergen -> (keywords, phrases that contain a keyword but not the allergen),
+# matched on whole words of normalized (singular, lower-case) ingredient names
+ALLERGENS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "meat": ((
+        "chicken", "beef", "pork", "lamb", "mutton", "veal", "turkey", "duck", "goose", "venison",
+        "bacon", "ham", "sausage", "mince", "steak", "prosciutto", "pancetta", "guanciale", "chorizo",
+        "salami", "pepperoni", "lard", "gelatin", "gelatine", "bone broth",
+    ), ()),
+    "fish": ((
+        "fish", "salmon", "tuna", "cod", "haddock", "trout", "sardine", "anchovy", "mackerel",
+        "tilapia", "halibut", "worcestershire",
+    ), ()),
+    "shellfish": ((
+        "shrimp", "prawn", "crab", "lobster", "clam", "mussel", "oyster", "scallop", "squid",
+        "calamari", "octopus", "crawfish",
+    ), ()),
+    "dairy": ((
+        "milk", "butter", "cream", "cheese", "parmesan", "mozzarella", "cheddar", "ricotta", "feta",
+        "yogurt", "yoghurt", "ghee", "buttermilk", "creme fraiche", "mascarpone", "whey", "custard",
+        "paneer", "half-and-half", "half and half", "half half", "kefir", "quark", "pesto",
+    ), (
+        "peanut butter", "almond butter", "nut butter", "cashew butter", "apple butter",
+        "cocoa butter", "coconut milk", "coconut cream", "almond milk", "oat milk", "soy milk",
+        "rice milk", "cashew milk", "cream of tartar",
+    )),
+    "egg": (("egg", "mayonnaise", "mayo", "meringue", "aioli"), ()),
+    "honey": (("honey",), ()),
+    "gluten": ((
+        "flour", "wheat", "bread", "breadcrumb", "panko", "pasta", "spaghetti", "macaroni", "noodle",
+        "couscous", "barley", "rye", "semolina", "bulgur", "farro", "spelt", "seitan", "soy sauce",
+        "tortilla", "pita", "cracker", "beer", "puff pastry", "phyllo", "filo", "orzo", "gnocchi",
+        "malt", "durum", "farina",
+    ), (
+        "rice flour", "almond flour", "coconut flour", "corn flour", "cornflour", "chickpea flour",
+        "tapioca flour", "rice noodle", "corn tortilla",
+    )),
+    "nuts": ((
+        "nut", "almond", "walnut", "pecan", "cashew", "pistachio", "hazelnut", "peanut",
+        "macadamia", "pine nut", "brazil nut", "marzipan", "praline", "nutella", "pesto",
+    ), ()),
+    "pork": ((
+        "pork", "bacon", "ham", "prosciutto", "pancetta", "guanciale", "lard", "salami", "pepperoni",
+    ), ()),
+    "alcohol": ((
+        "wine", "beer", "rum", "vodka", "brandy", "cognac", "whiskey", "whisky", "bourbon", "sake",
+        "mirin", "sherry", "liqueur", "gin", "tequila",
+    ), ("wine vinegar",)),
+}
+
+# Words that mark a whole ingredient free of these allergens: 'vegan sausage', 'gluten-free flour'.
+# Vegetarian only rules out flesh: 'vegetarian parmesan' is still cheese.
+FLESH = ("meat", "fish", "shellfish", "pork")
+ANIMAL_PRODUCTS = FLESH + ("dairy", "egg", "honey")
+FREE_FROM_MARKERS: Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...] = (
+    (("vegan", "plant-based", "plant based"), ANIMAL_PRODUCTS),
+    (("vegetarian", "veggie", "meatless", "meat-free", "meat free"), FLESH),
+    (("dairy-free", "dairy free", "non-dairy", "lactose-free"), ("dairy",)),
+    (("eggless", "egg-free"), ("egg",)),
+    (("gluten-free", "gluten free"), ("gluten",)),
+    (("nut-free", "nut free"), ("nuts",)),
+    (("non-alcoholic", "alcohol-free"), ("alcohol",)),
+)
+
+
+# A flag is dropped when any of these allergens is found
+CONTRADICTIONS: Dict[DietaryInfo, Tuple[str, ...]] = {
+    DietaryInfo.VEGAN: ("meat", "fish", "shellfish", "dairy", "egg", "honey"),
+    DietaryInfo.VEGETARIAN: ("meat", "fish", "shellfish"),
+    DietaryInfo.PESCATARIAN: ("meat",),
+    DietaryInfo.GLUTEN_FREE: ("gluten",),
+    DietaryInfo.DAIRY_FREE: ("dairy",),
+    DietaryInfo.NUT_FREE: ("nuts",),
+    DietaryInfo.PALEO: ("dairy", "gluten"),
+    DietaryInfo.HALAL: ("pork", "alcohol"),
+    DietaryInfo.KOSHER: ("pork", "shellfish"),
+}
+
+# Reported by allergen_scan_mask when no ingredient mentions the allergen
+ALLERGEN_FREE_FLAGS: Dict[DietaryInfo, str] = {
+    DietaryInfo.GLUTEN_FREE: "gluten",
+    DietaryInfo.DAIRY_FREE: "dairy",
+    DietaryInfo.NUT_FREE: "nuts",
+}
+
+
+def _phrase_regex(phrases: Sequence[str]) -> Optional[re.Pattern]:
+    if not phrases:
+        return None
+    alternatives = sorted((re.escape(p) for p in phrases), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+
+ALLERGEN_REGEXES = {
+    allergen: (_phrase_regex(keywords), _phrase_regex(harmless))
+    for allergen, (keywords, harmless) in ALLERGENS.items()
+}
+MARKER_REGEXES = [(_phrase_regex(markers), frozenset(allergens)) for markers, allergens in FREE_FROM_MARKERS]
+
+
+def parse_label(label: Optional[str]) -> Optional[DietaryInfo]:
+    """'Gluten-Free', 'gluten_free' and 'GF' -> DietaryInfo.GLUTEN_FREE; None when unknown"""
+    return LABEL_ALIASES.get(LABEL_REGEX.sub("", (label or "").lower()))
+
+
+def labels_to_mask(labels: Iterable[str]) -> int:
+    """Mask of the recognised labels, without implied flags (for querying)"""
+    mask = 0
+    for label in labels:
+        flag = parse_label(label)
+        if flag is not None:
+            mask |= DIETARY_BITS[flag]
+    return mask
+
+
+def mask_to_flags(mask: int) -> List[str]:
+    return [flag.value for flag, bit in DIETARY_BITS.items() if mask & bit]
+
+
+@lru_cache(maxsize=8192)
+def ingredient_allergens(name: str) -> FrozenSet[str]:
+    """Allergen groups an ingredient name mentions: 'unsalted butter' -> {'dairy'}"""
+    normalized = normalize_ingredient_name(name)
+    excluded = set()
+    for markers, allergens in MARKER_REGEXES:
+        if markers.search(normalized):
+            excluded |= allergens
+    
+    found = set()
+    for allergen, (keywords, harmless) in ALLERGEN_REGEXES.items():
+        if allergen in excluded:
+            continue
+        text = harmless.sub(" ", normalized) if harmless is not None else normalized
+        if keywords.search(text):
+            found.add(allergen)
+    return frozenset(found)
+
+
+def dietary_mask(labels: Iterable[str], ingredient_names: Iterable[str]) -> int:
+    """The recipe's DietaryInfo bitmask from its labels and ingredient names"""
+    flags = {flag for flag in map(parse_label, labels) if flag is not None}
+    pending = list(flags)
+    while pending:
+        for implied in IMPLIED_FLAGS.get(pending.pop(), ()):
+            if implied not in flags:
+                flags.add(implied)
+                pending.append(implied)
+    
+    names = [name for name in ingredient_names if name and name.strip()]
+    allergens = set()
+    for name in names:
+        allergens |= ingredient_allergens(name)
+    
+    # Kosher rules forbid meat and dairy in the same dish
+    if "meat" in allergens and "dairy" in allergens:
+        flags.discard(DietaryInfo.KOSHER)
+    
+    flags = {
+        flag for flag in flags
+        if not allergens.intersection(CONTRADICTIONS.get(flag, ()))
+    }
+    return _flags_to_mask(flags)
+
+
+def allergen_scan_mask(ingredient_names: Iterable[str]) -> int:
+    """Allergen-free flags whose allergen no ingredient name mentions
+    
+    Keyword matching misses ingredients it has no word for, so this is shown
+    as "no gluten/dairy/nuts found" and never used to filter recipes. Zero
+    for recipes without ingredients.
+    """
+    names = [name for name in ingredient_names if name and name.strip()]
+    if not names:
+        return 0
+    allergens = set()
+    for name in names:
+        allergens |= ingredient_allergens(name)
+    return _flags_to_mask(flag for flag, allergen in ALLERGEN_FREE_FLAGS.items() if allergen not in allergens)
+
+
+def _flags_to_mask(flags: Iterable[DietaryInfo]) -> int:
+    mask = 0
+    for flag in flags:
+        mask |= DIETARY_BITS[flag]
+    return mask
@@ -0,0 +1,39 @@
+"""Normalize free-form ingredient names so the same ingredient compares equal"""
+
+import re
+from functools import lru_cache
+
+
+DESCRIPTOR_REGEX = re.compile(
+    r"\b(fresh(ly)?|chopped|diced|minced|sliced|grated|shredded|crushed|ground|peeled|"
+    r"finely|roughly|thinly|large|medium|small|ripe|organic|boneless|skinless|"
+    r"to taste|optional|divided|packed|softened|melted|room temperature|"
+    r"whole|raw|cooked|dried|extra[- ]virgin|all[- ]purpose)\b",
+    re.IGNORECASE
+)
+PARENTHETICAL_REGEX = re.compile(r"\([^)]*\)|,.*$")
+NON_WORD_REGEX = re.compile(r"[^a-z\s-]+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+# Plural endings to strip, longest first; words in INVARIANT_WORDS are kept as-is
+PLURAL_SUFFIXES = (("ies", "y"), ("oes", "o"), ("ches", "ch"), ("shes", "sh"), ("s", ""))
+INVARIANT_WORDS = {"asparagus", "couscous", "hummus", "molasses", "swiss", "grits", "citrus"}
+
+
+def _singular(word: str) -> str:
+    if word in INVARIANT_WORDS or len(word) <= 3 or word.endswith("ss"):
+        return word
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if word.endswith(suffix):
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+@lru_cache(maxsize=8192)
+def normalize_ingredient_name(name: str) -> str:
+    """'2 Large Tomatoes, diced (about 1 lb)' style names -> 'tomato'"""
+    cleaned = PARENTHETICAL_REGEX.sub(" ", name.lower())
+    cleaned = DESCRIPTOR_REGEX.sub(" ", cleaned)
+    cleaned = NON_WORD_REGEX.sub(" ", cleaned)
+    words = [_singular(w) for w in WHITESPACE_REGEX.split(cleaned.strip()) if w]
+    return " ".join(words) or name.strip().lower()
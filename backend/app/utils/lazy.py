@@ -0,0 +1,27 @@
+"""Defer importing heavy optional-at-startup modules until first attribute access"""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Return `name` as a module that is only executed when first used
+    
+    Usable at module level like a normal import (`np = lazy_module("numpy")`);
+    attribute access at import time (annotations, defaults) triggers the real
+    import, so annotations referring to the module must be strings.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,94 @@
+"""MinHash signatures and LSH band keys for near-duplicate recipe detection"""
+
+import hashlib
+import random
+import re
+import struct
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Set
+
+from app.config import get_settings
+from app.utils.ingredient_names import normalize_ingredient_name
+
+
+# Mersenne prime larger than any 32-bit feature hash
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+TITLE_WORD_REGEX = re.compile(r"[a-z0-9]+")
+
+# Words that say nothing about which dish a title names
+TITLE_STOPWORDS = {
+    "the", "a", "an", "and", "with", "of", "in", "for", "my", "best", "easy", "quick",
+    "simple", "recipe", "homemade", "perfect", "ultimate", "healthy", "minute",
+}
+
+
+def _permutations(count: int, seed: int = 1):
+    """Fixed (a, b) pairs for the universal hashes; never change them once stored"""
+    rng = random.Random(seed)
+    return [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(count)]
+
+
+class MinHasher:
+    """Estimate Jaccard similarity of feature sets from fixed-size signatures
+    
+    Signatures are split into `bands` bands of equal rows; two recipes become
+    candidates when any band matches exactly, which happens with probability
+    1 - (1 - s^rows)^bands for Jaccard similarity s.
+    """
+    
+    def __init__(self, num_perm: int = 96, bands: int = 32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._perms = _permutations(num_perm)
+    
+    def signature(self, features: Iterable[str]) -> List[int]:
+        hashes = [
+            struct.unpack("<I", hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest())[0]
+            for f in set(features)
+        ]
+        if not hashes:
+            return []
+        return [
+            min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+            for a, b in self._perms
+        ]
+    
+    def band_keys(self, signature: Sequence[int]) -> List[str]:
+        """One key per band, prefixed with the band index so bands never collide"""
+        if not signature:
+            return []
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{len(rows)}I", *rows), digest_size=8).hexdigest()
+            keys.append(f"{band:02d}{digest}")
+        return keys
+    
+    @staticmethod
+    def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+        """Estimated Jaccard similarity: the fraction of agreeing signature slots"""
+        if not a or len(a) != len(b):
+            return 0.0
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def recipe_features(title: str, ingredient_names: Iterable[str]) -> Set[str]:
+    """Normalized ingredient names plus word shingles of the title"""
+    features = {f"i:{normalize_ingredient_name(name)}" for name in ingredient_names if name}
+    
+    words = [w for w in TITLE_WORD_REGEX.findall(title.lower()) if w not in TITLE_STOPWORDS]
+    features.update(f"t:{w}" for w in words)
+    features.update(f"t:{a} {b}" for a, b in zip(words, words[1:]))
+    return features
+
+
+@lru_cache()
+def get_min_hasher() -> MinHasher:
+    """Get the MinHasher configured for stored signatures"""
+    settings = get_settings()
+    return MinHasher(settings.duplicate_minhash_permutations, settings.duplicate_lsh_bands)
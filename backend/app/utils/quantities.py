@@ -0,0 +1,257 @@
+"""Parse, scale and convert free-form ingredient quantities and units"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+METRIC = "metric"
+IMPERIAL = "imperial"
+UNIT_SYSTEMS = (METRIC, IMPERIAL)
+
+VOLUME = "volume"
+MASS = "mass"
+
+VULGAR_FRACTIONS = "¼½¾⅐⅑⅒⅓⅔⅕⅖⅗⅘⅙⅚⅛⅜⅝⅞"
+VULGAR_FRACTION_REGEX = re.compile(f"(\\d?)\\s*([{VULGAR_FRACTIONS}])")
+
+NUMBER_PATTERN = r"\d+\s+\d+\s*/\s*\d+|\d+\s*/\s*\d+|\d*\.\d+|\d+"
+AMOUNT_REGEX = re.compile(
+    rf"^\s*(?:about|approx\.?|approximately|~)?\s*(?P<low>{NUMBER_PATTERN})"
+    rf"(?:\s*(?:-|–|—|to|or)\s*(?P<high>{NUMBER_PATTERN}))?\s*(?P<rest>.*)$",
+    re.IGNORECASE
+)
+# '1,000' groups thousands; any other comma between digits is a decimal comma ('1,5 kg')
+THOUSANDS_COMMA_REGEX = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+DECIMAL_COMMA_REGEX = re.compile(r"(?<=\d),(?=\d)")
+WORD_AMOUNTS = {"a": Fraction(1), "an": Fraction(1), "one": Fraction(1), "half": Fraction(1, 2)}
+
+
+@dataclass(frozen=True)
+class Unit:
+    """A measuring unit and its size in the base unit of its dimension (ml or g)"""
+    key: str
+    dimension: str
+    system: str
+    to_base: float
+    singular: str
+    plural: str
+
+
+UNITS: Dict[str, Unit] = {unit.key: unit for unit in (
+    Unit("tsp", VOLUME, IMPERIAL, 4.92892, "tsp", "tsp"),
+    Unit("tbsp", VOLUME, IMPERIAL, 14.7868, "tbsp", "tbsp"),
+    Unit("fl_oz", VOLUME, IMPERIAL, 29.5735, "fl oz", "fl oz"),
+    Unit("cup", VOLUME, IMPERIAL, 236.588, "cup", "cups"),
+    Unit("pint", VOLUME, IMPERIAL, 473.176, "pint", "pints"),
+    Unit("quart", VOLUME, IMPERIAL, 946.353, "quart", "quarts"),
+    Unit("gallon", VOLUME, IMPERIAL, 3785.41, "gallon", "gallons"),
+    Unit("ml", VOLUME, METRIC, 1.0, "ml", "ml"),
+    Unit("cl", VOLUME, METRIC, 10.0, "cl", "cl"),
+    Unit("dl", VOLUME, METRIC, 100.0, "dl", "dl"),
+    Unit("l", VOLUME, METRIC, 1000.0, "l", "l"),
+    Unit("oz", MASS, IMPERIAL, 28.3495, "oz", "oz"),
+    Unit("lb", MASS, IMPERIAL, 453.592, "lb", "lb"),
+    Unit("mg", MASS, METRIC, 0.001, "mg", "mg"),
+    Unit("g", MASS, METRIC, 1.0, "g", "g"),
+    Unit("kg", MASS, METRIC, 1000.0, "kg", "kg"),
+)}
+
+UNIT_ALIASES: Dict[str, str] = {
+    **{alias: "tsp" for alias in ("t", "tsp", "tsps", "teaspoon", "teaspoons")},
+    **{alias: "tbsp" for alias in (
+        "T", "tbsp", "tbsps", "tbs", "tbl", "tablespoon", "tablespoons"
+    )},
+    **{alias: "fl_oz" for alias in ("fl oz", "floz", "fluid ounce", "fluid ounces")},
+    **{alias: "cup" for alias in ("c", "cup", "cups")},
+    **{alias: "pint" for alias in ("pt", "pint", "pints")},
+    **{alias: "quart" for alias in ("qt", "quart", "quarts")},
+    **{alias: "gallon" for alias in ("gal", "gallon", "gallons")},
+    **{alias: "ml" for alias in (
+        "ml", "milliliter", "milliliters", "millilitre", "millilitres"
+    )},
+    **{alias: "cl" for alias in ("cl", "centiliter", "centiliters", "centilitre", "centilitres")},
+    **{alias: "dl" for alias in ("dl", "deciliter", "deciliters", "decilitre", "decilitres")},
+    **{alias: "l" for alias in ("l", "liter", "liters", "litre", "litres")},
+    **{alias: "oz" for alias in ("oz", "ounce", "ounces")},
+    **{alias: "lb" for alias in ("lb", "lbs", "pound", "pounds")},
+    **{alias: "mg" for alias in ("mg", "milligram", "milligrams")},
+    **{alias: "g" for alias in ("g", "gr", "gram", "grams", "gramme", "grammes")},
+    **{alias: "kg" for alias in ("kg", "kgs", "kilogram", "kilograms")},
+}
+
+# Units offered when converting, largest first; a value is shown in the
+# largest unit it reaches at least `minimum` of
+DISPLAY_UNITS: Dict[Tuple[str, str], Tuple[Tuple[str, float], ...]] = {
+    (VOLUME, METRIC): (("l", 1.0), ("ml", 0.0)),
+    (VOLUME, IMPERIAL): (("cup", 0.25), ("tbsp", 1.0), ("tsp", 0.0)),
+    (MASS, METRIC): (("kg", 1.0), ("g", 0.0)),
+    (MASS, IMPERIAL): (("lb", 1.0), ("oz", 0.0)),
+}
+
+# Imperial amounts are rounded to kitchen fractions, preferring simpler ones
+KITCHEN_DENOMINATORS = (1, 2, 3, 4, 8)
+
+
+@dataclass(frozen=True)
+class ParsedQuantity:
+    """Normalized form of an ingredient's quantity and unit"""
+    low: Fraction
+    high: Optional[Fraction]
+    unit: Optional[str]  # Key into UNITS, None for counts and unknown units
+
+
+def _expand_vulgar_fractions(text: str) -> str:
+    """'1½' -> '1 1/2', '¾' -> '3/4'"""
+    def replace(match: re.Match) -> str:
+        fraction = Fraction(unicodedata.numeric(match.group(2))).limit_denominator(10)
+        whole = f"{match.group(1)} " if match.group(1) else ""
+        return f"{whole}{fraction.numerator}/{fraction.denominator}"
+    return VULGAR_FRACTION_REGEX.sub(replace, text.replace("⁄", "/"))
+
+
+def _normalize_separators(text: str) -> str:
+    """'1,000' -> '1000', '1,5' -> '1.5'"""
+    return DECIMAL_COMMA_REGEX.sub(".", THOUSANDS_COMMA_REGEX.sub("", text))
+
+
+def parse_number(text: str) -> Fraction:
+    """Parse '1 1/2', '3/4', '.5' or '2' into an exact rational"""
+    parts = re.sub(r"\s*/\s*", "/", text).split()
+    if len(parts) > 1 and "/" not in parts[0]:
+        return Fraction(parts[0]) + parse_number(" ".join(parts[1:]))
+    return Fraction(re.sub(r"\s+", "", text))
+
+
+def normalize_unit(unit: str) -> Optional[str]:
+    """Canonical unit key for a free-form unit, or None if it isn't a measure"""
+    cleaned = re.sub(r"[.()]", "", unit.strip())
+    if not cleaned:
+        return None
+    # 'T' and 't' are the only case-sensitive abbreviations
+    if cleaned in ("T", "t"):
+        return UNIT_ALIASES[cleaned]
+    cleaned = re.sub(r"\s+", " ", cleaned.lower())
+    return UNIT_ALIASES.get(cleaned) or UNIT_ALIASES.get(cleaned.split(" ")[0])
+
+
+def parse_quantity(quantity: str, unit: str = "") -> Optional[ParsedQuantity]:
+    """Parse an ingredient quantity such as '1 1/2', '2-3', '1,5', '½' or 'a'.
+    
+    When `unit` is empty the text after the amount is tried as the unit, so
+    '2 cups' parses on its own. Returns None when there is no amount.
+    """
+    text = _normalize_separators(_expand_vulgar_fractions(quantity or ""))
+    match = AMOUNT_REGEX.match(text)
+    if match:
+        try:
+            low = parse_number(match.group("low"))
+            high = parse_number(match.group("high")) if match.group("high") else None
+        except (ValueError, ZeroDivisionError):
+            return None
+        rest = match.group("rest")
+    else:
+        word, _, rest = text.strip().partition(" ")
+        if word.lower() not in WORD_AMOUNTS:
+            return None
+        low, high = WORD_AMOUNTS[word.lower()], None
+    
+    if high is not None and high <= low:
+        high = None
+    
+    return ParsedQuantity(low=low, high=high, unit=normalize_unit(unit or rest))
+
+
+def format_amount(value: float, system: Optional[str]) -> str:
+    """Render an amount: kitchen fractions for imperial, short decimals otherwise"""
+    if system == IMPERIAL or system is None:
+        # Errors within the same 1/64 tie, so the simplest denominator wins
+        fraction = min(
+            (Fraction(round(value * d), d) for d in KITCHEN_DENOMINATORS),
+            key=lambda f: abs(f - Fraction(value)) * 64 // 1
+        )
+        if fraction == 0 and value > 0:
+            fraction = Fraction(1, KITCHEN_DENOMINATORS[-1])
+        whole, remainder = divmod(fraction.numerator, fraction.denominator)
+        if not remainder:
+            return str(whole)
+        part = f"{remainder}/{fraction.denominator}"
+        return f"{whole} {part}" if whole else part
+    
+    if value >= 100:
+        return str(int(round(value)))
+    return f"{value:.2f}".rstrip("0").rstrip(".") if value < 10 else f"{value:.1f}".rstrip("0").rstrip(".")
+
+
+def is_plural(amount: str) -> bool:
+    """Whether a formatted amount takes a plural unit ('1 cup', '1/2 cup', '1 1/2 cups')"""
+    return not (amount == "1" or ("/" in amount and " " not in amount and "-" not in amount))
+
+
+def _display_unit(base_amount: float, dimension: str, system: str) -> Unit:
+    for key, minimum in DISPLAY_UNITS[(dimension, system)]:
+        if base_amount / UNITS[key].to_base >= minimum:
+            return UNITS[key]
+    return UNITS[DISPLAY_UNITS[(dimension, system)][-1][0]]
+
+
+def scale_quantities(
+    parsed: Sequence[Optional[Tuple[float, Optional[float], Optional[str]]]],
+    factor: float,
+    system: Optional[str] = None
+) -> List[Optional[Tuple[str, Optional[str]]]]:
+    """Scale and optionally convert a column of normalized quantities in one pass.
+    
+    `parsed` holds (low, high, unit key) per ingredient, as stored on save.
+    Returns (quantity text, unit text) per ingredient; the unit text is None
+    for counts, whose original unit is kept. Entries are None where the
+    ingredient has no amount and should be left untouched.
+    """
+    results: List[Optional[Tuple[str, Optional[str]]]] = []
+    for entry in parsed:
+        if entry is None:
+            results.append(None)
+            continue
+        
+        low, high, unit_key = entry
+        unit = UNITS.get(unit_key) if unit_key else None
+        low *= factor
+        high = high * factor if high is not None else None
+        
+        if unit is None:
+            amount = format_amount(low, None)
+            if high is not None:
+                amount = f"{amount}-{format_amount(high, None)}"
+            results.append((amount, None))
+            continue
+        
+        target = unit
+        if (system in UNIT_SYSTEMS and system != unit.system) or factor != 1:
+            # Re-pick the unit so scaled amounts stay readable (e.g. 24 tsp -> 1/2 cup)
+            target = _display_unit(low * unit.to_base, unit.dimension, system or unit.system)
+        ratio = unit.to_base / target.to_base
+        low *= ratio
+        high = high * ratio if high is not None else None
+        
+        amount = format_amount(low, target.system)
+        if high is not None:
+            amount = f"{amount}-{format_amount(high, target.system)}"
+        results.append((amount, target.plural if is_plural(amount) else target.singular))
+    
+    return results
+
+
+def format_measure(
+    low: float,
+    high: Optional[float],
+    dimension: str,
+    system: str
+) -> Tuple[str, str]:
+    """Render an amount given in base units (ml or g) in the most readable unit of `system`"""
+    target = _display_unit(low, dimension, system)
+    amount = format_amount(low / target.to_base, target.system)
+    if high is not None:
+        amount = f"{amount}-{format_amount(high / target.to_base, target.system)}"
+    return amount, target.plural if is_plural(amount) else target.singular
@@ -0,0 +1,148 @@
+"""Per-page latency of rule-pack extraction versus the generic LLM path.
+
+Usage:
+    python -m benchmarks.rules_vs_llm [--pages 200] [--model-latency 1.5] [--live]
+
+The LLM path uses a local fake model that answers after --model-latency seconds,
+with the request rate limit lifted, unless --live is given, in which case the
+configured Gemini model is called under the configured limits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.core.gemini import GeminiService  # noqa: E402
+from app.core.resilience import RateGovernor  # noqa: E402
+from app.services.extractors.rules import RuleBasedExtractor, RulePack, DEFAULT_RULES_DIR  # noqa: E402
+from app.services.extractors.website import WebsiteExtractor  # noqa: E402
+
+
+URL = "https://www.budgetbytes.com/benchmark-lentil-soup/"
+
+INGREDIENTS = [
+    ("1", "Tbsp", "olive oil", ""),
+    ("1", "", "yellow onion", "diced"),
+    ("2", "cloves", "garlic", "minced"),
+    ("1", "cup", "brown lentils", "rinsed"),
+    ("1", "15oz can", "diced tomatoes", ""),
+    ("4", "cups", "vegetable broth", ""),
+    ("1/2", "tsp", "smoked paprika", ""),
+    ("1", "bunch", "kale", "chopped"),
+]
+STEPS = [
+    "Heat the olive oil in a large pot over medium heat.",
+    "Add the onion and garlic and cook until soft, about 5 minutes.",
+    "Add the lentils, tomatoes, broth and paprika. Simmer for 30 minutes.",
+    "Stir in the kale and cook until wilted. Season to taste and serve.",
+]
+
+
+def build_page() -> bytes:
+    """A blog-style page: a long story followed by a WP Recipe Maker card"""
+    story = "".join(
+        f"<p>Paragraph {i}: this soup has been a family favourite for years and "
+        f"here is a very long story about it that nobody reads.</p>"
+        for i in range(300)
+    )
+    ingredients = "".join(
+        f'<li class="wprm-recipe-ingredient">'
+        f'<span class="wprm-recipe-ingredient-amount">{q}</span> '
+        f'<span class="wprm-recipe-ingredient-unit">{u}</span> '
+        f'<span class="wprm-recipe-ingredient-name">{n}</span> '
+        f'<span class="wprm-recipe-ingredient-notes">{notes}</span></li>'
+        for q, u, n, notes in INGREDIENTS
+    )
+    steps = "".join(
+        f'<li><div class="wprm-recipe-instruction-text">{step}</div></li>' for step in STEPS
+    )
+    return f"""<html><head><title>Lentil Soup</title></head><body>
+        <article>{story}</article>
+        <div class="wprm-recipe-container">
+            <h2 class="wprm-recipe-name">Lentil Soup</h2>
+            <div class="wprm-recipe-summary">A hearty weeknight soup.</div>
+            <span class="wprm-recipe-servings">6</span>
+            <div class="wprm-recipe-prep-time-container"><span class="wprm-recipe-time">10 mins</span></div>
+            <div class="wprm-recipe-cook-time-container"><span class="wprm-recipe-time">40 mins</span></div>
+            <ul>{ingredients}</ul>
+            <ol>{steps}</ol>
+        </div>
+    </body></html>""".encode("utf-8")
+
+
+class FakeModel:
+    """Stand-in for a Gemini model that answers with a fixed recipe after a delay"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.response = json.dumps({
+            "title": "Lentil Soup",
+            "servings": 6,
+            "ingredients": [
+                {"name": n, "quantity": q, "unit": u, "notes": notes or None}
+                for q, u, n, notes in INGREDIENTS
+            ],
+            "instructions": [
+                {"step_number": i, "instruction": step} for i, step in enumerate(STEPS, start=1)
+            ],
+        })
+    
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        time.sleep(self.latency)
+        return [SimpleNamespace(text=self.response)]
+
+
+def summarize(name: str, samples: list) -> None:
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    print(
+        f"{name:<8} pages={len(samples):<5} "
+        f"p50={statistics.median(samples) * 1000:9.2f} ms  p95={p95 * 1000:9.2f} ms"
+    )
+
+
+async def main(pages: int, model_latency: float, live: bool) -> None:
+    body = build_page()
+    fetcher = WebsiteExtractor()
+    with open(os.path.join(DEFAULT_RULES_DIR, "wprm.json")) as f:
+        extractor = RuleBasedExtractor(RulePack.compile("wprm", json.load(f)), fetcher)
+    
+    rule_samples = []
+    for _ in range(pages):
+        started = time.perf_counter()
+        recipe = extractor.extract_recipe(body, URL)
+        rule_samples.append(time.perf_counter() - started)
+    assert recipe and recipe["ingredients"], "rule pack did not match the benchmark page"
+    
+    if live:
+        service = GeminiService()
+    else:
+        service = GeminiService(model=FakeModel(model_latency))
+        # The fake has no quota; the production rate limit would time the governor, not the path
+        service.caller.governor = RateGovernor(max_concurrency=1, requests_per_minute=10 ** 9)
+    llm_pages = min(pages, 20)
+    llm_samples = []
+    for _ in range(llm_pages):
+        started = time.perf_counter()
+        content = fetcher.extract_from_body(URL, body)
+        await service.extract_recipe_data(content)
+        llm_samples.append(time.perf_counter() - started)
+    
+    print(f"page size: {len(body) / 1024:.1f} KiB")
+    summarize("rules", rule_samples)
+    summarize("llm", llm_samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--model-latency", type=float, default=1.5)
+    parser.add_argument("--live", action="store_true", help="call the configured Gemini model")
+    args = parser.parse_args()
+    asyncio.run(main(args.pages, args.model_latency, args.live))
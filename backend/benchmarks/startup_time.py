@@ -0,0 +1,93 @@
+"""Import-time cost of `app.main`, measured with `python -X importtime`.
+
+Usage:
+    python -m benchmarks.startup_time [--runs 5] [--top 15] [--budget-ms 1500] [--preload]
+
+Each run imports the app in a fresh interpreter. Reports the median total and
+the modules with the largest cumulative import time; exits non-zero when the
+median exceeds --budget-ms, so it can guard cold-start regressions in CI.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time:  self [us] | cumulative | imported package
+IMPORTTIME_REGEX = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure(preload: bool) -> Tuple[float, Dict[str, int]]:
+    """Import app.main once; returns total milliseconds and cumulative us per top-level import"""
+    env = dict(os.environ)
+    env.setdefault("SECRET_KEY", "benchmark")
+    env["PRELOAD_MODULES"] = "true" if preload else "false"
+    
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        tail = "\n".join(result.stderr.splitlines()[-20:])
+        raise SystemExit(f"Importing app.main failed:\n{tail}")
+    
+    total = 0
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_REGEX.match(line)
+        if not match:
+            continue
+        # Top-level entries for the app package; nested imports are already in
+        # their parent's cumulative time and interpreter startup is excluded
+        name, depth = match.group(4), len(match.group(3)) - 1
+        if depth == 0 and (name == "app" or name.startswith("app.")):
+            total += int(match.group(2))
+        cumulative[name] = int(match.group(2))
+    return total / 1000, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--preload", action="store_true", help="Include the preload warm-up in the import")
+    args = parser.parse_args()
+    
+    totals: List[float] = []
+    per_module: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(args.runs):
+        total, cumulative = measure(args.preload)
+        totals.append(total)
+        for name, micros in cumulative.items():
+            per_module[name].append(micros)
+    
+    median = statistics.median(totals)
+    print(f"import app.main: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f} ms, max {max(totals):.0f} ms)")
+    
+    print("\nSlowest modules (median cumulative):")
+    slowest = sorted(
+        ((statistics.median(values), name) for name, values in per_module.items()),
+        reverse=True
+    )
+    for micros, name in slowest[:args.top]:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+    
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"\nOver budget: {median:.0f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
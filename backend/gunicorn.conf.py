@@ -0,0 +1,22 @@
+"""Gunicorn settings for production: uvicorn workers, optionally forked from a preloaded master
+
+Run with:
+    gunicorn app.main:app -c gunicorn.conf.py
+
+With PRELOAD_MODULES=true the master imports the app and warms up Gemini,
+bcrypt, numpy and the extractors once; workers then share those pages
+copy-on-write instead of each importing them. Database clients are created
+per worker in the app lifespan, after the fork.
+"""
+
+import multiprocessing
+import os
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("PRELOAD_MODULES", "false").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
@@ -0,0 +1,22 @@
+import os
+
+import pytest_asyncio
+
+# Settings refuse to load without a secret key
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Beanie bound to an in-memory MongoDB stand-in"""
+    from beanie import init_beanie
+    from mongomock_motor import AsyncMongoMockClient
+    
+    from app.models.recipe import LibraryStats, Recipe, RecipeTombstone
+    
+    client = AsyncMongoMockClient()
+    await init_beanie(
+        database=client["recipe_keeper_test"],
+        document_models=[Recipe, RecipeTombstone, LibraryStats]
+    )
+    yield client["recipe_keeper_test"]
@@ -0,0 +1,176 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+
+from app.services.change_feed import (
+    HEARTBEAT,
+    RESET_EVENT,
+    ChangeFeed,
+    InMemoryChangeSource
+)
+
+
+class HistoryLost(Exception):
+    code = 286
+
+
+class InterruptedSource(InMemoryChangeSource):
+    """Fails with `error` once `fail` is set, like a change stream whose oplog rolled over"""
+    
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+        self.fail = False
+    
+    async def changes(self, resume_after):
+        async for change in super().changes(resume_after):
+            yield change
+            if self.fail:
+                self.fail = False
+                raise self.error
+
+
+def upserted(user_id, recipe_id, title="Lentil soup"):
+    return {
+        "ns": {"coll": "recipes"},
+        "operationType": "update",
+        "documentKey": {"_id": recipe_id},
+        "fullDocument": {"user_id": user_id, "title": title, "updated_at": datetime(2024, 5, 1)},
+    }
+
+
+def deleted(user_id, recipe_id):
+    return {
+        "ns": {"coll": "recipe_tombstones"},
+        "operationType": "insert",
+        "documentKey": {"_id": "t" + recipe_id},
+        "fullDocument": {"user_id": user_id, "recipe_id": recipe_id, "deleted_at": datetime(2024, 5, 2)},
+    }
+
+
+async def settle():
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+@pytest_asyncio.fixture
+async def feed():
+    feed = ChangeFeed()
+    feed.buffer_size = 3
+    feed.max_connections_per_user = 2
+    yield feed
+    task = feed._task
+    feed.stop()
+    if task is not None:
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.asyncio
+async def test_events_only_reach_their_owner(feed):
+    source = InMemoryChangeSource()
+    feed.start(source)
+    alice, bob = feed.subscribe("alice"), feed.subscribe("bob")
+    
+    source.emit(upserted("alice", "r1"))
+    source.emit(upserted("bob", "r2"))
+    source.emit(deleted("alice", "r1"))
+    source.emit({"ns": {"coll": "recipes"}, "operationType": "update", "documentKey": {"_id": "r3"}})
+    await settle()
+    
+    assert [(e.type, e.data["id"]) for e in drain(alice)] == [
+        ("recipe.upserted", "r1"), ("recipe.deleted", "r1"),
+    ]
+    assert [(e.type, e.data["id"]) for e in drain(bob)] == [("recipe.upserted", "r2")]
+
+
+@pytest.mark.asyncio
+async def test_connections_per_user_are_capped(feed):
+    assert feed.subscribe("alice") and feed.subscribe("alice")
+    assert feed.subscribe("alice") is None
+    assert feed.subscribe("bob") is not None
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_events_after_last_event_id(feed):
+    source = InMemoryChangeSource()
+    feed.start(source)
+    first = feed.subscribe("alice")
+    source.emit(upserted("alice", "r1"))
+    await settle()
+    [seen] = drain(first)
+    feed.unsubscribe(first)
+    
+    source.emit(upserted("alice", "r2"))
+    source.emit(upserted("bob", "r3"))
+    source.emit(deleted("alice", "r1"))
+    await settle()
+    
+    again = feed.subscribe("alice", last_event_id=seen.id)
+    assert not again.needs_reset
+    assert [(e.type, e.data["id"]) for e in drain(again)] == [
+        ("recipe.upserted", "r2"), ("recipe.deleted", "r1"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unknown_last_event_id_gets_a_reset(feed):
+    subscription = feed.subscribe("alice", last_event_id="not-in-history")
+    
+    assert subscription.needs_reset
+    messages = subscription.messages(heartbeat=0.01)
+    assert await messages.__anext__() == RESET_EVENT
+    assert await messages.__anext__() == HEARTBEAT
+
+
+@pytest.mark.asyncio
+async def test_lost_stream_history_resets_resuming_clients(feed):
+    source = InterruptedSource(HistoryLost("resume point no longer in the oplog"))
+    feed.start(source)
+    connected = feed.subscribe("alice")
+    source.emit(upserted("alice", "r1"))
+    await settle()
+    [event] = feed.history
+    
+    source.fail = True
+    source.emit(upserted("alice", "r2"))
+    await settle()
+    
+    assert len(feed.history) == 0
+    assert feed._resume_token is None
+    assert feed.subscribe("alice", last_event_id=event.id).needs_reset
+    
+    # Clients still connected missed the gap too: one reset, then the stream ends
+    assert connected.overflowed
+    assert [message async for message in connected.messages(heartbeat=1)] == [RESET_EVENT]
+
+
+@pytest.mark.asyncio
+async def test_slow_client_overflows_into_reset_and_disconnect(feed):
+    source = InMemoryChangeSource()
+    feed.start(source)
+    subscription = feed.subscribe("alice")
+    
+    for n in range(5):
+        source.emit(upserted("alice", f"r{n}"))
+    await settle()
+    
+    # Whatever was still queued is dropped: one reset, then the stream ends
+    assert subscription.overflowed
+    assert [message async for message in subscription.messages(heartbeat=1)] == [RESET_EVENT]
+    
+    # Other clients of the same user are unaffected
+    other = feed.subscribe("alice")
+    source.emit(upserted("alice", "r9"))
+    await settle()
+    message = await other.messages(heartbeat=1).__anext__()
+    assert json.loads(message.split("data: ")[1])["id"] == "r9"
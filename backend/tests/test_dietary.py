@@ -0,0 +1,60 @@
+import pytest
+
+from app.core.constants import DIETARY_BITS, DietaryInfo
+from app.utils.dietary import allergen_scan_mask, dietary_mask, ingredient_allergens, mask_to_flags
+
+
+def flags(labels, ingredients):
+    return set(mask_to_flags(dietary_mask(labels, ingredients)))
+
+
+def scanned(ingredients):
+    return set(mask_to_flags(allergen_scan_mask(ingredients)))
+
+
+@pytest.mark.parametrize(
+    "name", ["vegetarian parmesan", "meat-free cheddar", "paneer", "half-and-half", "Half & Half"]
+)
+def test_dairy_is_found(name):
+    assert "dairy" in ingredient_allergens(name)
+    assert "dairy_free" not in scanned([name, "salt"])
+    assert "dairy_free" not in flags(["dairy-free"], [name])
+
+
+@pytest.mark.parametrize("name", ["orzo", "potato gnocchi", "malt vinegar"])
+def test_gluten_is_found(name):
+    assert "gluten" in ingredient_allergens(name)
+    assert "gluten_free" not in scanned([name])
+    assert "gluten_free" not in flags(["gluten-free"], [name])
+
+
+def test_pesto_has_nuts():
+    assert "nut_free" not in scanned(["basil pesto"])
+    assert "nut_free" not in flags(["nut-free"], ["basil pesto"])
+
+
+def test_vegetarian_marker_only_rules_out_flesh():
+    assert ingredient_allergens("vegetarian sausage") == frozenset()
+    assert ingredient_allergens("vegetarian parmesan") == {"dairy"}
+    assert ingredient_allergens("vegan butter") == frozenset()
+    assert flags(["vegetarian"], ["meat-free mince", "cheddar"]) == {"vegetarian", "pescatarian"}
+
+
+def test_allergen_free_flags_come_only_from_labels():
+    ingredients = ["rice", "water", "salt"]
+    
+    assert flags([], ingredients) == set()
+    assert scanned(ingredients) == {"gluten_free", "dairy_free", "nut_free"}
+    assert flags(["GF"], ingredients) == {"gluten_free"}
+
+
+def test_no_ingredients_means_no_scan_result():
+    assert allergen_scan_mask([]) == 0
+    assert allergen_scan_mask(["", "  "]) == 0
+
+
+def test_contradicted_labels_are_dropped():
+    mask = dietary_mask(["vegan", "gluten-free"], ["butter", "rice"])
+    
+    assert not mask & DIETARY_BITS[DietaryInfo.VEGAN]
+    assert mask & DIETARY_BITS[DietaryInfo.GLUTEN_FREE]
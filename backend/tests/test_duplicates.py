@@ -0,0 +1,48 @@
+import pytest
+
+from app.config import get_settings
+from app.models.recipe import Ingredient, Recipe
+from app.services.duplicates import backfill_signatures, find_duplicates
+
+
+def recipe(title, *ingredients):
+    return Recipe(
+        user_id="user-1",
+        title=title,
+        ingredients=[Ingredient(name=name, quantity="1", unit="") for name in ingredients]
+    )
+
+
+@pytest.mark.asyncio
+async def test_recipes_saved_without_a_signature_are_backfilled(db):
+    old = recipe("Spaghetti carbonara", "spaghetti", "egg", "guanciale", "pecorino")
+    await old.insert()
+    # As stored before duplicate detection existed
+    await db["recipes"].update_one({"_id": old.id}, {"$unset": {"minhash": "", "lsh_bands": ""}})
+    
+    again = recipe("Spaghetti carbonara", "spaghetti", "egg", "guanciale", "pecorino")
+    await again.insert()
+    assert await find_duplicates(again) == []
+    
+    assert await backfill_signatures() == 1
+    assert await backfill_signatures() == 0
+    assert [candidate.id for candidate, _ in await find_duplicates(again)] == [old.id]
+
+
+@pytest.mark.asyncio
+async def test_candidates_sharing_the_most_bands_are_scored_first(db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "duplicate_max_candidates", 1)
+    original = recipe("Lentil soup", "lentils", "onion", "carrot", "cumin", "stock")
+    original.compute_lsh_bands()
+    
+    # A weak collision on a single band, inserted first so natural order would keep it
+    weak = recipe("Something else", "rice")
+    weak.minhash = [0] * len(original.minhash)
+    weak.lsh_bands = [original.lsh_bands[0]]
+    await Recipe.get_motor_collection().insert_one(weak.model_dump(exclude={"id", "revision_id"}))
+    await original.insert()
+    
+    probe = recipe("Lentil soup", "lentils", "onion", "carrot", "cumin", "stock")
+    await probe.insert()
+    matches = await find_duplicates(probe)
+    assert [candidate.id for candidate, _ in matches] == [original.id]
@@ -0,0 +1,48 @@
+import os
+import time
+
+import pytest
+
+from app.core.profiling import RequestProfiler, prune_profiles
+
+
+def write_profile(directory, profile_id, age):
+    modified = time.time() - age
+    for kind in ("cpu", "wall"):
+        path = directory / f"{profile_id}.{kind}.folded"
+        path.write_text("GET /;main 1\n")
+        os.utime(path, (modified, modified))
+
+
+def remaining(directory):
+    return sorted({name.split(".")[0] for name in os.listdir(directory)})
+
+
+def test_prune_keeps_the_newest_profiles(tmp_path):
+    for n in range(5):
+        write_profile(tmp_path, f"p{n}", age=n * 10)
+    (tmp_path / "notes.txt").write_text("not a profile")
+    
+    assert prune_profiles(str(tmp_path), max_profiles=2, max_age=None) == 3
+    assert remaining(tmp_path) == ["notes", "p0", "p1"]
+
+
+def test_prune_drops_profiles_past_the_age_limit(tmp_path):
+    write_profile(tmp_path, "fresh", age=60)
+    write_profile(tmp_path, "stale", age=7200)
+    
+    assert prune_profiles(str(tmp_path), max_profiles=None, max_age=3600) == 1
+    assert remaining(tmp_path) == ["fresh"]
+
+
+@pytest.mark.asyncio
+async def test_save_prunes_on_write(tmp_path):
+    for n in range(3):
+        write_profile(tmp_path, f"old{n}", age=100 + n)
+    profiler = RequestProfiler(0.005)
+    profiler.cpu[("main",)] += 1
+    
+    profiler.save(str(tmp_path), "GET /recipes", max_profiles=2, max_age=3600)
+    
+    assert remaining(tmp_path) == sorted(["old0", profiler.id])
+    assert (tmp_path / f"{profiler.id}.cpu.folded").read_text() == "GET /recipes;main 1\n"
@@ -0,0 +1,17 @@
+from fractions import Fraction
+
+import pytest
+
+from app.utils.quantities import parse_quantity
+
+
+@pytest.mark.parametrize("quantity, unit, low, high", [
+    ("1,5", "kg", Fraction(3, 2), None),
+    ("2,25 kg", "", Fraction(9, 4), None),
+    ("1-1,5", "l", Fraction(1), Fraction(3, 2)),
+    ("1,000", "g", Fraction(1000), None),
+    ("1.5", "kg", Fraction(3, 2), None),
+])
+def test_decimal_and_thousands_commas(quantity, unit, low, high):
+    parsed = parse_quantity(quantity, unit)
+    assert (parsed.low, parsed.high) == (low, high)
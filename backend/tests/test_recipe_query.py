@@ -0,0 +1,173 @@
+import pymongo
+import pytest
+
+from app.core.constants import DIETARY_BITS, DietaryInfo
+from app.services.recipe_query import (
+    BITS,
+    EQUALITY,
+    RANGE,
+    UNBOUNDED,
+    QuerySyntaxError,
+    UnindexedQueryError,
+    compile_query,
+    parse_filter,
+    parse_sort
+)
+
+
+LARGE, THRESHOLD = 5000, 2000
+
+VEGAN = DIETARY_BITS[DietaryInfo.VEGAN]
+
+
+def plan(filter_text="", sort_text=None, library_size=LARGE):
+    return compile_query(parse_filter(filter_text), parse_sort(sort_text), library_size, THRESHOLD)
+
+
+def test_parse_terms():
+    conditions = parse_filter('total_time<=30 difficulty:easy cuisine:"Middle Eastern" -tag:spicy diet:vegan')
+    
+    assert [(c.path, c.clause, c.bound) for c in conditions] == [
+        ("total_time", {"$lte": 30}, RANGE),
+        ("difficulty", "easy", EQUALITY),
+        ("cuisine", "Middle Eastern", EQUALITY),
+        ("tags", {"$ne": "spicy"}, UNBOUNDED),
+        ("dietary_mask", {"$bitsAllSet": VEGAN}, BITS),
+    ]
+
+
+def test_parse_quoted_value_keeps_commas():
+    [condition] = parse_filter('cuisine:"Mexican, Tex-Mex"')
+    assert condition.clause == "Mexican, Tex-Mex"
+
+
+def test_parse_ranges_and_lists():
+    closed, open_ended, listed, negated = parse_filter("prep_time:10..30 servings:4.. servings:2,4 -cook_time:5,10")
+    
+    assert (closed.clause, closed.bound) == ({"$gte": 10, "$lte": 30}, RANGE)
+    assert (open_ended.clause, open_ended.bound) == ({"$gte": 4}, RANGE)
+    assert (listed.clause, listed.bound) == ({"$in": [2, 4]}, EQUALITY)
+    assert (negated.clause, negated.bound) == ({"$nin": [5, 10]}, UNBOUNDED)
+
+
+def test_parse_negations():
+    favorite, diet, cuisine = parse_filter("favorite!=true -diet:vegan cuisine!=Thai")
+    
+    assert (favorite.clause, favorite.bound) == (False, EQUALITY)
+    assert (diet.clause, diet.bound) == ({"$bitsAllClear": VEGAN}, BITS)
+    assert (cuisine.clause, cuisine.bound) == ({"$ne": "Thai"}, UNBOUNDED)
+
+
+@pytest.mark.parametrize("text", [
+    "colour:red",
+    "cuisine<3",
+    "total_time:quick",
+    "servings:..",
+    "favorite:maybe",
+    "diet:carnivore",
+    'cuisine:"unterminated',
+])
+def test_parse_errors(text):
+    with pytest.raises(QuerySyntaxError):
+        parse_filter(text)
+
+
+def test_parse_sort():
+    assert parse_sort(None) == ("created_at", pymongo.DESCENDING)
+    assert parse_sort("-total_time") == ("total_time", pymongo.DESCENDING)
+    assert parse_sort("title") == ("title", pymongo.ASCENDING)
+    with pytest.raises(QuerySyntaxError):
+        parse_sort("calories")
+
+
+def test_sort_ends_with_an_id_tiebreaker():
+    assert plan(sort_text="-total_time").sort == [("total_time", -1), ("_id", -1)]
+    assert plan().sort == [("created_at", -1), ("_id", -1)]
+
+
+def test_hinted_index_serves_the_tiebreaker():
+    query = plan("cuisine:Italian")
+    
+    assert query.narrowed and query.sort_indexed
+    assert [key for key, _ in query.hint] == ["user_id", "cuisine", "created_at", "_id"]
+
+
+def test_closed_range_on_the_sort_key_narrows():
+    query = plan("total_time:10..30", "total_time")
+    
+    assert query.narrowed and query.sort_indexed
+    assert [key for key, _ in query.hint] == ["user_id", "total_time", "_id"]
+
+
+def test_equality_and_range_use_one_index():
+    query = plan("difficulty:easy total_time:..30", "total_time")
+    assert [key for key, _ in query.hint] == ["user_id", "difficulty", "total_time", "_id"]
+
+
+def test_one_sided_comparisons_narrow():
+    query = plan("total_time<=30")
+    
+    assert query.narrowed and not query.sort_indexed
+    assert [key for key, _ in query.hint] == ["user_id", "total_time", "_id"]
+
+
+def test_request_example_narrows_and_sorts_in_memory():
+    query = plan("total_time<=30 difficulty:easy cuisine:Italian,Mexican", "cook_time")
+    
+    assert query.narrowed and not query.sort_indexed
+    assert [key for key, _ in query.hint] == ["user_id", "difficulty", "total_time", "_id"]
+    assert query.sort == [("cook_time", 1), ("_id", 1)]
+    assert query.max_results == 1000
+
+
+def test_indexed_sorts_are_not_capped():
+    assert plan("cuisine:Italian").max_results is None
+    assert plan("total_time<=30", "cook_time", library_size=THRESHOLD).max_results is None
+
+
+@pytest.mark.parametrize("filter_text, sort_text", [
+    ("-diet:vegan", None),
+    ("diet:vegan", None),
+    ("-cuisine:Thai", "title"),
+    ("", "updated_at"),
+])
+def test_large_libraries_reject_whole_library_scans(filter_text, sort_text):
+    with pytest.raises(UnindexedQueryError):
+        plan(filter_text, sort_text)
+
+
+def test_rejection_suggests_usable_sorts():
+    with pytest.raises(UnindexedQueryError, match="sort by created_at"):
+        plan("", "updated_at")
+
+
+@pytest.mark.parametrize("filter_text, sort_text", [
+    ("", None),
+    ("", "title"),
+    ("tag:dinner diet:vegan", None),
+    ("favorite:true", "-created_at"),
+    ("servings:2..4", "servings"),
+    ("total_time<=30", None),
+    ("total_time<30 difficulty:easy", None),
+    ("total_time<=30 difficulty:easy cuisine:Italian,Mexican -tag:spicy", "cook_time"),
+    ("cuisine:Italian", "title"),
+    ("servings>=2", "title"),
+])
+def test_large_libraries_accept_narrowed_queries(filter_text, sort_text):
+    plan(filter_text, sort_text)
+
+
+def test_small_libraries_accept_anything():
+    query = plan("-diet:vegan -cuisine:Thai", "updated_at", library_size=THRESHOLD)
+    assert not query.narrowed
+
+
+def test_apply_merges_conditions_on_one_field():
+    query = plan("total_time>=10 total_time<=30 tag:dinner tag:quick", library_size=0)
+    
+    assert query.apply({"user_id": "u1"}) == {
+        "user_id": "u1",
+        "total_time": {"$gte": 10, "$lte": 30},
+        "tags": "dinner",
+        "$and": [{"tags": "quick"}],
+    }
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.recipe import Ingredient, Recipe, RecipeTombstone
+from app.services.recommendations import RecommendationService
+
+
+def recipe(title, *ingredients, cuisine="Italian"):
+    return Recipe(
+        user_id="user-1",
+        title=title,
+        cuisine=cuisine,
+        ingredients=[Ingredient(name=name, quantity="1", unit="") for name in ingredients]
+    )
+
+
+@pytest.mark.asyncio
+async def test_index_sees_writes_made_by_another_process(db):
+    soup = recipe("Lentil soup", "lentils", "onion", "carrot")
+    await soup.insert()
+    service = RecommendationService()
+    assert len(await service.index_for("user-1")) == 1
+    
+    # Written elsewhere: this service's recipe_saved is never called
+    stew = recipe("Lentil stew", "lentils", "onion", "tomato")
+    await stew.insert()
+    
+    index = await service.index_for("user-1")
+    assert str(stew.id) in index
+    similar = await service.similar("user-1", str(soup.id), 5)
+    assert [recipe_id for recipe_id, _, _ in similar] == [str(stew.id)]
+
+
+@pytest.mark.asyncio
+async def test_index_sees_deletes_made_by_another_process(db):
+    soup = recipe("Lentil soup", "lentils", "onion")
+    stew = recipe("Lentil stew", "lentils", "tomato")
+    await soup.insert()
+    await stew.insert()
+    service = RecommendationService()
+    assert len(await service.index_for("user-1")) == 2
+    
+    await stew.delete()
+    await RecipeTombstone(user_id="user-1", recipe_id=str(stew.id)).insert()
+    
+    index = await service.index_for("user-1")
+    assert str(stew.id) not in index
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_index_is_rebuilt_once_changes_outlive_the_deletion_history(db):
+    service = RecommendationService()
+    index = await service.index_for("user-1")
+    index.synced_until = datetime.utcnow() - service.history - timedelta(days=1)
+    
+    soup = recipe("Lentil soup", "lentils")
+    await soup.insert()
+    
+    rebuilt = await service.index_for("user-1")
+    assert rebuilt is not index
+    assert str(soup.id) in rebuilt
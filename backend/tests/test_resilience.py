@@ -0,0 +1,168 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.resilience import (
+    CircuitBreaker,
+    GeminiUnavailableError,
+    RateGovernor,
+    ResilientCaller,
+    RetryPolicy
+)
+
+
+class ServiceUnavailable(Exception):
+    """Named like the google.api_core error, so it is classified as transient"""
+
+
+class FakeModel:
+    """Answers from a script of results and exceptions; `gate` holds calls until set"""
+    
+    def __init__(self, *script, gate: threading.Event = None):
+        self.script = list(script)
+        self.gate = gate
+        self.calls = 0
+        self.finished = threading.Event()
+    
+    def generate_content(self, prompt):
+        self.calls += 1
+        try:
+            if self.gate is not None:
+                self.gate.wait(timeout=5)
+            outcome = self.script.pop(0) if self.script else "ok"
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        finally:
+            self.finished.set()
+
+
+def make_caller(attempts=3, failure_threshold=5, concurrency=2, timeout=None, hedge=False):
+    return ResilientCaller(
+        retry_policy=RetryPolicy(max_attempts=attempts, base_delay=0, max_delay=0),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60),
+        governor=RateGovernor(max_concurrency=concurrency, requests_per_minute=60000),
+        timeout=timeout,
+        hedge=hedge,
+        hedge_min_samples=1
+    )
+
+
+async def wait_for_event(event: threading.Event) -> None:
+    assert await asyncio.to_thread(event.wait, 5)
+    # Let the worker's done-callback run on the loop
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_errors():
+    model = FakeModel(ServiceUnavailable("busy"), ServiceUnavailable("busy"), "recipe")
+    caller = make_caller()
+    
+    assert await caller.call(model.generate_content, "prompt") == "recipe"
+    assert model.calls == 3
+    assert caller.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_fails_fast():
+    model = FakeModel(*[ServiceUnavailable("down")] * 4)
+    caller = make_caller(attempts=2, failure_threshold=2)
+    
+    with pytest.raises(GeminiUnavailableError):
+        await caller.call(model.generate_content, "prompt")
+    assert caller.breaker.state == CircuitBreaker.OPEN
+    
+    with pytest.raises(GeminiUnavailableError) as error:
+        await caller.call(model.generate_content, "prompt")
+    assert error.value.retry_after > 0
+    assert model.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_leave_the_breaker_alone():
+    model = FakeModel(ServiceUnavailable("down"), ValueError("bad prompt"), ServiceUnavailable("down"))
+    caller = make_caller(attempts=1, failure_threshold=2)
+    
+    with pytest.raises(GeminiUnavailableError):
+        await caller.call(model.generate_content, "prompt")
+    with pytest.raises(ValueError):
+        await caller.call(model.generate_content, "prompt")
+    assert caller.breaker.state == CircuitBreaker.CLOSED
+    
+    # The permanent error did not reset the count, so this failure opens the circuit
+    with pytest.raises(GeminiUnavailableError):
+        await caller.call(model.generate_content, "prompt")
+    assert caller.breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_permanent_error_frees_the_half_open_probe():
+    model = FakeModel(ValueError("bad prompt"), "recipe")
+    caller = make_caller(attempts=1, failure_threshold=1)
+    caller.breaker.record_failure()
+    caller.breaker.reset_timeout = 0
+    
+    with pytest.raises(ValueError):
+        await caller.call(model.generate_content, "prompt")
+    assert caller.breaker.state == CircuitBreaker.HALF_OPEN
+    assert await caller.call(model.generate_content, "prompt") == "recipe"
+    assert caller.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_frees_the_half_open_slot():
+    gate = threading.Event()
+    model = FakeModel(gate=gate)
+    caller = make_caller(attempts=1, failure_threshold=1)
+    caller.breaker.record_failure()
+    caller.breaker.reset_timeout = 0
+    
+    probe = asyncio.ensure_future(caller.call(model.generate_content, "prompt"))
+    await asyncio.sleep(0.05)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    gate.set()
+    
+    assert await caller.call(model.generate_content, "prompt") == "ok"
+    assert caller.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_timed_out_call_holds_its_slot_until_the_thread_finishes():
+    gate = threading.Event()
+    model = FakeModel(gate=gate)
+    caller = make_caller(attempts=1, concurrency=1, timeout=0.05)
+    
+    with pytest.raises(GeminiUnavailableError):
+        await caller.call(model.generate_content, "prompt")
+    assert caller.governor._semaphore.locked()
+    
+    gate.set()
+    await wait_for_event(model.finished)
+    assert not caller.governor._semaphore.locked()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_hedge_loser_holds_its_slot_until_the_thread_finishes():
+    slow_gate = threading.Event()
+    slow = FakeModel("slow", gate=slow_gate)
+    caller = make_caller(concurrency=2, hedge=True)
+    caller.latency.record(0.01)
+    
+    calls = iter([slow.generate_content, lambda prompt: "fast"])
+    
+    def first_slow_then_fast(prompt):
+        return next(calls)(prompt)
+    
+    assert await caller.call(first_slow_then_fast, "prompt") == "fast"
+    # The winner's slot is back, the loser's thread still holds one
+    await asyncio.sleep(0.01)
+    assert caller.governor._semaphore._value == 1
+    
+    slow_gate.set()
+    await wait_for_event(slow.finished)
+    assert caller.governor._semaphore._value == 2
@@ -0,0 +1,21 @@
+import shutil
+
+from app.services.extractors import ExtractorFactory
+from app.services.extractors.rules import RuleEngine
+
+
+def test_broken_packs_are_skipped(tmp_path):
+    shutil.copy("app/services/extractors/rule_packs/wprm.json", tmp_path / "wprm.json")
+    (tmp_path / "list.yaml").write_text("- just\n- a list\n")
+    (tmp_path / "bad.yaml").write_text("recipe: {title: [unclosed\n")
+    (tmp_path / "selector.json").write_text(
+        '{"hosts": ["example.com"], "recipe": {"title": {"css": "h1::before"}}}'
+    )
+    engine = RuleEngine(str(tmp_path))
+    
+    try:
+        engine.load()
+        assert list(engine.extractors) == ["wprm"]
+    finally:
+        for extractor in engine.extractors.values():
+            ExtractorFactory.unregister(extractor)
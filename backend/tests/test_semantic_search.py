@@ -0,0 +1,65 @@
+import pytest
+
+from app.models.recipe import Ingredient, Recipe
+from app.services.semantic_search import HashingEmbedder, SemanticIndex, SemanticSearchService
+
+
+def recipe(title, *ingredients):
+    return Recipe(
+        user_id="user-1",
+        title=title,
+        ingredients=[Ingredient(name=name, quantity="1", unit="") for name in ingredients]
+    )
+
+
+def worker(directory):
+    """A service as a separate worker process would have it: same files, own memory"""
+    service = SemanticSearchService(embedder=HashingEmbedder())
+    service.directory = str(directory)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_workers_do_not_overwrite_each_others_writes(db, tmp_path):
+    soup = recipe("Lentil soup", "lentils", "onion")
+    await soup.insert()
+    first, second = worker(tmp_path), worker(tmp_path)
+    await first.search("user-1", "soup", 5)
+    await second.search("user-1", "soup", 5)
+    
+    curry = recipe("Chickpea curry", "chickpeas", "coconut milk")
+    tart = recipe("Apple tart", "apples", "puff pastry")
+    await curry.insert()
+    await tart.insert()
+    await first.recipe_saved(curry)
+    await second.recipe_saved(tart)
+    
+    on_disk = SemanticIndex.load(first._path("user-1"))
+    assert sorted(on_disk.ids) == sorted([str(soup.id), str(curry.id), str(tart.id)])
+    
+    hits = await first.search("user-1", "apple tart", 1)
+    assert hits[0][0] == str(tart.id)
+
+
+@pytest.mark.asyncio
+async def test_search_reloads_an_index_replaced_by_another_worker(db, tmp_path):
+    soup = recipe("Lentil soup", "lentils", "onion")
+    await soup.insert()
+    first, second = worker(tmp_path), worker(tmp_path)
+    await first.search("user-1", "soup", 5)
+    await second.search("user-1", "soup", 5)
+    
+    await second.recipe_deleted("user-1", str(soup.id))
+    
+    assert await first.search("user-1", "lentil soup", 5) == []
+
+
+@pytest.mark.asyncio
+async def test_user_deleted_removes_the_index_files(db, tmp_path):
+    await recipe("Lentil soup", "lentils").insert()
+    service = worker(tmp_path)
+    await service.search("user-1", "soup", 5)
+    
+    await service.user_deleted("user-1")
+    
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.recipe import Recipe, RecipeTombstone
+from app.services import sync
+from app.services.sync import CursorExpiredError, SyncCursor, changes_since
+
+
+async def old_recipes(count, age_days=400):
+    recipes = []
+    for n in range(count):
+        recipe = Recipe(
+            user_id="user-1",
+            title=f"Recipe {n}",
+            updated_at=datetime.utcnow() - timedelta(days=age_days, minutes=count - n)
+        )
+        await recipe.insert()
+        recipes.append(recipe)
+    return recipes
+
+
+async def sync_all(cursor=None, limit=2):
+    received, deleted, pages = [], [], 0
+    while True:
+        changes = await changes_since("user-1", cursor, limit)
+        received += [str(r.id) for r in changes.recipes]
+        deleted += [t.recipe_id for t in changes.deleted]
+        cursor = changes.cursor.encode()
+        pages += 1
+        if not changes.has_more:
+            return received, deleted, cursor, pages
+
+
+@pytest.mark.asyncio
+async def test_full_sync_pages_through_recipes_older_than_the_deletion_history(db):
+    recipes = await old_recipes(7)
+    # Deleted before the sync started: the client never had it
+    await RecipeTombstone(
+        user_id="user-1", recipe_id="a" * 24, deleted_at=datetime.utcnow() - timedelta(days=3)
+    ).insert()
+    
+    received, deleted, _, pages = await sync_all(limit=2)
+    
+    assert received == [str(r.id) for r in recipes]
+    assert deleted == []
+    assert pages == 4
+
+
+@pytest.mark.asyncio
+async def test_deletions_during_a_full_sync_are_reported(db, monkeypatch):
+    recipes = await old_recipes(5)
+    
+    first = await changes_since("user-1", None, 2)
+    assert first.has_more
+    sent = first.recipes[0]
+    await sent.delete()
+    await RecipeTombstone(user_id="user-1", recipe_id=str(sent.id)).insert()
+    # Let the deletion settle without waiting
+    monkeypatch.setattr(sync, "_settled_until", lambda: datetime.utcnow() + timedelta(seconds=1))
+    
+    received, deleted, _, _ = await sync_all(first.cursor.encode(), limit=2)
+    
+    assert received == [str(r.id) for r in recipes[2:]]
+    assert deleted == [str(sent.id)]
+
+
+@pytest.mark.asyncio
+async def test_cursor_expires_with_the_deletion_history(db):
+    await old_recipes(3)
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    
+    # A full sync started too long ago, and a cursor from before issued_at existed
+    for cursor in (SyncCursor(long_ago, "b" * 24, long_ago), SyncCursor(long_ago, "b" * 24)):
+        with pytest.raises(CursorExpiredError):
+            await changes_since("user-1", cursor.encode(), 2)
+
+
+def test_cursor_round_trips_with_and_without_issued_at():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    issued_at = datetime(2024, 6, 1)
+    
+    assert SyncCursor.decode(SyncCursor(timestamp, "c" * 24, issued_at).encode()) == SyncCursor(
+        timestamp, "c" * 24, issued_at
+    )
+    assert SyncCursor.decode(SyncCursor(timestamp, "c" * 24).encode()).issued_at is None
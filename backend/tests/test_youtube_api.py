@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.services.youtube_api import TranscriptClient, VideoMetadataBatcher, YouTubeDataClient
+
+
+CAPTIONS = {
+    ("abc", "en"): (
+        '<?xml version="1.0" encoding="utf-8" ?><transcript>'
+        '<text start="0.5" dur="2.1">Preheat the oven &amp;amp; grease a pan</text>'
+        '<text start="2.6" dur="1.4">Whisk the\neggs</text>'
+        '<text start="4.0" dur="1.0">  </text>'
+        '</transcript>'
+    ),
+    ("def", "es"): '<transcript><text start="1" dur="2">Cortar la cebolla</text></transcript>',
+}
+
+
+class FakeYouTube(BaseHTTPRequestHandler):
+    """Local stand-in for videos.list and timedtext"""
+    
+    requests = []
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        type(self).requests.append((url.path, params))
+        
+        if url.path == "/youtube/v3/videos":
+            if params.get("key") != "test-key":
+                return self._send(403, b'{"error": "forbidden"}')
+            items = [
+                {"id": video_id, "snippet": {"title": f"Video {video_id}"}}
+                for video_id in params["id"].split(",") if not video_id.startswith("missing")
+            ]
+            return self._send(200, json.dumps({"items": items}).encode())
+        
+        if url.path == "/api/timedtext":
+            captions = CAPTIONS.get((params.get("v"), params.get("lang")))
+            if captions is None:
+                return self._send(404, b"")
+            return self._send(200, captions.encode())
+        
+        self._send(404, b"")
+    
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def youtube():
+    FakeYouTube.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeYouTube)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def video_requests():
+    return [params for path, params in FakeYouTube.requests if path == "/youtube/v3/videos"]
+
+
+def test_videos_list_batches_fifty_ids_per_request(youtube):
+    client = YouTubeDataClient("test-key", f"{youtube}/youtube/v3/")
+    ids = [f"vid{i:03d}" for i in range(120)] + ["vid000", "missing1"]
+    
+    videos = client.videos_list(ids)
+    
+    assert len(videos) == 120
+    assert videos["vid042"]["snippet"]["title"] == "Video vid042"
+    assert [len(params["id"].split(",")) for params in video_requests()] == [50, 50, 21]
+
+
+def test_batcher_coalesces_concurrent_lookups(youtube):
+    client = YouTubeDataClient("test-key", f"{youtube}/youtube/v3")
+    
+    async def lookup():
+        batcher = VideoMetadataBatcher(client, window_seconds=0.05)
+        return await asyncio.gather(
+            batcher.get("a"), batcher.get("b"), batcher.get("a"), batcher.get("missing2")
+        )
+    
+    a, b, a_again, missing = asyncio.run(lookup())
+    
+    assert a["id"] == "a" and a_again is a and b["id"] == "b"
+    assert missing is None
+    assert [params["id"] for params in video_requests()] == ["a,b,missing2"]
+
+
+def test_batcher_fails_every_waiter_when_the_call_fails(youtube):
+    client = YouTubeDataClient("wrong-key", youtube + "/youtube/v3")
+    
+    async def lookup():
+        batcher = VideoMetadataBatcher(client)
+        return await asyncio.gather(batcher.get("a"), batcher.get("b"), return_exceptions=True)
+    
+    errors = asyncio.run(lookup())
+    
+    assert all(isinstance(error, Exception) for error in errors)
+    assert len(video_requests()) == 1
+
+
+def test_transcript_is_parsed_and_cached(youtube):
+    client = TranscriptClient(f"{youtube}/api/timedtext")
+    
+    segments = client.get("abc")
+    
+    assert [(s.start, s.duration, s.text) for s in segments] == [
+        (0.5, 2.1, "Preheat the oven & grease a pan"),
+        (2.6, 1.4, "Whisk the eggs"),
+    ]
+    assert client.get("abc") is segments
+    assert len(FakeYouTube.requests) == 1
+
+
+def test_transcript_falls_back_through_languages(youtube):
+    client = TranscriptClient(f"{youtube}/api/timedtext", languages=("en", "es"))
+    
+    assert [s.text for s in client.get("def")] == ["Cortar la cebolla"]
+    assert client.get("nothing") == []
+    assert [params["lang"] for _, params in FakeYouTube.requests] == ["en", "es", "en", "es"]
+
+
+def test_transcript_cache_is_bounded_under_concurrent_use(youtube):
+    client = TranscriptClient(f"{youtube}/api/timedtext", cache_size=4)
+    errors = []
+    
+    def worker(offset):
+        try:
+            for i in range(20):
+                client.get("abc" if i % 2 else f"video{(offset + i) % 7}")
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert len(client._cache) <= 4